@@ -0,0 +1,94 @@
+"""
+Memory benchmark of the registry of commands of the tome CLI.
+
+Generates a synthetic tome home with a large number of installed commands, registers all of them as
+``tome list`` does and measures the memory retained by the registry with tracemalloc, reported per
+command::
+
+    python -m tests.benchmarks.registry --commands 20000
+    python -m tests.benchmarks.registry --homes-folder ../tome_homes --max-bytes-per-command 400
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+from tome.api.api import TomeAPI
+from tome.cli import Cli
+
+from tests.benchmarks.startup import REPO_FOLDER, generate_home
+from tests.utils.files import temp_folder
+
+DEFAULT_COMMANDS = 20000
+# Every origin of the home has 1 to 3 namespaces with MODULES_PER_NAMESPACE modules and a shell script
+ORIGINS = 20
+MODULES_PER_NAMESPACE = 10
+
+
+def measure_registry(home):
+    """
+    Register all the commands of a home and measure the memory retained by the registry. It must run in
+    a fresh interpreter, the built-in commands imported here can't be reused by other Cli instances.
+
+    :return: A dict with the number of commands, the retained bytes and the bytes per command.
+    """
+    cli = Cli(TomeAPI(cache_folder=home))
+    # A first load imports the built-in commands and fills the caches of the standard library
+    cli._load_commands()
+    cli._commands = {}
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        cli._load_commands()
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    commands = len(cli._commands)
+    return {"commands": commands, "retained_bytes": retained, "bytes_per_command": round(retained / commands, 1)}
+
+
+def run_benchmark(commands=DEFAULT_COMMANDS, homes_folder=None):
+    """
+    Generate a home with approximately the given number of commands, reusing it if it already exists
+    in the homes folder, and measure its registry.
+    """
+    homes_folder = homes_folder or temp_folder()
+    commands_per_module = max(1, commands // (2 * ORIGINS * MODULES_PER_NAMESPACE))
+    home = os.path.join(homes_folder, f"registry_{commands_per_module}")
+    generate_home(
+        home,
+        ORIGINS,
+        editables=0,
+        modules_per_namespace=MODULES_PER_NAMESPACE,
+        commands_per_module=commands_per_module,
+    )
+    env = dict(os.environ, PYTHONPATH=REPO_FOLDER)
+    env.pop("TOME_TRACE", None)
+    script = "import json, sys; from tests.benchmarks.registry import measure_registry; "
+    script += "print(json.dumps(measure_registry(sys.argv[1])))"
+    output = subprocess.check_output([sys.executable, "-c", script, home], cwd=REPO_FOLDER, env=env)
+    return json.loads(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the memory of the registry of commands of tome.")
+    parser.add_argument("--commands", type=int, default=DEFAULT_COMMANDS, help="Approximate installed commands.")
+    parser.add_argument("--homes-folder", help="Folder to generate the home into, and reuse it in later runs.")
+    parser.add_argument("--max-bytes-per-command", type=float, help="Fail if the registry needs more memory.")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.commands, args.homes_folder)
+    print(json.dumps(result, indent=2))
+    if args.max_bytes_per_command and result["bytes_per_command"] > args.max_bytes_per_command:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
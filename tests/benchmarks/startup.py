@@ -0,0 +1,266 @@
+"""
+Startup scalability benchmarks of the tome CLI.
+
+Generates synthetic tome homes with an increasing number of installed origins and measures the wall
+time and peak RSS of the most common invocations, each one in a fresh interpreter as a user runs them.
+The results are written to JSON and can be compared with a baseline to catch regressions in the loading
+of commands before a release::
+
+    python -m tests.benchmarks.startup --sizes 1 10 100 --output results.json
+    python -m tests.benchmarks.startup --compare tests/benchmarks/baselines/startup.json
+
+Absolute numbers depend on the machine, compare only results obtained in the same one, the results record
+the interpreter and the machine to check it. No baseline is stored in the repository. Measure it in the
+machine that runs the comparison, with the code before the changes, like the last release::
+
+    git checkout <last release tag>
+    python -m tests.benchmarks.startup --output tests/benchmarks/baselines/startup.json
+    git checkout -
+    python -m tests.benchmarks.startup --compare
+
+Use a quiet machine with several CPUs and enough --repeat, the medians of a busy one vary too much.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import textwrap
+
+from tome.api.api import TomeAPI
+from tome.internal.source import Source, SourceType
+from tome.internal.utils.files import save
+
+from tests.utils.files import temp_folder
+
+RESULTS_VERSION = 2
+DEFAULT_SIZES = (1, 10, 100, 1000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "startup.json")
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Marker written once a home is fully generated, so it can be reused between runs
+HOME_READY_FILE = "benchmark_home.json"
+
+# Invocations measured for every home, the command ones refer to the first command of the first origin
+SCENARIOS = {
+    "version": ["--version"],
+    "help": ["--help"],
+    "list": ["list"],
+    "list_pattern": ["list", "cmd-1-2"],
+    "list_namespace": ["list", "ns0-0:"],
+    "info": ["info", "ns0-0:cmd-0-0"],
+    "run": ["ns0-0:cmd-0-0", "world"],
+}
+
+
+def _module(module_index, commands_per_module):
+    commands = "\n".join(
+        textwrap.dedent(f'''
+            @tome_command()
+            def cmd_{module_index}_{command_index}(tome_api, parser, *args):
+                """Command {command_index} of module {module_index}"""
+                parser.add_argument("name")
+                args = parser.parse_args(*args)
+                TomeOutput(stdout=True).print(f"Hello {{args.name}}!")
+            ''')
+        for command_index in range(commands_per_module)
+    )
+    return f"from tome.api.output import TomeOutput\nfrom tome.command import tome_command\n{commands}"
+
+
+def _script(namespace):
+    return f"#!/bin/sh\n# tome_description: Script of {namespace}\necho \"Hello $1!\"\n"
+
+
+def generate_origin(folder, origin_index, modules_per_namespace=2, commands_per_module=5, scripts_per_namespace=1):
+    """
+    Write the sources of a synthetic origin. The number of namespaces varies between 1 and 3 with the
+    origin index, so the homes are not completely uniform.
+    """
+    for namespace_index in range(1 + origin_index % 3):
+        namespace = f"ns{origin_index}-{namespace_index}"
+        for module_index in range(modules_per_namespace):
+            save(
+                os.path.join(folder, namespace, f"module_{module_index}.py"), _module(module_index, commands_per_module)
+            )
+        for script_index in range(scripts_per_namespace):
+            save(os.path.join(folder, namespace, f"tome_script_{script_index}.sh"), _script(namespace))
+
+
+def generate_home(home, origins, editables=None, **origin_args):
+    """
+    Install a number of synthetic origins in a tome home with the regular installation process, plus
+    some editables, one every 10 origins by default.
+
+    :param home: The folder of the tome home.
+    :param origins: Number of installed origins.
+    :param editables: Number of editable installations.
+    :param origin_args: Passed to generate_origin().
+    """
+    if os.path.isfile(os.path.join(home, HOME_READY_FILE)):
+        return
+    editables = max(1, origins // 10) if editables is None else editables
+    sources_folder = os.path.join(home, "benchmark_sources")
+    tome_api = TomeAPI(cache_folder=home)
+    for index in range(origins + editables):
+        origin_folder = os.path.join(sources_folder, f"origin{index}")
+        generate_origin(origin_folder, index, **origin_args)
+        source = Source.parse(origin_folder)
+        if index < origins:
+            tome_api.install.install_from_source(source, force_requirements=False, create_env=False)
+        else:
+            source.type = SourceType.EDITABLE
+            tome_api.install.install_editable(source, force_requirements=False, create_env=False)
+    save(os.path.join(home, HOME_READY_FILE), json.dumps({"origins": origins, "editables": editables}))
+
+
+# Runs a command and reports its wall time and peak RSS. ru_maxrss includes the memory of the process
+# before exec(), inherited from the parent in the fork, so it is measured from this minimal interpreter
+# instead of the benchmark one, which has already imported tome and generated the homes.
+_MEASURE_SCRIPT = """
+import json, os, subprocess, sys, time
+start = time.perf_counter()
+proc = subprocess.Popen(sys.argv[1:], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+if hasattr(os, "wait4"):
+    _, status, rusage = os.wait4(proc.pid, 0)
+    code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+    # ru_maxrss is in bytes in macOS and KB in Linux
+    rss = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+else:
+    code, rss = proc.wait(), None
+print(json.dumps({"wall_ms": (time.perf_counter() - start) * 1e3, "peak_rss_kb": rss, "code": code}))
+"""
+
+
+def measure(home, args, repeat):
+    """
+    Run ``tome <args>`` repeatedly in new processes.
+
+    :return: A dict with the minimum and median wall time in ms and the maximum peak RSS in KB, None
+             where it can't be measured.
+    """
+    env = dict(os.environ, TOME_HOME=home, PYTHONPATH=REPO_FOLDER)
+    env.pop("TOME_TRACE", None)
+    times, rss = [], []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-c", _MEASURE_SCRIPT, sys.executable, "-m", "tome", *args], cwd=home, env=env
+        )
+        run = json.loads(output)
+        if run["code"] != 0:
+            raise RuntimeError(f"'tome {' '.join(args)}' failed with code {run['code']} in '{home}'")
+        times.append(run["wall_ms"])
+        if run["peak_rss_kb"] is not None:
+            rss.append(run["peak_rss_kb"])
+    return {
+        "wall_ms": {"min": round(min(times), 2), "median": round(statistics.median(times), 2)},
+        "peak_rss_kb": max(rss) if rss else None,
+    }
+
+
+def run_benchmarks(sizes, repeat=5, homes_folder=None, scenarios=None):
+    """
+    Generate a home for every size and measure the scenarios in it.
+
+    :param sizes: Numbers of installed origins of the homes.
+    :param repeat: Runs of every scenario.
+    :param homes_folder: Where to generate the homes, reusing the existing ones. A temporary folder by default.
+    :param scenarios: Names of the scenarios to run, all of them by default.
+    """
+    homes_folder = homes_folder or temp_folder()
+    scenarios = scenarios or list(SCENARIOS)
+    results = {}
+    for size in sizes:
+        home = os.path.join(homes_folder, f"home_{size}")
+        generate_home(home, size)
+        results[str(size)] = {name: measure(home, SCENARIOS[name], repeat) for name in scenarios}
+    return {"version": RESULTS_VERSION, **environment(), "repeat": repeat, "results": results}
+
+
+def _processor():
+    processor = platform.processor()
+    if not processor and os.path.isfile("/proc/cpuinfo"):  # Empty in most Linux distributions
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            models = [line.split(":", 1)[1].strip() for line in f if line.startswith("model name")]
+        processor = models[0] if models else ""
+    return processor
+
+
+def environment():
+    """Interpreter and machine the results were measured with, they are only comparable in the same one"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": {"arch": platform.machine(), "processor": _processor(), "cpus": os.cpu_count()},
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare the median wall time and the peak RSS of every scenario with a baseline.
+
+    :param tolerance: Allowed relative increase, e.g. 0.25 for 25%.
+    :return: A list of (size, scenario, metric, baseline value, current value, ratio) of every measure,
+             and the list of the ones that regressed more than the tolerance.
+    """
+    rows, regressions = [], []
+    for size, scenarios in results["results"].items():
+        for name, current in scenarios.items():
+            previous = baseline["results"].get(size, {}).get(name)
+            if previous is None:
+                continue
+            metrics = [("wall_ms", previous["wall_ms"]["median"], current["wall_ms"]["median"])]
+            if previous["peak_rss_kb"] and current["peak_rss_kb"]:
+                metrics.append(("peak_rss_kb", previous["peak_rss_kb"], current["peak_rss_kb"]))
+            for metric, before, after in metrics:
+                row = (size, name, metric, before, after, after / before)
+                rows.append(row)
+                if row[-1] > 1 + tolerance:
+                    regressions.append(row)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the startup of tome with synthetic homes.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Installed origins per home.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of every scenario.")
+    parser.add_argument(
+        "--scenario", action="append", choices=list(SCENARIOS), help="Scenarios to run, all by default."
+    )
+    parser.add_argument("--homes-folder", help="Folder to generate the homes into, and reuse them in later runs.")
+    parser.add_argument("--output", help="JSON file to write the results to.")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="Baseline JSON to compare with.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (default 0.25).")
+    args = parser.parse_args(argv)
+    if args.compare and not os.path.isfile(args.compare):
+        parser.error(f"No baseline in '{args.compare}', measure it first with --output {args.compare}")
+
+    results = run_benchmarks(args.sizes, args.repeat, args.homes_folder, args.scenario)
+    if args.output:
+        save(args.output, json.dumps(results, indent=2))
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        different = [key for key, value in environment().items() if baseline.get(key) != value]
+        if different:
+            print(f"Warning: the baseline was measured with a different {', '.join(different)}")
+        rows, regressions = compare(results, baseline, args.tolerance)
+        for size, name, metric, before, after, ratio in rows:
+            flag = "  REGRESSION" if ratio > 1 + args.tolerance else ""
+            print(f"{size:>5} {name:<13} {metric:<12} {before:>10} -> {after:>10} ({ratio:.2f}x){flag}")
+        for size, scenarios in results["results"].items():
+            for name in scenarios:
+                if name not in baseline["results"].get(size, {}):
+                    print(f"{size:>5} {name:<13} not in the baseline, measure it again to compare it")
+    else:
+        print(json.dumps(results, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+from tests.utils.tools import TestClient
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _command(name, body):
+    return textwrap.dedent(f'''
+        from tome.command import tome_command
+        from tome.api.output import TomeOutput
+
+        @tome_command()
+        def {name}(tome_api, parser, *args):
+            """Command {name}"""
+            parser.add_argument("name")
+            args = parser.parse_args(*args)
+            {body}
+        ''')
+
+
+def _client():
+    client = TestClient()
+    client.save(
+        {
+            os.path.join("origin", "greetings", "greet.py"): _command(
+                "hello", 'TomeOutput(stdout=True).print(f"Hello {args.name}")'
+            )
+        }
+    )
+    client.save({os.path.join("origin", "greetings", "fail.py"): _command("fail", "raise SystemExit(7)")})
+    client.save(
+        {
+            os.path.join("origin2", "more", "bye.py"): _command(
+                "bye", 'TomeOutput(stdout=True).print(f"Bye {args.name}")'
+            )
+        }
+    )
+    client.run("install origin")
+    return client
+
+
+def test_batch_runs_the_command_lines():
+    client = _client()
+    batch = """
+        # The same command many times, with its parser built again every time
+        greetings:hello "my friend"
+        greetings:hello other  # comment
+        config home
+        install origin2
+        more:bye you
+        """
+    client.save({"batch.txt": textwrap.dedent(batch)})
+    client.run("batch batch.txt")
+    lines = client.stdout.splitlines()
+    assert lines[:3] == ["Hello my friend", "Hello other", client.cache_folder]
+    # The commands are registered again after installing
+    assert lines[-1] == "Bye you"
+    assert "Summary:" in client.stderr
+    assert "greetings:hello 'my friend'" in client.stderr
+    assert "5 command lines run" in client.stderr
+
+
+def test_batch_from_stdin():
+    client = _client()
+    env = dict(os.environ, TOME_HOME=client.cache_folder, PYTHONPATH=REPO_FOLDER)
+    proc = subprocess.run(
+        [sys.executable, "-m", "tome", "batch", "-"],
+        input="greetings:hello stdin\nconfig home\n",
+        cwd=client.current_folder,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.splitlines() == ["Hello stdin", client.cache_folder]
+
+
+def test_batch_json_summary():
+    client = _client()
+    batch = ["greetings:hello one", ["greetings:hello", "two words"], "greetings:fail x", "greetings:unknown"]
+    client.save({"batch.json": json.dumps(batch)})
+    client.run("batch batch.json --format json", assert_error=True)
+    result = json.loads(client.stdout)
+    commands = result["commands"]
+    assert [command["exit_code"] for command in commands] == [0, 0, 7, 1]
+    assert [command["output"] for command in commands[:2]] == ["Hello one\n", "Hello two words\n"]
+    assert commands[1]["command"] == "greetings:hello 'two words'"
+    assert result["total"] == 4
+    assert "2 of 4 command lines failed: greetings:fail x" in client.stderr
+
+    client.save({"batch.yml": "- greetings:fail x\n- greetings:hello one\n"})
+    client.run("batch batch.yml --fail-fast --format json", assert_error=True)
+    result = json.loads(client.stdout)
+    assert [command["command"] for command in result["commands"]] == ["greetings:fail x"]
+    assert result["total"] == 2
+
+
+def test_batch_errors():
+    client = TestClient()
+    client.run("batch missing.txt", assert_error=True)
+    assert "Could not read the batch file 'missing.txt'" in client.stderr
+    client.save({"batch.json": '{"command": "list"}'})
+    client.run("batch batch.json", assert_error=True)
+    assert "A batch must be a list of command lines" in client.stderr
+    client.save({"batch.txt": 'list "unclosed'})
+    client.run("batch batch.txt", assert_error=True)
+    assert "Invalid command line in the batch 'list \"unclosed'" in client.stderr
@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+from tome.internal.cache import TomePaths
+from tome.internal.completion import complete
+
+from tests.utils.tools import TestClient
+
+
+def test_completion_updated_with_the_installed_commands():
+    client = TestClient()
+    script = textwrap.dedent('''
+        from tome.command import tome_command
+
+        @tome_command()
+        def hello(tome_api, parser, *args):
+            """Say hello."""
+            parser.add_argument("--name")
+
+        @tome_command(parent=hello)
+        def world(tome_api, parser, *args):
+            """Say hello to the world."""
+            parser.add_argument("--loud", action="store_true")
+    ''')
+    client.save({os.path.join("origin", "greetings", "greet.py"): script})
+    client.save({os.path.join("editable", "other", "tome_bye.sh"): "#!/bin/sh\necho bye\n"})
+    client.run("install origin")
+    client.run("install editable -e")
+
+    assert complete(client.cache_folder, ["gr"]) == ["greetings:hello"]
+    assert complete(client.cache_folder, ["other:"]) == ["other:bye-sh"]
+    assert "install" in complete(client.cache_folder, [""])
+    assert complete(client.cache_folder, ["greetings:hello", "--n"]) == ["--name"]
+    assert complete(client.cache_folder, ["greetings:hello", ""]) == ["world"]
+    assert complete(client.cache_folder, ["greetings:hello", "world", "--l"]) == ["--loud"]
+    assert complete(client.cache_folder, ["vault", "cr"]) == ["create"]
+    assert complete(client.cache_folder, ["list", "--f"]) == ["--format"]
+    assert complete(client.cache_folder, ["--v"]) == ["--version"]
+
+    client.run(f"uninstall '{os.path.join(client.current_folder, 'origin')}'")
+    assert complete(client.cache_folder, ["gr"]) == []
+
+    # Regenerated if missing, e.g. for homes from older versions
+    os.remove(TomePaths(client.cache_folder).completion_path)
+    assert complete(client.cache_folder, ["other:"]) == ["other:bye-sh"]
+
+
+def test_complete_entry_point():
+    client = TestClient()
+    client.run("new greetings:hello")
+    client.run("install .")
+    repo_folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, TOME_HOME=client.cache_folder, PYTHONPATH=repo_folder)
+
+    def run(*args):
+        command = [sys.executable, "-m", "tome", "__complete", *args]
+        return subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+
+    assert run("--", "greetings:h") == "greetings:hello\n"
+    assert run("--line", "tome greetings:hello ") == ""
+    assert run("--line", "tome conf") == "config\n"
+    assert "complete -o default -F _tome_complete tome" in run("--script", "bash")
+    # Completing doesn't show the commands of the home help
+    assert "__complete" not in run("--", "")
+
+
+def test_completion_same_command_as_registered():
+    # The options completed are the ones of the command that runs when the names collide
+    client = TestClient()
+    for origin in ("first", "second", "editable"):
+        script = textwrap.dedent(f"""
+            from tome.command import tome_command
+
+            @tome_command()
+            def hello(tome_api, parser, *args):
+                parser.add_argument("--{origin}")
+                print("Running {origin}")
+        """)
+        client.save({os.path.join(origin, "greetings", "greet.py"): script})
+    client.run("install first")
+    client.run("install second")
+    client.run("greetings:hello")
+    assert "Running first" in client.out
+    assert complete(client.cache_folder, ["greetings:hello", "--"]) == ["--first", "--help", "--quiet", "--verbose"]
+
+    client.run("install editable -e")
+    client.run("greetings:hello")
+    assert "Running editable" in client.out
+    assert complete(client.cache_folder, ["greetings:hello", "--"]) == ["--editable", "--help", "--quiet", "--verbose"]
@@ -0,0 +1,145 @@
+import json
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+import pytest
+
+from tome.errors import TomeException
+from tome.internal.cache import TomePaths
+from tome.internal.daemon import forward, is_supported
+
+from tests.utils.files import temp_folder
+from tests.utils.tools import TestClient
+
+pytestmark = pytest.mark.skipif(not is_supported(), reason="The daemon needs fork() and passing file descriptors")
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _tome(client, *args, cwd=None, check=True):
+    env = dict(os.environ, TOME_HOME=client.cache_folder, PYTHONPATH=REPO_FOLDER)
+    env.pop("TOME_TRACE", None)
+    proc = subprocess.run(
+        [sys.executable, "-m", "tome", *args],
+        cwd=cwd or client.current_folder,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if check:
+        assert proc.returncode == 0, proc.stdout + proc.stderr
+    return proc
+
+
+def _command(name, body):
+    return textwrap.dedent(f'''
+        import os
+        from tome.command import tome_command
+        from tome.api.output import TomeOutput
+
+        @tome_command()
+        def {name}(tome_api, parser, *args):
+            """Command {name}"""
+            args = parser.parse_args(*args)
+            {body}
+        ''')
+
+
+def test_daemon_runs_the_commands():
+    client = TestClient()
+    body = 'TomeOutput(stdout=True).print(f"{os.getcwd()}|{os.getenv(\'MY_VAR\')}|{os.getpid()}")'
+    client.save({os.path.join("origin", "greetings", "greet.py"): _command("hello", body)})
+    client.save({os.path.join("editable", "other", "fail.py"): _command("fail", "raise SystemExit(7)")})
+    client.run("install origin")
+    client.run("install editable -e")
+
+    _tome(client, "daemon", "start")
+    try:
+        assert "tome daemon running" in _tome(client, "daemon", "status").stdout
+        daemon_pid = json.loads(_tome(client, "daemon", "status", "-f", "json").stdout)["pid"]
+
+        # Runs in a process forked from the daemon, with the cwd and environment of the client
+        os.environ["MY_VAR"] = "my value"
+        try:
+            out = _tome(client, "greetings:hello", cwd=os.path.join(client.current_folder, "origin")).stdout
+        finally:
+            del os.environ["MY_VAR"]
+        cwd, value, pid = out.strip().split("|")
+        assert cwd == os.path.join(client.current_folder, "origin")
+        assert value == "my value"
+        assert int(pid) != daemon_pid
+
+        # Exit codes and errors are reported to the client
+        proc = _tome(client, "other:fail", check=False)
+        assert proc.returncode == 7
+        assert "Exiting with code: 7" in proc.stderr
+        proc = _tome(client, "greetings:unknown", check=False)
+        assert proc.returncode == 1
+        assert "Unknown command greetings:unknown" in proc.stderr
+
+        # Installing and modifying editables reloads the commands
+        client.save({os.path.join("origin2", "more", "greet.py"): _command("bye", body)})
+        _tome(client, "install", "origin2")
+        assert "more:bye" in _tome(client, "list").stdout
+        client.save({os.path.join("editable", "other", "fail.py"): _command("fail", "raise SystemExit(3)")})
+        assert _tome(client, "other:fail", check=False).returncode == 3
+        client.save({os.path.join("editable", "other", "new.py"): _command("new", "raise SystemExit(4)")})
+        assert _tome(client, "other:new", check=False).returncode == 4
+    finally:
+        _tome(client, "daemon", "stop")
+
+    assert "tome daemon not running" in _tome(client, "daemon", "status").stdout
+    assert not os.path.exists(TomePaths(client.cache_folder).daemon_socket_path)
+    assert _tome(client, "daemon", "stop", check=False).returncode == 1
+
+
+def test_daemon_imports_the_commands_with_the_client_environment():
+    # The module level code of the commands runs with the cwd of every client, like without the daemon
+    client = TestClient()
+    command = _command("where", 'TomeOutput(stdout=True).print(MODULE_CWD)')
+    client.save({os.path.join("origin", "greetings", "where.py"): "import os\nMODULE_CWD = os.getcwd()\n" + command})
+    client.run("install origin")
+    first, second = (os.path.join(client.current_folder, folder) for folder in ("first", "second"))
+    client.save({os.path.join(first, "file"): "", os.path.join(second, "file"): ""})
+
+    _tome(client, "daemon", "start")
+    try:
+        assert _tome(client, "greetings:where", cwd=first).stdout.strip() == first
+        assert _tome(client, "greetings:where", cwd=second).stdout.strip() == second
+    finally:
+        _tome(client, "daemon", "stop")
+
+
+def test_stale_socket_runs_in_process():
+    client = TestClient()
+    socket_path = TomePaths(client.cache_folder).daemon_socket_path
+    client.save({socket_path: ""})
+    assert forward(socket_path, ["--version"]) is None
+    assert _tome(client, "--version").stderr.strip()
+
+
+def test_socket_of_another_user_is_not_used(monkeypatch):
+    # The client would send its environment and terminal to whoever listens in the socket
+    client = TestClient()
+    socket_path = TomePaths(client.cache_folder).daemon_socket_path
+    client.save({socket_path: ""})
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(socket_path).st_uid + 1)
+    assert forward(socket_path, ["--version"]) is None
+
+
+def test_long_home_socket_in_private_folder(monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", temp_folder())
+    home = os.path.join(temp_folder(), "a" * 100)
+    socket_path = TomePaths(home).daemon_socket_path
+    folder = os.path.dirname(socket_path)
+    assert os.path.dirname(folder) == tempfile.tempdir
+    assert stat.S_IMODE(os.stat(folder).st_mode) == 0o700
+
+    # A folder created by someone else, or that others can access, is not used
+    os.chmod(folder, 0o777)
+    with pytest.raises(TomeException, match="only accessible by its owner"):
+        TomePaths(home).daemon_socket_path
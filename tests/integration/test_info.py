@@ -1,3 +1,4 @@
+import json
 import os
 import platform
 import shutil
@@ -29,6 +30,10 @@ def test_info():
     assert "name: mycommand2" in client.stdout
     assert "namespace: mynamespace" in client.stdout
     assert "type: cache" in client.stdout
+    client.run("info mynamespace:mycommand --format ndjson")
+    record = json.loads(client.stdout)
+    assert record["name"] == "mycommand" and record["type"] == "cache"
+    assert client.stdout.count("\n") == 1
     client.run("uninstall tome_commands")
 
     # try with editables
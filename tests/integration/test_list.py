@@ -5,6 +5,9 @@ from time import sleep
 
 import pytest
 
+from tome.command import CommandType
+from tome.errors import TomeException
+from tome.internal import installer
 from tome.internal.cache import TomePaths
 from tome.internal.utils.files import mkdir, rmdir
 
@@ -127,9 +130,9 @@ def test_list_failed_imported():
     )
     client.run("install .")
     client.run("list")
-    assert "Error: Error loading command 'greet.py' from" in client.out
-    # the command listing will fail, we need to make the import lazy if we want to fix this
-    assert "Loading command failed: No module named" in client.out
+    # listing uses the index written at install time, the module is not imported
+    assert "Error: Error loading command 'greet.py' from" not in client.out
+    assert "hello:mycommand      Placeholder for a new tome script." in client.out
     # if we try to run the command we get a message about the failed loading
     client.run("hello:mycommand", assert_error=True)
     assert "There was an error when installing the 'hello:mycommand' command" in client.out
@@ -167,6 +170,28 @@ def test_formats_json():
     assert json.loads(client.out) == expected_output
 
 
+def test_formats_ndjson():
+    client = TestClient()
+    client.run("new mynamespace:mycommand")
+    client.run("new mynamespace:othercommand")
+    client.run("install .")
+    client.run("list --format ndjson")
+
+    records = [json.loads(line) for line in client.stdout.splitlines()]
+    origin = os.path.abspath(client.current_folder)
+    assert records == [
+        {
+            "origin": origin,
+            "namespace": "mynamespace",
+            "name": name,
+            "doc": "Description of the command.",
+            "type": "cache",
+            "error": None,
+        }
+        for name in ("mycommand", "othercommand")
+    ]
+
+
 def test_grouped_output():
     client = TestClient()
     client.run(f"new namespace1:mycommand1")
@@ -257,3 +282,130 @@ def test_overlapped_commands():
     client.run(f"uninstall '{os.path.abspath(os.path.join(client.current_folder, 'someorigin'))}'")
     client.run("list --format=json")
     assert json.loads(client.out) == expected
+
+
+def test_list_does_not_import_installed_modules():
+    client = TestClient()
+    script = textwrap.dedent('''
+        from tome.command import tome_command
+        print("IMPORTED MODULE")
+
+        @tome_command()
+        def mycommand(tome_api, parser, *args):
+            """Placeholder for a new tome script."""
+            print("RUNNING COMMAND")
+    ''')
+    client.save({os.path.join("hello", "greet.py"): script})
+    client.run("install .")
+    client.run("list")
+    assert "hello:mycommand" in client.out
+    assert "IMPORTED MODULE" not in client.out
+    client.run("hello:mycommand")
+    assert "IMPORTED MODULE" in client.out
+    assert "RUNNING COMMAND" in client.out
+
+
+def test_list_origin_without_index():
+    """
+    Origins installed by older tome versions don't have an index, their modules are imported
+    """
+    client = TestClient()
+    client.run("new mynamespace:mycommand")
+    client.run("install .")
+    scripts_path = TomePaths(client.cache_folder).scripts_path
+    for origin in os.listdir(scripts_path):
+        os.remove(os.path.join(scripts_path, origin, "tome_index.json"))
+    client.run("list")
+    assert "mynamespace:mycommand" in client.out
+    client.run("mynamespace:mycommand hello")
+    assert "hello" in client.out
+
+
+def test_list_does_not_import_editable_modules():
+    client = TestClient()
+    script = textwrap.dedent('''
+        from tome.command import tome_command
+        print("IMPORTED MODULE")
+
+        @tome_command()
+        def mycommand(tome_api, parser, *args):
+            """Placeholder for a new tome script."""
+            print("RUNNING COMMAND")
+
+        @tome_command()
+        def other(tome_api, parser, *args):
+            """Another command."""
+    ''')
+    client.save({os.path.join("hello", "greet.py"): script})
+    client.run("install . -e")
+    client.run("list")
+    assert "hello:mycommand (e)" in client.out
+    assert "IMPORTED MODULE" not in client.out
+    client.run("hello:mycommand")
+    assert "IMPORTED MODULE" in client.out
+    assert "RUNNING COMMAND" in client.out
+
+
+def test_list_editable_changes():
+    client = TestClient()
+    script = textwrap.dedent('''
+        from tome.command import tome_command
+
+        @tome_command()
+        def mycommand(tome_api, parser, *args):
+            """{}"""
+    ''')
+    client.save({os.path.join("hello", "greet.py"): script.format("First description.")})
+    client.run("install . -e")
+    client.run("list")
+    assert "First description." in client.out
+    assert os.path.isfile(TomePaths(client.cache_folder).editables_cache_path)
+    client.save({os.path.join("hello", "greet.py"): script.format("Second longer description.")})
+    client.run("list")
+    assert "Second longer description." in client.out
+
+
+def test_list_reads_only_matching_origins():
+    client = TestClient()
+    with client.chdir("origin1"):
+        client.run("new greetings:hello")
+        client.run("install .")
+    with client.chdir("origin2"):
+        client.run("new deployments:deploy")
+        client.run("install .")
+
+    client.run("list hello")
+    cli = client.api.list.cli
+    assert [name for name, info in cli.commands.items() if info.type == CommandType.cache] == ["greetings:hello"]
+    client.run("info deployments:deploy")
+    cli = client.api.list.cli
+    assert [name for name, info in cli.commands.items() if info.type == CommandType.cache] == ["deployments:deploy"]
+
+    # Origins missing in the search index, like the ones installed by older versions, are always read
+    os.remove(TomePaths(client.cache_folder).search_index_path)
+    client.run("list hello")
+    assert "greetings:hello" in client.out
+    assert "deployments:deploy" not in client.out
+
+
+def test_list_finds_the_commands_after_failed_reinstall(monkeypatch):
+    client = TestClient()
+    client.run("new greetings:hello")
+    client.run("install .")
+    client.run("new newns:findme")
+
+    def fail(*args, **kwargs):
+        raise TomeException("Failed to install the requirements")
+
+    # Failing after writing the index, the search index has its commands
+    monkeypatch.setattr(installer, "_install_requirements", fail)
+    client.run("install .", assert_error=True)
+    client.run("list findme")
+    assert "newns:findme" in client.out
+
+    # Failing before writing it, the origin is read in every search
+    client.run("new other:findme-too")
+    monkeypatch.setattr(installer, "write_index", fail)
+    client.run("install .", assert_error=True)
+    client.run("list findme-too")
+    assert "other:findme-too" in client.out
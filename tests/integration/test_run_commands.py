@@ -1,9 +1,19 @@
+import json
 import os
 import sys
 import textwrap
 
+import pytest
+
 from tests.utils.tools import TestClient
-from tome.internal.utils.files import mkdir
+from tome.api.api import TomeAPI
+from tome.cli import Cli
+from tome.command import TomeShellCommand
+from tome.errors import TomeException
+from tome.internal import installer
+from tome.internal.cache import TomePaths
+from tome.internal.completion import complete
+from tome.internal.utils.files import load, mkdir
 
 
 def test_run_unexistent_command():
@@ -56,3 +66,119 @@ def test_run_shell_with_args():
     client.run(f"greetings:echo-{script_type} value1 value2")
     assert "First arg: value1" in str(client.stdout)
     assert "Second arg: value2" in str(client.stdout)
+
+
+def test_run_loads_only_the_namespace():
+    client = TestClient()
+    with client.chdir("origin1"):
+        client.run("new greetings:hello")
+        client.run("install .")
+    with client.chdir("origin2"):
+        client.run("new deployments:deploy")
+        client.run("install .")
+    with client.chdir("editables"):
+        client.run("new greetings:bye")
+        client.run("new other:command")
+        client.run("install . -e")
+
+    namespaces = json.loads(load(TomePaths(client.cache_folder).namespaces_path))["namespaces"]
+    assert sorted(namespaces) == ["deployments", "greetings"]
+
+    cli = Cli(TomeAPI(cache_folder=client.cache_folder))
+    cli.run(["greetings:hello", "world"])
+    assert sorted(cli.commands) == ["greetings:bye", "greetings:hello"]
+
+    client.run(f"uninstall '{os.path.join(client.current_folder, 'origin2')}'")
+    namespaces = json.loads(load(TomePaths(client.cache_folder).namespaces_path))["namespaces"]
+    assert list(namespaces) == ["greetings"]
+
+    # An unknown command in a known namespace still suggests commands from everywhere
+    client.run("greetings:helo", assert_error=True)
+    assert "greetings:hello" in client.out
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Uses a sh script")
+def test_run_shell_from_indexed_metadata(monkeypatch):
+    """The runner and description of installed scripts come from the index, the script is only executed"""
+    client = TestClient()
+    client.save(
+        {
+            os.path.join(client.current_folder, "greetings", "tome_hello.sh"): textwrap.dedent(
+                '''\
+                #!/bin/sh
+                # tome_description: Say hello
+                echo "Hello $1"
+                '''
+            )
+        }
+    )
+    client.run("install .")
+
+    def fail(script):
+        raise AssertionError(f"'{script}' should not be read")
+
+    monkeypatch.setattr(TomeShellCommand, "_get_runner_description", staticmethod(fail))
+    client.run("greetings:hello-sh --help")
+    assert "Say hello" in client.out
+    client.run("greetings:hello-sh world")
+    assert "Hello world" in client.stdout
+
+
+def test_suggest_similar_commands_and_namespaces():
+    client = TestClient()
+    with client.chdir("origin1"):
+        client.run("new greetings:hello")
+        client.run("install .")
+    with client.chdir("editables"):
+        client.run("new greetings:help-me")
+        client.run("install . -e")
+
+    client.run("greetings:helo", assert_error=True)
+    assert "The most similar commands are: \ngreetings:hello, greetings:help-me" in client.out
+    assert "namespace" not in client.out
+
+    client.run("greting:hello", assert_error=True)
+    assert "The most similar command is: \ngreetings:hello" in client.out
+    assert "The most similar namespace is: \ngreetings" in client.out
+
+    # Origins missing in the search index, like the ones installed by older versions, are also suggested
+    os.remove(TomePaths(client.cache_folder).search_index_path)
+    client.run("greetings:helo", assert_error=True)
+    assert "greetings:hello, greetings:help-me" in client.out
+
+
+def test_run_new_namespace_after_failed_reinstall(monkeypatch):
+    # Failing after copying the files leaves the new version installed, its namespaces must be found
+    client = TestClient()
+    client.run("new greetings:hello")
+    client.run("install .")
+    client.run("new newns:cmd")
+
+    def fail(*args, **kwargs):
+        raise TomeException("Failed to install the requirements")
+
+    monkeypatch.setattr(installer, "_install_requirements", fail)
+    client.run("install .", assert_error=True)
+    client.run("newns:cmd world")
+    assert "world" in client.out
+    assert complete(client.cache_folder, ["newns:"]) == ["newns:cmd"]
+
+
+def test_run_command_imported_from_another_module():
+    client = TestClient()
+    script = textwrap.dedent('''
+        from tome.api.output import TomeOutput
+        from tome.command import tome_command
+
+        @tome_command()
+        def shared(tome_api, parser, *args):
+            """Defined in a helper module."""
+            args = parser.parse_args(*args)
+            TomeOutput(stdout=True).print("Shared command")
+    ''')
+    client.save({"common/helpers.py": script, "greetings/hello.py": "from common.helpers import shared\n"})
+    client.run("install .")
+    client.run("greetings:shared")
+    assert "Shared command" in client.out
+    client.run("list shared")
+    assert "greetings:shared" in client.out
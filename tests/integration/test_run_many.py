@@ -0,0 +1,81 @@
+import json
+import os
+import textwrap
+
+import pytest
+
+from tome.internal.parallel import can_fork
+
+from tests.utils.tools import TestClient
+
+pytestmark = pytest.mark.skipif(not can_fork(), reason="Without fork the command lines run in new tome processes")
+
+CHECK = textwrap.dedent('''
+    import os
+    from tome.command import tome_command
+    from tome.api.output import TomeOutput
+
+    @tome_command()
+    def check(tome_api, parser, *args):
+        """Check a target"""
+        parser.add_argument("target")
+        parser.add_argument("--fail", action="store_true")
+        args = parser.parse_args(*args)
+        TomeOutput(stdout=True).print(f"checking {args.target}")
+        TomeOutput(stdout=True).print(f"pid {os.getpid()}")
+        TomeOutput().warning(f"checked {args.target}")
+        if args.fail:
+            raise SystemExit(3)
+    ''')
+
+
+def _client():
+    client = TestClient()
+    client.save({os.path.join("scripts", "deploy", "check.py"): CHECK})
+    client.run("install scripts")
+    client.save({"targets.txt": 'one\n"two words"\nthree --fail\n'})
+    return client
+
+
+def test_run_many_prefixes_the_output():
+    client = _client()
+    client.run("run-many -j 3 --command deploy:check targets.txt", assert_error=True)
+    stdout = client.stdout.splitlines()
+    assert "[one] checking one" in stdout
+    assert "['two words'] checking two words" in stdout
+    assert "[three --fail] checking three" in stdout
+    # Every command line runs in its own forked process
+    pids = {line.split()[-1] for line in stdout if " pid " in line}
+    assert len(pids) == 3 and str(os.getpid()) not in pids
+    assert "['two words'] Warning: checked two words" in client.stderr
+    assert "[three --fail] Error: Exiting with code: 3" in client.stderr
+    assert "1 of 3 command lines failed: deploy:check three --fail" in client.stderr
+
+    client.save({"commands.txt": "deploy:check one\nconfig home\n"})
+    client.run("run-many commands.txt")
+    assert f"[config home] {client.cache_folder}" in client.stdout.splitlines()
+
+
+def test_run_many_group_and_json():
+    client = _client()
+    client.run("run-many -j 2 --group --command deploy:check targets.txt --format json", assert_error=True)
+    result = json.loads(client.stdout)
+    commands = result["commands"]
+    assert [command["command"] for command in commands] == [
+        "deploy:check one",
+        "deploy:check 'two words'",
+        "deploy:check three --fail",
+    ]
+    assert [command["exit_code"] for command in commands] == [0, 0, 3]
+    assert commands[1]["output"].startswith("checking two words\n")
+    # The stderr of every command line is printed together, without prefixes
+    assert "Warning: checked two words\n" in client.stderr
+
+    client.save({"targets.txt": "one --fail\ntwo\nthree\n"})
+    client.run("run-many -j 1 --fail-fast --command deploy:check targets.txt --format json", assert_error=True)
+    result = json.loads(client.stdout)
+    assert [command["command"] for command in result["commands"]] == ["deploy:check one --fail"]
+    assert result["total"] == 3
+
+    client.run("run-many -j 0 targets.txt", assert_error=True)
+    assert "The number of jobs must be at least 1" in client.stderr
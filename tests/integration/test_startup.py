@@ -0,0 +1,104 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+from tome.cli import main
+from tome.internal.utils.files import chdir, load
+
+from tests.benchmarks.registry import run_benchmark
+from tests.benchmarks.startup import compare, run_benchmarks
+from tests.benchmarks.startup import main as startup_main
+from tests.utils.files import temp_folder
+from tests.utils.tools import TestClient, environment_update
+
+# Maximum cumulative import time of tome.cli in microseconds for the simplest invocations
+IMPORT_TIME_BUDGET_US = 400_000
+HEAVY_MODULES = ["sqlalchemy", "cryptography", "yaml", "requests", "rich"]
+
+
+def _import_times(*args):
+    repo_folder = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, TOME_HOME=temp_folder(), PYTHONPATH=repo_folder)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "tome", *args],
+        cwd=temp_folder(),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_version_import_time():
+    times = _import_times("--version")
+    assert "tome.cli" in times
+    for module in HEAVY_MODULES:
+        assert module not in times, f"'{module}' should not be imported by 'tome --version'"
+    assert times["tome.cli"] < IMPORT_TIME_BUDGET_US
+
+
+def test_list_does_not_import_heavy_modules():
+    times = _import_times("list")
+    for module in ["sqlalchemy", "cryptography", "yaml", "requests"]:
+        assert module not in times, f"'{module}' should not be imported by 'tome list'"
+
+
+def test_trace_startup():
+    client = TestClient()
+    client.run("new mynamespace:mycommand")
+    client.run("install .")
+    trace_file = os.path.join(client.current_folder, "trace.json")
+    handlers = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+    try:
+        with environment_update({"TOME_HOME": client.cache_folder}), chdir(client.current_folder):
+            with pytest.raises(SystemExit) as exit_info:
+                main(["--trace-startup", trace_file, "mynamespace:mycommand", "hello"])
+    finally:
+        signal.signal(signal.SIGINT, handlers[0])
+        signal.signal(signal.SIGTERM, handlers[1])
+    assert exit_info.value.code == 0
+
+    phases = {phase["name"]: phase for phase in json.loads(load(trace_file))["phases"]}
+    for name in ["TomeAPI", "get_tome_home", "_add_cache_commands", "_add_tome_commands_in_module"]:
+        assert name in phases
+    assert phases["_add_tome_commands_in_module"]["args"]["module"] == "mycommand"
+    assert phases["command_execution"]["args"] == {"command": "mynamespace:mycommand"}
+
+
+def test_startup_benchmarks():
+    results = run_benchmarks([1], repeat=1, scenarios=["list", "run"])
+    measures = results["results"]["1"]
+    assert sorted(measures) == ["list", "run"]
+    assert measures["list"]["wall_ms"]["median"] > 0
+
+    rows, regressions = compare(results, results, tolerance=0.25)
+    assert rows and all(row[-1] == 1 for row in rows) and not regressions
+    baseline = json.loads(json.dumps(results))
+    baseline["results"]["1"]["run"]["wall_ms"]["median"] /= 2
+    _, regressions = compare(results, baseline, tolerance=0.25)
+    assert [row[:3] for row in regressions] == [("1", "run", "wall_ms")]
+
+
+def test_startup_benchmark_without_baseline(capsys):
+    with pytest.raises(SystemExit):
+        startup_main(["--compare", "missing.json"])
+    assert "measure it first with --output missing.json" in capsys.readouterr().err
+
+
+def test_registry_memory_benchmark():
+    result = run_benchmark(commands=400)
+    # 20 origins with 1 to 3 namespaces of 10 modules with one command and a script, plus the built-ins
+    assert result["commands"] > 400
+    # Generous bound, registering the commands shouldn't import them nor build their parsers
+    assert 0 < result["bytes_per_command"] < 2000
@@ -0,0 +1,154 @@
+import json
+import os
+
+from tome.internal.utils.files import chdir, load, save
+
+from tests.utils.runners import check_output_runner
+from tests.utils.scm import git_add_changes_commit
+from tests.utils.tools import TestClient
+
+
+def _installed_folder(client):
+    scripts_folder = os.path.join(client.cache_folder, "scripts")
+    return os.path.join(scripts_folder, os.listdir(scripts_folder)[0])
+
+
+def test_update_folder():
+    client = TestClient()
+    client.run("new mynamespace:mycommand")
+    client.save({"mynamespace/other.py": "# Not a command", "mynamespace/old/data.txt": "data"})
+    client.run("install .")
+    installed = _installed_folder(client)
+    unchanged = os.path.join(installed, "mynamespace", "other.py")
+    mtime = os.stat(unchanged).st_mtime_ns
+
+    client.run("update .")
+    assert "Source up to date" in client.out
+
+    command = load(os.path.join(client.current_folder, "mynamespace", "mycommand.py"))
+    client.save({"mynamespace/mycommand.py": command.replace("(msg))", '("Updated: " + msg))')})
+    client.save({"mynamespace/new.py": "# Not a command"})
+    os.remove(os.path.join(client.current_folder, "mynamespace", "old", "data.txt"))
+    client.run("update . -v")
+    assert "Copied 2 files. Removed 1 files." in client.out
+    assert "Updated source" in client.out
+    assert os.stat(unchanged).st_mtime_ns == mtime
+    assert os.path.exists(os.path.join(installed, "mynamespace", "new.py"))
+    assert not os.path.exists(os.path.join(installed, "mynamespace", "old"))
+    client.run("mynamespace:mycommand hello")
+    assert "Updated: hello" in client.out
+
+    client.run("update . -f json")
+    assert json.loads(client.stdout)[0]["updated"] is False
+
+
+def test_update_git():
+    client = TestClient()
+    repo_folder = os.path.join(client.current_folder, "repo")
+    with client.chdir(repo_folder):
+        client.run("new mynamespace:mycommand")
+    old_commit = client.init_git_repo(folder=repo_folder)
+    with chdir(repo_folder):
+        check_output_runner("git tag v1.0")
+    uri = "file://" + repo_folder.replace("\\", "/") + "/.git"
+    client.run(f"install '{uri}'")
+
+    # The mirror resolves the same commit, nothing is exported
+    client.run(f"update '{uri}' -v")
+    assert "Source up to date" in client.out
+    assert "Copied" not in client.out
+
+    command = load(os.path.join(repo_folder, "mynamespace", "mycommand.py"))
+    save(os.path.join(repo_folder, "mynamespace", "mycommand.py"), command.replace("(msg))", '("Updated: " + msg))'))
+    new_commit = git_add_changes_commit(repo_folder)
+    client.run(f"update '{uri}'")
+    assert f"Commit: {new_commit}" in client.out
+    client.run("mynamespace:mycommand hello")
+    assert "Updated: hello" in client.out
+
+    client.run(f"update '{uri}@v1.0'")
+    assert f"Commit: {old_commit}" in client.out
+    tome_source = json.loads(load(os.path.join(_installed_folder(client), "tome_source.json")))
+    assert tome_source["version"] == "v1.0" and tome_source["commit"] == old_commit
+    client.run("mynamespace:mycommand hello")
+    assert "hello" in client.out and "Updated: hello" not in client.out
+
+
+def test_update_requirements_only_if_changed():
+    client = TestClient()
+    client.run("new mynamespace:mycommand")
+    client.save({"requirements.txt": "pyyaml"})
+    client.run("install . -v")
+    assert "Requirement already satisfied" in client.out
+
+    client.save({"mynamespace/other.py": "# Not a command"})
+    client.run("update . -v")
+    assert "Updated source" in client.out
+    assert "Requirement already satisfied" not in client.out
+
+    client.save({"requirements.txt": "pyyaml\n"})
+    client.run("update . -v")
+    assert "Requirement already satisfied" in client.out
+
+
+def test_update_all():
+    client = TestClient()
+    for name in ("first", "second"):
+        with client.chdir(os.path.join(client.current_folder, name)):
+            client.run(f"new {name}:mycommand")
+            client.run("install .")
+    client.save({"first/first/other.py": "# Not a command"})
+    client.run("update --all -f json")
+    results = {os.path.basename(result["uri"]): result["updated"] for result in json.loads(client.stdout)}
+    assert results == {"first": True, "second": False}
+
+    client.save({"second/second/mycommand.py": "# Not a command anymore"})
+    client.run("update --all", assert_error=True)
+    output = " ".join(client.out.split())
+    assert "No valid tome commands were found" in output
+    assert "1 of 2 sources failed to update" in output
+    client.run("second:mycommand hello")
+    assert "hello" in client.out
+
+
+def test_update_errors():
+    client = TestClient()
+    client.run("update", assert_error=True)
+    assert "Specify the source of the tome to update or --all" in client.out
+    client.run("new mynamespace:mycommand")
+    client.run("update .", assert_error=True)
+    assert "is not installed" in client.out
+
+
+def test_update_without_manifest():
+    # Origins installed by older tome versions are installed again
+    client = TestClient()
+    client.run("new mynamespace:mycommand")
+    client.run("install .")
+    os.remove(os.path.join(_installed_folder(client), "tome_manifest.json"))
+    client.run("update .")
+    assert "Updated source" in client.out
+    assert os.path.exists(os.path.join(_installed_folder(client), "tome_manifest.json"))
+    client.run("mynamespace:mycommand hello")
+    assert "hello" in client.out
+
+
+def test_update_git_branch_named_like_a_commit():
+    # A branch can look like an abbreviated commit, it is still fetched
+    client = TestClient()
+    repo_folder = os.path.join(client.current_folder, "repo")
+    with client.chdir(repo_folder):
+        client.run("new mynamespace:mycommand")
+    client.init_git_repo(folder=repo_folder)
+    with chdir(repo_folder):
+        check_output_runner("git branch cafe123")
+    uri = "file://" + repo_folder.replace("\\", "/") + "/.git"
+    client.run(f"install '{uri}@cafe123'")
+
+    with chdir(repo_folder):
+        check_output_runner("git checkout -q cafe123")
+    save(os.path.join(repo_folder, "mynamespace", "other.py"), "# Not a command")
+    new_commit = git_add_changes_commit(repo_folder)
+    client.run(f"update '{uri}' -v")
+    assert "Fetching" in client.out
+    assert f"Commit: {new_commit}" in client.out
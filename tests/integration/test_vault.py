@@ -1,3 +1,4 @@
+import json
 import os
 import textwrap
 from tests.utils.tools import TestClient
@@ -35,6 +36,15 @@ def test_vault_commands():
     assert "Vault 'foo' secrets" in client.out
     assert "token_4       my token token_4" in client.out
 
+    client.run("vault list-secrets --format ndjson")
+    records = sorted((json.loads(line) for line in client.stdout.splitlines()), key=lambda record: record["secret"])
+    assert records == [
+        {"vault": "default", "secret": "token_1", "description": "my token token_1"},
+        {"vault": "default", "secret": "token_2", "description": "No description"},
+        {"vault": "default", "secret": "token_3", "description": "my token token_3"},
+        {"vault": "foo", "secret": "token_4", "description": "my token token_4"},
+    ]
+
     client.run("vault delete-secret token_4 -vn foo -p bar")
     assert "Secret 'token_4' deleted from 'foo' vault" in client.out
 
@@ -0,0 +1,42 @@
+import pytest
+
+from tome.command import TomeArgumentParser, tome_command
+
+
+def test_parsers_built_on_demand(monkeypatch):
+    built = []
+    original_init = TomeArgumentParser.__init__
+
+    def init(parser, *args, **kwargs):
+        built.append(kwargs.get("prog"))
+        original_init(parser, *args, **kwargs)
+
+    monkeypatch.setattr(TomeArgumentParser, "__init__", init)
+
+    @tome_command(formatters={"json": print})
+    def parent(tome_api, parser, *args):
+        """Parent command"""
+
+    @tome_command(parent=parent)
+    def child(tome_api, parser, *args):
+        """Child command"""
+        parser.add_argument("--force", action="store_true")
+        return parser.parse_args(*args)
+
+    @tome_command()
+    def other(tome_api, parser, *args):
+        """Other command"""
+
+    assert built == []
+    assert parent.subcommands == {"child": child}
+
+    # Running a subcommand builds the parsers of its tree only
+    child.run(None, ["--force"])
+    assert built == ["tome parent", "tome parent child"]
+    assert child.parser.parse_args(["--force"]).force
+    assert parent.parser.parse_args(["-f", "json", "child"]).parent_subcommand == "child"
+    assert len(built) == 2
+
+    with pytest.raises(SystemExit):
+        parent.parser.parse_args([])
+    assert other._parser is None
@@ -0,0 +1,171 @@
+import json
+import os
+import textwrap
+
+from tome.internal.cache import installation_state
+from tome.internal.index import ScanCache, read_index, scan_module, scan_origin, write_index
+from tome.internal.utils.files import load, save
+
+from tests.utils.files import temp_folder
+
+
+def test_scan_module():
+    folder = temp_folder()
+    module = os.path.join(folder, "mymodule.py")
+    save(
+        module,
+        textwrap.dedent('''
+            from tome import command
+            from tome.command import tome_command
+
+            def print_json(result):
+                pass
+
+            @tome_command(formatters={"json": print_json})
+            def say_hello(tome_api, parser, *args):
+                """
+                Say hello.
+                """
+                parser.add_argument("-n", "--name", help="Who to greet")
+                parser.add_argument("positional")
+                other.add_argument("--not-this-parser")
+
+            @tome_command(parent=say_hello)
+            def sub(tome_api, sub_parser, *args):
+                """Subcommands are not listed as commands"""
+                sub_parser.add_argument("--force", action="store_true")
+
+            @command.tome_command()
+            def another(tome_api, parser, *args):
+                pass
+
+            def not_a_command():
+                pass
+            '''),
+    )
+    commands = scan_module(module)
+    assert [c["name"] for c in commands] == ["another", "say-hello"]
+    assert commands[0]["doc"] == "No description provided for this command."
+    assert commands[1]["doc"] == "Say hello."
+    assert commands[1]["formatters"] == ["json"]
+    assert commands[1]["options"] == ["-n", "--name"]
+    assert commands[1]["subcommands"] == {
+        "sub": {
+            "doc": "Subcommands are not listed as commands",
+            "formatters": [],
+            "options": ["--force"],
+            "subcommands": {},
+        }
+    }
+
+
+def test_write_read_index():
+    folder = temp_folder()
+    save(
+        os.path.join(folder, "greetings", "hello.py"),
+        textwrap.dedent('''
+            from tome.command import tome_command
+
+            @tome_command()
+            def hello(tome_api, parser, *args):
+                """Saying hello."""
+            '''),
+    )
+    save(os.path.join(folder, "greetings", "broken.py"), "def broken(:\n")
+    save(os.path.join(folder, "greetings", "tome_bye.sh"), "#!/bin/bash\n# tome_description: Saying bye\n")
+    save(os.path.join(folder, "tome_source.json"), "{}")
+
+    assert read_index(folder) is None
+    write_index(folder)
+    entries = read_index(folder)
+    assert entries == scan_origin(folder)
+
+    by_name = {entry["name"]: entry for entry in entries}
+    assert by_name["hello"]["doc"] == "Saying hello."
+    assert by_name["hello"]["path"] == os.path.join("greetings", "hello.py")
+    assert by_name["bye-sh"]["runner"] == ["/bin/bash"]
+    assert by_name["bye-sh"]["doc"] == "Saying bye"
+    assert by_name[None]["module_name"] == "broken"
+    assert by_name[None]["error"]
+
+
+def test_read_index_invalid():
+    folder = temp_folder()
+    save(os.path.join(folder, "tome_index.json"), "not json")
+    assert read_index(folder) is None
+    save(os.path.join(folder, "tome_index.json"), '{"version": 0, "commands": []}')
+    assert read_index(folder) is None
+
+
+def test_scan_cache():
+    folder = temp_folder()
+    module = os.path.join(folder, "mymodule.py")
+    save(module, "from tome.command import tome_command\n")
+    cache_file = os.path.join(folder, "cache.json")
+    scanned = []
+
+    def scan(file_path):
+        scanned.append(file_path)
+        return scan_module(file_path)
+
+    cache = ScanCache(cache_file)
+    assert cache.get(module, scan) == []
+    cache.save()
+    assert scanned == [module]
+
+    # A new cache loaded from disk doesn't scan the unmodified file again
+    cache = ScanCache(cache_file)
+    assert cache.get(module, scan) == []
+    assert scanned == [module]
+
+    save(module, "from tome.command import tome_command\n@tome_command()\ndef hello(tome_api, parser):\n    pass\n")
+    assert [c["name"] for c in cache.get(module, scan)] == ["hello"]
+    assert scanned == [module, module]
+    cache.save()
+
+    # Files not used anymore are pruned
+    cache = ScanCache(cache_file)
+    cache.save(prune=True)
+    assert json.loads(load(cache_file))["files"] == {}
+
+
+def test_installation_state_editables():
+    cache_folder = temp_folder()
+    editable = temp_folder()
+    save(os.path.join(cache_folder, "tome_editables.json"), json.dumps([{"source": editable}]))
+    module = os.path.join(editable, "mynamespace", "mycommand.py")
+    save(module, "# A command")
+    save(os.path.join(editable, "mynamespace", "data", "big.txt"), "data")
+    state = installation_state(cache_folder)
+
+    # Files that are not indexed don't change the state
+    save(os.path.join(editable, "mynamespace", "data", "big.txt"), "more data")
+    save(os.path.join(editable, "mynamespace", "README.md"), "readme")
+    os.remove(os.path.join(editable, "mynamespace", "README.md"))
+    assert installation_state(cache_folder) == state
+
+    save(module, "# A modified command")
+    modified = installation_state(cache_folder)
+    assert modified != state
+    save(os.path.join(editable, "mynamespace", "tome_script.sh"), "echo hello")
+    assert installation_state(cache_folder) != modified
+
+
+def test_scan_module_imported_commands():
+    # Commands imported from other modules of the origin are registered in these modules when imported
+    folder = temp_folder()
+    command = (
+        'from tome.command import tome_command\n\n@tome_command()\ndef {0}(tome_api, parser, *args):\n    """{0}"""\n'
+    )
+    save(os.path.join(folder, "common", "helpers.py"), command.format("shared") + command.format("_private"))
+    save(os.path.join(folder, "mynamespace", "__init__.py"), "")
+    save(os.path.join(folder, "mynamespace", "base.py"), command.format("relative"))
+    save(os.path.join(folder, "mynamespace", "star.py"), "from common.helpers import *\n")
+    main = os.path.join(folder, "mynamespace", "main.py")
+    save(
+        main,
+        "import os\nfrom os.path import join\nfrom common.helpers import shared as alias\n"
+        "from .base import relative\nfrom .main import alias as circular\n",
+    )
+    assert [c["name"] for c in scan_module(main)] == ["shared", "relative"]
+    assert [c["name"] for c in scan_module(os.path.join(folder, "mynamespace", "star.py"))] == ["shared"]
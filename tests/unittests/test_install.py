@@ -1,9 +1,16 @@
+import io
+import os
+import tarfile
 import tempfile
+import zipfile
 
 import pytest
 from tome.errors import TomeException
+from tome.internal.installer import process_folder, unpack_file, unpack_tar_stream
 from tome.internal.source import Source, SourceType
 
+from tests.utils.files import temp_folder
+
 
 @pytest.mark.parametrize(
     "source,expected_type",
@@ -28,3 +35,60 @@ def test_get_type(source, expected_type):
 def test_get_type_invalid(invalid_source):
     with pytest.raises(TomeException):
         Source.parse(invalid_source)
+
+
+def _archive_files():
+    return {
+        "release/tools/.tomeignore": "*.bin\n",
+        "release/tools/mynamespace/mycommand.py": "# command",
+        "release/tools/mynamespace/data.bin": "ignored",
+        "release/tools/.git/config": "ignored",
+        "release/big/data.txt": "not extracted",
+        "../outside.txt": "not extracted",
+    }
+
+
+def _extracted_files(folder):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), folder).replace(os.sep, "/")
+        for root, _, files in os.walk(folder)
+        for name in files
+    )
+
+
+def test_unpack_zip_folder():
+    folder = temp_folder()
+    archive = os.path.join(folder, "release.zip")
+    with zipfile.ZipFile(archive, "w") as z:
+        for name, content in _archive_files().items():
+            z.writestr(name, content)
+    destination = os.path.join(folder, "extracted")
+    unpack_file(archive, "release/tools/", destination)
+    assert _extracted_files(destination) == [".tomeignore", "mynamespace/mycommand.py"]
+
+    with pytest.raises(TomeException, match="Folder 'nonexistent' not found in the archive"):
+        unpack_file(archive, "nonexistent", os.path.join(folder, "other"))
+
+
+def test_unpack_tar_stream_folder():
+    # The .tomeignore is read after some of the files it ignores, they are ignored when copying them later
+    folder = temp_folder()
+    stream = io.BytesIO()
+    with tarfile.open(fileobj=stream, mode="w:gz") as tar:
+        for name, content in sorted(_archive_files().items(), key=lambda item: item[0].endswith(".tomeignore")):
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content.encode()))
+        link = tarfile.TarInfo("release/tools/link")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "/etc/passwd"
+        tar.addfile(link)
+    stream.seek(0)
+    destination = os.path.join(folder, "extracted")
+    unpack_tar_stream(stream, "release/tools", destination)
+    extracted = _extracted_files(destination)
+    assert extracted == [".tomeignore", "mynamespace/data.bin", "mynamespace/mycommand.py"]
+
+    installed = os.path.join(folder, "installed")
+    process_folder(destination, installed)
+    assert _extracted_files(installed) == ["mynamespace/mycommand.py"]
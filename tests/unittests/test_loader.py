@@ -0,0 +1,77 @@
+import importlib.util
+import os
+import sys
+
+from tome.internal.loader import (
+    PRIVATE_MODULES_PREFIX,
+    PYCACHE_FOLDER,
+    OriginImporter,
+    precompile_origin,
+    pycache_file,
+    spec_from_origin_file,
+)
+from tome.internal.utils.files import save
+
+from tests.utils.files import temp_folder
+
+
+def _load(name, path, origin_folder):
+    spec = spec_from_origin_file(name, path, origin_folder)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_precompile_origin():
+    origin = temp_folder()
+    module_file = os.path.join(origin, "greetings", "hello.py")
+    save(module_file, "VALUE = 'precompiled'\n")
+    save(os.path.join(origin, "greetings", "broken.py"), "def broken(:\n")
+    save(os.path.join(origin, ".tome_venv", "lib", "ignored.py"), "VALUE = 1\n")
+
+    assert precompile_origin(origin) == 1
+    pyc = pycache_file(origin, module_file)
+    assert pyc.startswith(os.path.join(origin, PYCACHE_FOLDER, "greetings", "hello."))
+    assert os.path.isfile(pyc)
+
+    # The bytecode is not validated against the source, the cache is only modified by tome
+    save(module_file, "VALUE = 'modified'\n")
+    assert _load("hello", module_file, origin).VALUE == "precompiled"
+    assert not os.path.exists(os.path.join(origin, "greetings", "__pycache__"))
+
+
+def test_no_precompiled_bytecode():
+    origin = temp_folder()
+    module_file = os.path.join(origin, "greetings", "hello.py")
+    save(module_file, "VALUE = 'source'\n")
+    assert _load("hello", module_file, origin).VALUE == "source"
+    assert _load("hello", module_file, None).VALUE == "source"
+
+
+def test_origin_importer_isolation():
+    origin = temp_folder()
+    namespace_folder = os.path.join(origin, "greetings")
+    module_file = os.path.join(namespace_folder, "hello.py")
+    save(
+        module_file,
+        "import colorsys\nfrom myhelper import VALUE\nfrom mypkg.sub import SUB\nfrom shared import SHARED\n",
+    )
+    save(os.path.join(namespace_folder, "myhelper.py"), "VALUE = 'helper'\n")
+    save(os.path.join(namespace_folder, "mypkg", "__init__.py"), "")
+    save(os.path.join(namespace_folder, "mypkg", "sub.py"), "SUB = 'sub'\n")
+    save(os.path.join(namespace_folder, "colorsys.py"), "raise Exception('shadowing an installed module')\n")
+    save(os.path.join(origin, "shared.py"), "SHARED = 'shared'\n")
+
+    old_path = sys.path[:]
+    old_meta_path = sys.meta_path[:]
+    importer = OriginImporter([origin, namespace_folder])
+    with importer:
+        module = _load(namespace_folder, module_file, None)
+    assert (module.VALUE, module.SUB, module.SHARED) == ("helper", "sub", "shared")
+    assert sys.path == old_path
+    assert sys.meta_path == old_meta_path
+    assert importer.prefix.startswith(PRIVATE_MODULES_PREFIX)
+    for name in ("myhelper", "mypkg", "mypkg.sub", "shared"):
+        assert name not in sys.modules
+        assert f"{importer.prefix}.{name}" in sys.modules
+    assert sys.modules["colorsys"].__file__ != os.path.join(namespace_folder, "colorsys.py")
@@ -0,0 +1,60 @@
+import pytest
+
+from tome.cli import CommandInfo
+from tome.command import CommandType
+from tome.internal.cli.emojinator import Emojinator
+from tome.internal.formatters import printers
+from tome.internal.formatters.printers import print_grouped_commands
+
+
+def _commands():
+    def info(namespace, name, doc, command_type=CommandType.cache):
+        return CommandInfo(namespace, name, doc, command_type, None, None)
+
+    return {
+        "origin": {
+            "greetings": [info("greetings", "hola", "Say hola.\n\nLong description"), info("greetings", "hello", None)],
+            "python": [info("python", "lint", "Lint the code.", CommandType.editable)],
+        },
+        "other": {"broken": [info("broken", "failing", "Error loading.", CommandType.failed)]},
+    }
+
+
+def test_plain_output(capsys, monkeypatch):
+    monkeypatch.setattr(printers, "BATCH_LINES", 2)
+    print_grouped_commands(_commands(), plain=True)
+    assert capsys.readouterr().out == (
+        "\n📖 origin\n"
+        f"\n  {Emojinator().get_emoji('greetings')} greetings commands\n"
+        "     greetings:hello      No description.\n"
+        "     greetings:hola       Say hola.\n"
+        "\n  🐍 python commands\n"
+        "     python:lint (e)      Lint the code.\n"
+        "\n📖 other\n"
+        f"\n  {Emojinator().get_emoji('broken')} broken commands\n"
+        "     broken:failing       Error loading.\n"
+    )
+
+
+def test_plain_output_same_as_rich(capsys):
+    print_grouped_commands(_commands(), plain=False)
+    rich_output = capsys.readouterr().out
+    print_grouped_commands(_commands(), plain=True)
+    assert capsys.readouterr().out == rich_output
+    # Plain text by default when not writing to a terminal
+    print_grouped_commands(_commands())
+    assert capsys.readouterr().out == rich_output
+
+
+def test_no_output(capsys):
+    print_grouped_commands({None: {None: []}})
+    assert capsys.readouterr().out == ""
+
+
+def test_emojinator_tables_read_only():
+    emojinator = Emojinator()
+    assert emojinator.get_emoji("my-python-tools") == "🐍"
+    with pytest.raises(TypeError):
+        emojinator.emoji_dict["python"] = "🐢"
+    # Lookups are cached per instance, not in the class
+    assert "my-python-tools" not in Emojinator()._cache
@@ -0,0 +1,64 @@
+import os
+import sqlite3
+
+from tome.internal.search import SIMILAR_CANDIDATES, SearchIndex
+from tome.internal.utils.files import save
+
+from tests.utils.files import temp_folder
+
+
+def _entry(namespace, name, doc):
+    return {"namespace": namespace, "name": name, "doc": doc, "module_name": "module", "error": None}
+
+
+def test_search_index():
+    index = SearchIndex(os.path.join(temp_folder(), "tome_search.db"))
+    assert index.search("*") is None
+
+    index.update_origin("origin1", [_entry("greetings", "hello", "Say Hello"), _entry("greetings", "bye", None)])
+    index.update_origin("origin2", [_entry("deploy", "push", "Push the images"), _entry("greetings", "hello", "Hi")])
+    index.update_origin("origin3", [_entry("other", "thing", "Nothing to see"), _entry("broken", None, None)])
+
+    # Names, docs, case-insensitive, and the origins defining the same command that may take precedence
+    assert index.search("*HELLO*") == ({"origin1", "origin2"}, {"origin1", "origin2", "origin3"})
+    assert index.search("*images*")[0] == {"origin2"}
+    assert index.search("deploy:push")[0] == {"origin2"}
+    assert index.search("*:pu?h")[0] == {"origin2"}
+    assert index.search("*nothing")[0] == set()  # Same as re.search(fnmatch.translate()), anchored at the end
+    assert index.search("*[bt]ye*")[0] == {"origin1"}
+    assert index.search("*[!:o]thing*")[0] == set()
+
+    index.update_origin("origin2", None)
+    assert index.search("*hello*") == ({"origin1"}, {"origin1", "origin3"})
+
+
+def test_search_index_invalid():
+    db_file = os.path.join(temp_folder(), "tome_search.db")
+    save(db_file, "not a database")
+    assert SearchIndex(db_file).search("*") is None
+
+
+def test_similar_names():
+    db_file = os.path.join(temp_folder(), "tome_search.db")
+    index = SearchIndex(db_file)
+    assert index.similar_names("greetings:helo") is None
+    entries = [_entry(f"namespace{i}", f"command{j}", None) for i in range(100) for j in range(50)]
+    index.update_origin("origin1", entries)
+    index.update_origin("origin2", [_entry("greetings", "hello", None), _entry("greetings", "help-me", None)])
+
+    candidates, indexed = index.similar_names("greetings:helo")
+    assert indexed == {"origin1", "origin2"}
+    # Only the names sharing trigrams with the word, looked up in the index of trigrams
+    assert candidates == {("origin2", "greetings:hello"), ("origin2", "greetings:help-me")}
+    # And only the best candidates of the 5000 names that share some
+    candidates, _ = index.similar_names("namespace42:comand7")
+    assert len(candidates) == SIMILAR_CANDIDATES
+    assert ("origin1", "namespace42:command7") in candidates
+    connection = sqlite3.connect(db_file)
+    plan = connection.execute(
+        "EXPLAIN QUERY PLAN SELECT origin, fullname FROM command_trigrams WHERE trigram IN (?, ?) "
+        "GROUP BY origin, fullname ORDER BY COUNT(*) DESC, fullname LIMIT ?",
+        ("abc", "bcd", 10),
+    ).fetchall()
+    connection.close()
+    assert any("command_trigrams_trigram" in row[-1] for row in plan)
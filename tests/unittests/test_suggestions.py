@@ -0,0 +1,20 @@
+import random
+import string
+from difflib import get_close_matches
+
+from tome.internal.suggestions import SuggestionIndex
+
+
+def test_same_suggestions_as_difflib():
+    rng = random.Random(42)
+    names = set()
+    for _ in range(500):
+        namespace = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 10)))
+        command = "".join(rng.choice(string.ascii_lowercase + "-") for _ in range(rng.randint(1, 15)))
+        names.add(f"{namespace}:{command}")
+    index = SuggestionIndex(names)
+    words = [rng.choice(sorted(names)) for _ in range(50)]
+    typos = [word[:i] + word[i + 1 :] for word in words for i in (0, len(word) // 2)]
+    for word in words + typos + ["", "x", "a" * 40]:
+        assert index.close_matches(word) == get_close_matches(word, names, n=5, cutoff=0.75)
+        assert index.close_matches(word, n=3, cutoff=0.5) == get_close_matches(word, names, n=3, cutoff=0.5)
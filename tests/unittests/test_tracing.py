@@ -0,0 +1,43 @@
+import json
+import os
+
+import pytest
+
+from tome.errors import TomeException
+from tome.internal.utils.tracing import finish_trace, start_trace, trace_phase
+
+from tests.utils.files import temp_folder
+
+
+def test_trace_disabled():
+    with trace_phase("nothing"):
+        pass
+    finish_trace()  # Doesn't fail, nothing to write
+
+
+@pytest.mark.parametrize("trace_format", ["json", "chrome"])
+def test_trace_phases(trace_format):
+    trace_file = os.path.join(temp_folder(), "trace.json")
+    start_trace(trace_file, trace_format)
+    with trace_phase("outer"):
+        with trace_phase("inner", module="mymodule"):
+            _ = [0] * 10000
+    finish_trace()
+
+    with open(trace_file) as f:
+        trace = json.load(f)
+    if trace_format == "json":
+        outer, inner = trace["phases"]
+        assert outer["name"] == "outer" and outer["depth"] == 0
+        assert inner["args"] == {"module": "mymodule"} and inner["depth"] == 1
+        assert inner["duration_ms"] <= outer["duration_ms"]
+    else:
+        events = {event["name"]: event for event in trace["traceEvents"]}
+        assert events["inner"]["ph"] == "X"
+        assert events["inner"]["args"]["module"] == "mymodule"
+        assert "alloc_bytes" in events["outer"]["args"]
+
+
+def test_trace_invalid_format():
+    with pytest.raises(TomeException, match="Invalid trace format 'xml'"):
+        start_trace("trace.xml", "xml")
@@ -1,11 +1,13 @@
+import io
 import os
 import tempfile
 
 import pytest
+import responses
 from requests import Response
 from tome.errors import TomeException
 from tome.internal.utils import files
-from tome.internal.utils.network import FileDownloader
+from tome.internal.utils.network import FileDownloader, _DownloadReader
 from tome.internal.utils.network import response_to_str
 
 
@@ -47,3 +49,31 @@ def test_response_to_str(mocker):
     # Test safe-exception when decoding content
     response_mock = mocker.Mock(spec=Response)
     response_mock._content = mocker.Mock(return_value=b"Failure")
+
+
+@responses.activate
+def test_stream():
+    url = "http://fakeurl.com/file.tar.gz"
+    content = b"lentejas los viernes" * 10000
+    responses.add(responses.GET, url, body=content, status=200)
+
+    with FileDownloader().stream(url) as stream:
+        assert stream.read(10) == content[:10]
+        assert stream.read() == content[10:]
+
+
+def test_download_reader_more_than_requested():
+    # Decoding gzip or deflate responses, urllib3 1.x can return more than the requested size
+    class Raw:
+        def __init__(self, content):
+            self.content = content
+
+        def read(self, size):
+            data, self.content = self.content[: size * 2], self.content[size * 2 :]
+            return data
+
+    content = bytes(range(256)) * 100
+    advanced = []
+    reader = io.BufferedReader(_DownloadReader(Raw(content), advanced.append), buffer_size=1000)
+    assert reader.read() == content
+    assert sum(advanced) == len(content)
@@ -11,6 +11,11 @@ from contextlib import contextmanager
 from unittest import mock
 
 from tome.api.api import TomeAPI, get_tome_home
+
+# tome imports these lazily, load them before any TestClient run takes its sys.modules snapshot,
+# otherwise they would be removed and re-imported in every run, which some of them don't support
+import tome.internal.utils.network  # noqa: F401
+import tome.internal.vault.basic  # noqa: F401
 from tome.cli import Cli
 from tome.errors import TomeException
 from tome.exit_codes import ERROR_GENERAL
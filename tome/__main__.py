@@ -1,4 +1,21 @@
-from tome.cli import main
+import sys
+
+
+def main():
+    """
+    Entry point of the tome executable. When a daemon is running for the tome home, the command line
+    runs there without importing the rest of tome, see 'tome daemon'.
+    """
+    from tome.internal.daemon import run_in_daemon
+
+    exit_code = run_in_daemon(sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    from tome.cli import main as cli_main
+
+    cli_main()
+
 
 if __name__ == "__main__":
     main()
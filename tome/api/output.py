@@ -1,10 +1,8 @@
 # TODO: it's not necessary to use rich here, we can decide how we want the output
+import json
+import sys
 from contextlib import nullcontext
 
-from rich.console import Console
-from rich.live import Live
-from rich.spinner import Spinner
-
 
 class TomeOutput:
     LEVEL_QUIET = 80  # -q
@@ -16,7 +14,17 @@ class TomeOutput:
     _tome_output_level = LEVEL_DEFAULT
 
     def __init__(self, stdout=False):
-        self._tome_console = Console(stderr=not stdout)
+        self._stdout = stdout
+        self._console = None
+
+    @property
+    def _tome_console(self):
+        # rich is imported and the console created only when something is going to be printed
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console(stderr=not self._stdout)
+        return self._console
 
     def status(self, message):
         if self._tome_output_level <= self.LEVEL_DEFAULT:
@@ -49,6 +57,19 @@ class TomeOutput:
         if self._tome_output_level <= verbosity:
             self._tome_console.print_json(json)
 
+    def print_ndjson(self, records, verbosity=None):
+        """
+        Print an iterable of records as newline-delimited JSON, one compact document per line written as
+        soon as the record is produced. It doesn't go through rich, so the output can be consumed by other
+        tools incrementally.
+        """
+        verbosity = verbosity or self.LEVEL_DEFAULT
+        if self._tome_output_level <= verbosity:
+            stream = sys.stdout if self._stdout else sys.stderr
+            for record in records:
+                stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stream.flush()
+
     @classmethod
     def spinner(cls, text="Working..."):
         """Provides a spinner context if verbosity level allows, else a nullcontext."""
@@ -59,6 +80,9 @@ class TomeOutput:
         if cls.is_verbose() or cls.is_quiet():
             return nullcontext()
         else:
+            from rich.live import Live
+            from rich.spinner import Spinner
+
             return Live(Spinner("dots", text=text), transient=True)
 
     @classmethod
@@ -1,5 +1,19 @@
+import json
+import os
+
+from tome.errors import TomeException
 from tome.internal.cache import Cache
-from tome.internal.installer import install_editable, install_from_source, uninstall_from_source
+from tome.internal.completion import write_completion
+from tome.internal.index import read_index, update_namespaces
+from tome.internal.installer import install_editable, install_from_source, uninstall_from_source, update_from_source
+from tome.internal.mirrors import prune_mirrors
+from tome.internal.source import Source, SourceType
+from tome.internal.utils.files import load
+
+
+def _mirrors_folder(cache):
+    # Ephemeral homes, like in CI, are faster cloning only what they install
+    return None if os.getenv("TOME_GIT_MIRRORS") == "0" else cache.paths.git_mirrors_path
 
 
 class InstallApi:
@@ -9,12 +23,82 @@ class InstallApi:
     def install_from_source(self, source, force_requirements, create_env):
         cache = Cache(self.tome_api.cache_folder)
         target_folder = cache.get_target_folder(source)
-        return install_from_source(source, target_folder, force_requirements, create_env)
+        try:
+            result = install_from_source(source, target_folder, force_requirements, create_env, _mirrors_folder(cache))
+        except TomeException:
+            self._prune_mirrors(cache)  # Nothing uses the mirror of a repository that failed to install
+            raise
+        finally:
+            # It can fail after copying the files, like installing the requirements, and its commands still run
+            self._register_origin(cache, target_folder)
+        return result
+
+    def update_from_source(self, source, force_requirements, create_env):
+        """
+        Update an installed source, writing only the files that changed.
+
+        :param source: The installed source. If it has a version, the git source is updated to it.
+        :return: The updated source and whether any of its files changed.
+        """
+        cache = Cache(self.tome_api.cache_folder)
+        target_folder = cache.get_target_folder(source)
+        if not os.path.isfile(os.path.join(target_folder, "tome_source.json")):
+            raise TomeException(f"Source '{source}' is not installed.")
+        try:
+            result, updated = update_from_source(
+                target_folder, source.version, force_requirements, create_env, _mirrors_folder(cache)
+            )
+        except TomeException:
+            self._register_origin(cache, target_folder)  # The same, the files can be already updated
+            raise
+        if updated:
+            self._register_origin(cache, target_folder)
+        return result, updated
+
+    def installed_sources(self):
+        """:return: The sources of all the installed origins, except the editable ones."""
+        scripts_path = Cache(self.tome_api.cache_folder).paths.scripts_path
+        sources = []
+        for origin in sorted(os.listdir(scripts_path)) if os.path.isdir(scripts_path) else []:
+            tome_source = os.path.join(scripts_path, origin, "tome_source.json")
+            if os.path.isfile(tome_source):
+                source = Source.deserialize(json.loads(load(tome_source)))
+                source.version = None  # Updated to the installed version
+                sources.append(source)
+        return sources
+
+    def _register_origin(self, cache, target_folder):
+        """
+        Update the namespaces, the search index and the completion with the commands of an origin. An origin
+        without index, removed or partially installed, is removed from both, so it's always loaded.
+        """
+        from tome.internal.search import SearchIndex  # sqlite3 is only needed to install and search
+
+        entries = read_index(target_folder)
+        namespaces = sorted({entry["namespace"] for entry in entries}) if entries is not None else None
+        update_namespaces(cache.paths.namespaces_path, os.path.basename(target_folder), namespaces)
+        SearchIndex(cache.paths.search_index_path).update_origin(os.path.basename(target_folder), entries)
+        write_completion(self.tome_api.cache_folder)
 
     def install_editable(self, source, force_requirements, create_env):
-        return install_editable(source, self.tome_api.cache_folder, force_requirements, create_env)
+        result = install_editable(source, self.tome_api.cache_folder, force_requirements, create_env)
+        write_completion(self.tome_api.cache_folder)
+        return result
 
     def uninstall_from_source(self, source):
+        from tome.internal.search import SearchIndex  # sqlite3 is only needed to install and search
+
         cache = Cache(self.tome_api.cache_folder)
         target_folder = cache.get_target_folder(source)
-        return uninstall_from_source(source, self.tome_api.cache_folder, target_folder)
+        result = uninstall_from_source(source, self.tome_api.cache_folder, target_folder)
+        if not os.path.isdir(target_folder):
+            update_namespaces(cache.paths.namespaces_path, os.path.basename(target_folder), None)
+            SearchIndex(cache.paths.search_index_path).update_origin(os.path.basename(target_folder), None)
+            self._prune_mirrors(cache)
+        write_completion(self.tome_api.cache_folder)
+        return result
+
+    def _prune_mirrors(self, cache):
+        """Remove the git mirrors of the repositories that no installed origin comes from"""
+        uris = [source.uri for source in self.installed_sources() if source.type is SourceType.GIT]
+        prune_mirrors(cache.paths.git_mirrors_path, uris)
@@ -25,6 +25,7 @@ class ListApi:
         if not isinstance(self.cli, Cli):
             raise TomeException(f"Expected 'Cli' type, got '{type(self.cli).__name__}'")
 
+        self.cli.load_matching_commands(pattern)
         included_types = types or list(CommandType)
         result = []
 
@@ -1,4 +1,3 @@
-import ast
 import importlib
 import importlib.util
 import json
@@ -7,19 +6,47 @@ import pkgutil
 import signal
 import sys
 import traceback
-from difflib import get_close_matches
-from tome.api.api import TomeAPI
+from tome.api.api import TomeAPI, get_tome_home
 from tome.api.output import TomeOutput
 from tome.command import CommandType, TomeCommand, TomeShellCommand
 from tome.errors import TomeException, exception_message_safe
 from tome.exit_codes import ERROR_GENERAL, ERROR_SIGTERM, ERROR_UNEXPECTED, SUCCESS, USER_CTRL_BREAK, USER_CTRL_C
-from tome.internal.cache import TomePaths
+from tome.internal.cache import TomePaths, sort_origins
 from tome.internal.formatters.printers import print_grouped_commands
+from tome.internal.index import ScanCache, read_index, read_namespaces, scan_module, scan_namespace, scan_origin
+from tome.internal.loader import OriginImporter, spec_from_origin_file
 from tome.internal.source import Source
+from tome.internal.suggestions import SuggestionIndex
 from tome.internal.utils.files import load
+from tome.internal.utils.tracing import finish_trace, start_trace, trace_phase
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
 
 
 class CommandInfo:
+    """
+    Entry of the registry of commands. Installations can have tens of thousands of them, so it is slotted
+    and the strings repeated by many commands (namespaces, folders, module names) are interned. The
+    Source is shared by all the commands of an origin and the TomeCommand is only created when needed.
+    """
+
+    __slots__ = (
+        "command",
+        "namespace",
+        "doc",
+        "type",
+        "name",
+        "module_name",
+        "base_folder",
+        "error",
+        "env_path",
+        "source",
+        "path",
+        "runner",
+    )
+
     def __init__(
         self,
         namespace,
@@ -32,17 +59,23 @@ class CommandInfo:
         error=None,
         env_path=None,
         source=None,
+        path=None,
+        runner=None,
     ):
         self.command = command
-        self.namespace = namespace
+        self.namespace = _intern(namespace)
         self.doc = command_doc
         self.type = command_type
         self.name = name
-        self.module_name = module_name
-        self.base_folder = base_folder
+        self.module_name = _intern(module_name)
+        self.base_folder = _intern(base_folder)
         self.error = error
-        self.env_path = env_path
+        self.env_path = _intern(env_path)
         self.source = source
+        # Relative to the base_folder, the python module or shell script to load the command lazily
+        self.path = _intern(path)
+        # For shell scripts, the interpreter to run them, so they are not read until executed
+        self.runner = runner
 
     def serialize(self):
         return {
@@ -71,6 +104,8 @@ class Cli:
         self._tome_api = tome_api
         self._tome_api.list.cli = self
         self._commands = {}
+        # When all the commands are registered and kept, see load_all_commands()
+        self._complete_registry = False
         # Temporary fix: loading editable file just once, not all the time
         self._editables = []
         editables_file = TomePaths(self._tome_api.cache_folder).editables_path
@@ -92,30 +127,28 @@ class Cli:
     def _add_builtin_commands(self):
         """Load tome own commands."""
         tome_built_in_commands_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands")
-        for module in pkgutil.iter_modules([tome_built_in_commands_path]):
-            module_name = module.name
-            self._add_tome_commands_in_module(
-                tome_built_in_commands_path, f"tome.commands.{module_name}", command_type=CommandType.built_in
-            )
+        with trace_phase("_add_builtin_commands"):
+            for module in pkgutil.iter_modules([tome_built_in_commands_path]):
+                module_name = module.name
+                self._add_tome_commands_in_module(
+                    tome_built_in_commands_path, f"tome.commands.{module_name}", command_type=CommandType.built_in
+                )
 
-    def _load_commands_from_path(self, scripts_path, command_type=None, source=None):
-        """Load commands from a directory"""
-        old_sys_path = sys.path[:]
-        try:
-            if not os.path.exists(scripts_path):
-                return
-            sys.path.append(scripts_path)
-            for namespace in os.listdir(scripts_path):
-                namespace_folder_path = os.path.join(scripts_path, namespace)
-                if not os.path.isdir(namespace_folder_path):
-                    continue
-                sys.path.append(namespace_folder_path)
-
-                for module_info in pkgutil.iter_modules([namespace_folder_path]):
-                    module_name = module_info.name
-                    try:
-                        # FIXME: we need to do some refactors around all these to avoid passing
-                        #  so much repeated information
+    def _load_commands_from_path(self, scripts_path, command_type=None, source=None, only_namespace=None):
+        """Load commands from a directory, or only from one of its namespaces if given"""
+        if not os.path.exists(scripts_path):
+            return
+        for namespace in [only_namespace] if only_namespace else os.listdir(scripts_path):
+            namespace_folder_path = os.path.join(scripts_path, namespace)
+            if not os.path.isdir(namespace_folder_path):
+                continue
+
+            for module_info in pkgutil.iter_modules([namespace_folder_path]):
+                module_name = module_info.name
+                try:
+                    # FIXME: we need to do some refactors around all these to avoid passing
+                    #  so much repeated information
+                    with trace_phase("_add_tome_commands_in_module", module=module_name, folder=scripts_path):
                         self._add_tome_commands_in_module(
                             namespace_folder_path,
                             module_name,
@@ -124,28 +157,42 @@ class Cli:
                             command_type=command_type,
                             source=source,
                         )
-                    except Exception as e:
-                        TomeOutput().error(f"Error loading command '{module_name}.py' from '{scripts_path}': {e}")
-
-                for _script in os.listdir(namespace_folder_path):
-                    if _script.startswith("tome_"):
-                        script = os.path.join(namespace_folder_path, _script)
-                        item = TomeShellCommand(script)
-                        self._register_command(
-                            item, namespace, base_folder=scripts_path, command_type=command_type, source=source
-                        )
-        finally:
-            sys.path = old_sys_path
-
-    def _add_editable_commands(self):
-        """Load command modules from editable installations."""
+                except Exception as e:
+                    TomeOutput().error(f"Error loading command '{module_name}.py' from '{scripts_path}': {e}")
+
+            for _script in os.listdir(namespace_folder_path):
+                if _script.startswith("tome_"):
+                    script = os.path.join(namespace_folder_path, _script)
+                    item = TomeShellCommand(script)
+                    self._register_command(
+                        item, namespace, base_folder=scripts_path, command_type=command_type, source=source
+                    )
+
+    def _add_editable_commands(self, namespace=None):
+        """Register the commands of editable installations from their sources, without importing them."""
+        if not self._editables:
+            return
+        # Only the files modified since the last run are parsed again
+        scan_cache = ScanCache(TomePaths(self._tome_api.cache_folder).editables_cache_path)
         for editable in self._editables:
-            self._load_commands_from_path(editable["source"], command_type=CommandType.editable)
-
-    def _add_cache_commands(self):
-        """Load tome scripts installed in the cache."""
+            scripts_path = editable["source"]
+            if namespace is None:
+                if os.path.isdir(scripts_path):
+                    entries = scan_origin(scripts_path, scan_cache)
+                    self._add_indexed_commands(scripts_path, entries, command_type=CommandType.editable)
+            elif os.path.isdir(os.path.join(scripts_path, namespace)):
+                entries = scan_namespace(scripts_path, namespace, scan_cache)
+                self._add_indexed_commands(scripts_path, entries, command_type=CommandType.editable)
+        scan_cache.save(prune=namespace is None)
+
+    def _add_cache_commands(self, namespace=None, pattern=None, skip_origins=None):
+        """
+        Load tome scripts installed in the cache, or only the ones of the given namespace, or only the
+        origins with commands that can match a search pattern, and never the ones in skip_origins.
+        """
 
-        tome_scripts_path = TomePaths(self._tome_api.cache_folder).scripts_path
+        tome_paths = TomePaths(self._tome_api.cache_folder)
+        tome_scripts_path = tome_paths.scripts_path
 
         # FIXME: should we error out if commands overlap? should we allow multiple commands with the same name?
         # we need to sort the origins by modification time, so the most recent ones are loaded first
@@ -156,24 +203,189 @@ class Cli:
             origin for origin in os.listdir(tome_scripts_path) if os.path.isdir(os.path.join(tome_scripts_path, origin))
         ]
 
-        origins.sort(key=lambda origin: os.path.getmtime(os.path.join(tome_scripts_path, origin)), reverse=True)
+        if namespace is not None:
+            namespaces = read_namespaces(tome_paths.namespaces_path)
+            if namespaces is not None:
+                # Origins not covered by the map, like the ones installed by older versions, are always loaded
+                namespaces_map, mapped_origins = namespaces
+                candidates = set(namespaces_map.get(namespace, []))
+                origins = [origin for origin in origins if origin in candidates or origin not in mapped_origins]
+
+        if pattern is not None and pattern.strip("*"):  # Nothing to search when listing everything
+            from tome.internal.search import SearchIndex  # sqlite3 is only needed to search
+
+            found = SearchIndex(tome_paths.search_index_path).search(pattern)
+            if found is not None:
+                # Same for the origins not covered by the search index
+                candidates, indexed_origins = found
+                origins = [origin for origin in origins if origin in candidates or origin not in indexed_origins]
 
-        for origin in origins:
+        if skip_origins:
+            origins = [origin for origin in origins if origin not in skip_origins]
+
+        for origin in sort_origins(tome_scripts_path, origins):
             origin_folder = os.path.join(tome_scripts_path, origin)
             if not os.path.isdir(origin_folder):
                 continue
-            # origins level with the hashes of namespaces of scripts that come from different origins
-            tome_source = os.path.join(origin_folder, "tome_source.json")
-            source = None
-            if os.path.exists(tome_source):  # Just in case someone put something in the cache without installing
-                tome_source = json.loads(load(tome_source))
-                source = Source.deserialize(tome_source)
-            self._load_commands_from_path(origin_folder, command_type=CommandType.cache, source=source)
-
-    def _load_commands(self):
-        self._add_builtin_commands()
-        self._add_cache_commands()
-        self._add_editable_commands()
+            with trace_phase("_add_cache_commands", origin=origin):
+                self._add_origin_commands(origin_folder, namespace)
+
+    def _add_origin_commands(self, origin_folder, namespace=None):
+        """Register the commands of a cache origin, from its index if it has one"""
+        # origins level with the hashes of namespaces of scripts that come from different origins
+        tome_source = os.path.join(origin_folder, "tome_source.json")
+        source = None
+        if os.path.exists(tome_source):  # Just in case someone put something in the cache without installing
+            tome_source = json.loads(load(tome_source))
+            source = Source.deserialize(tome_source)
+        entries = read_index(origin_folder)
+        if entries is None:  # Installed with an older tome version, needs to import the modules
+            if namespace is None or os.path.isdir(os.path.join(origin_folder, namespace)):
+                self._load_commands_from_path(
+                    origin_folder, command_type=CommandType.cache, source=source, only_namespace=namespace
+                )
+        else:
+            if namespace is not None:
+                entries = [entry for entry in entries if entry["namespace"] == namespace]
+            self._add_indexed_commands(origin_folder, entries, command_type=CommandType.cache, source=source)
+
+    def _add_indexed_commands(self, scripts_path, entries, command_type=None, source=None):
+        """Register the commands described in an index without importing any of their modules"""
+        venv_path = os.path.join(scripts_path, ".tome_venv")
+        env_path = venv_path if os.path.exists(venv_path) else None
+        for entry in entries:
+            if entry["name"] is None:
+                TomeOutput().error(
+                    f"Error loading command '{entry['module_name']}.py' from '{scripts_path}': {entry['error']}"
+                )
+                continue
+            command_info = CommandInfo(
+                entry["namespace"],
+                entry["name"],
+                entry["doc"],
+                command_type,
+                entry.get("module_name"),
+                scripts_path,
+                error=entry["error"],
+                env_path=env_path,
+                source=source,
+                path=entry["path"],
+                runner=entry.get("runner"),
+            )
+            self._commands[f"{entry['namespace']}:{entry['name']}"] = command_info
+
+    def _load_commands(self, namespace=None, pattern=None, skip_origins=None):
+        """
+        Register all the commands, or only the ones of a namespace, keeping the same precedence: cache
+        origins from the most recent to the oldest one, then editables.
+
+        :param namespace: Register only the commands of this namespace.
+        :param pattern: Register only the cache origins that can have commands matching this search pattern.
+        :param skip_origins: Cache origins not to register.
+        """
+        if self._complete_registry:  # Already has all of them
+            return
+        self._commands = {}
+        if namespace is None:
+            self._add_builtin_commands()
+        self._add_cache_commands(namespace, pattern, skip_origins)
+        with trace_phase("_add_editable_commands"):
+            self._add_editable_commands(namespace)
+
+    def load_matching_commands(self, pattern):
+        """
+        Register the commands that can match a search pattern in their full name or documentation.
+        Only the cache origins with candidates in the search index are read, all of them if there is no index.
+        """
+        self._load_commands(pattern=pattern)
+
+    def load_all_commands(self):
+        """
+        Register all the commands and keep them for the later calls to run(), which won't look for them
+        again. Used by the daemon, whose forked processes inherit the registry.
+        """
+        self._complete_registry = False
+        self._load_commands()
+        self._complete_registry = True
+
+    def preload_command(self, fullname):
+        """
+        Import the module of a registered command, so the processes forked later don't need to import it.
+        The module level code runs in this process, so it is only for forks that run the command lines with
+        its same working directory and environment, like the ones of run-many. A failure is kept in the
+        command, to report it when the command runs.
+        """
+        command_info = self._commands.get(fullname)
+        if command_info is None or command_info.error or command_info.command is not None:
+            return
+        try:
+            self._load_command(command_info)
+        except TomeException as e:
+            command_info.error = str(e)
+
+    def _load_command(self, command_info):
+        """
+        Get the TomeCommand of a registered command. Commands registered from an index are
+        materialized here, importing only the module that defines them.
+        """
+        if command_info.command is not None or command_info.path is None:
+            return command_info.command
+
+        full_path = os.path.join(command_info.base_folder, command_info.path)
+        if command_info.module_name is None:
+            command = TomeShellCommand(full_path, command_info.runner, command_info.doc)
+        else:
+            namespace_folder_path = os.path.dirname(full_path)
+            try:
+                module_name, base_folder = command_info.module_name, command_info.base_folder
+                with trace_phase("_add_tome_commands_in_module", module=module_name, folder=base_folder):
+                    origin_folder = base_folder if command_info.type == CommandType.cache else None
+                    imported_module = self._import_module(
+                        namespace_folder_path, module_name, base_folder, origin_folder
+                    )
+            except ModuleNotFoundError as e:
+                command_info.error = str(e)
+                return None
+            except Exception as e:
+                raise TomeException(
+                    f"Error loading command '{command_info.module_name}.py' from '{command_info.base_folder}': {e}"
+                ) from e
+            command = next(
+                (
+                    item
+                    for item in vars(imported_module).values()
+                    if isinstance(item, TomeCommand) and item.parent is None and item.name == command_info.name
+                ),
+                None,
+            )
+            if command is None:
+                raise TomeException(
+                    f"Command '{command_info.name}' not found in '{full_path}'. Please check it and install again."
+                )
+        command.namespace = command_info.namespace
+        command.type = command_info.type
+        command.base_folder = command_info.base_folder
+        command.module_name = command_info.module_name
+        command_info.command = command
+        return command
+
+    @staticmethod
+    def _import_module(module_path, module_name, base_folder, origin_folder=None):
+        """
+        Import a user module from its file, keeping the modules it imports isolated from other origins.
+        For installed origins, the bytecode precompiled at install time is used.
+
+        :param module_path: The namespace folder containing the module.
+        :param module_name: The module name, without extension.
+        :param base_folder: The folder of the origin, its modules can import from it and the namespace folder.
+        :param origin_folder: The folder of an installed origin with precompiled bytecode.
+        """
+        full_path = os.path.join(module_path, module_name + ".py")
+        with OriginImporter([base_folder, module_path], origin_folder):
+            spec = spec_from_origin_file(module_path, full_path, origin_folder)
+            imported_module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(imported_module)
+        return imported_module
 
     def _add_tome_commands_in_module(
         self, module_path, module_name, package=None, base_folder=None, command_type=None, source=None
@@ -182,57 +394,18 @@ class Cli:
             if command_type == CommandType.built_in:
                 imported_module = importlib.import_module(module_name)
             else:
-                # TODO: It would be nice that both used the same import machinery
-                old_modules = list(sys.modules.keys())
-                full_path = os.path.join(module_path, module_name + ".py")
-                spec = importlib.util.spec_from_file_location(module_path, full_path)
-                imported_module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(imported_module)
-                added_modules = set(sys.modules).difference(old_modules)
-                for added in added_modules:
-                    module = sys.modules[added]
-                    if module:
-                        try:
-                            try:
-                                # Most modules will have __file__ != None
-                                folder = os.path.dirname(module.__file__)
-                            except (AttributeError, TypeError):
-                                # But __file__ might not exist or equal None
-                                # Like some builtins and Namespace packages py3
-                                folder = module.__path__._path[0]
-                        except AttributeError:  # In case the module.__path__ doesn't exist
-                            pass
-                        else:
-                            if folder.startswith(module_path):
-                                module = sys.modules.pop(added)
-                                sys.modules["%s.%s" % (module_path, added)] = module
+                origin_folder = base_folder if command_type == CommandType.cache else None
+                imported_module = self._import_module(module_path, module_name, base_folder, origin_folder)
         except ModuleNotFoundError as e:
             # In case the import fails, to be able to store the command with error defined. It shouldn't be cached
             # so it is re-loaded every time, in case a fix was done like installing requirements
 
-            def _get_tome_command_decorators(file_path):
-                ret = []
-                with open(file_path) as file:
-                    node = ast.parse(file.read())
-                    for child in node.body:
-                        if isinstance(child, ast.FunctionDef):
-                            for decorator in child.decorator_list:
-                                if (
-                                    isinstance(decorator, ast.Call)
-                                    and getattr(decorator.func, 'id', '') == 'tome_command'
-                                ):
-                                    # Check if 'parent' argument is in the decorator
-                                    if not any(arg.arg == 'parent' for arg in decorator.args):
-                                        commandname = child.name.replace("_", "-")
-                                        ret.append(commandname)
-                return ret
-
             filepath = os.path.join(module_path, module_name.replace(".", "/") + ".py")
-            command_names = _get_tome_command_decorators(filepath)
+            command_names = [command["name"] for command in scan_module(filepath)]
 
             for command_name in command_names:
                 fullname = f"{package}:{command_name}"
-                doc = f"🚨 Loading command failed: {str(e)}"
+                doc = f"🚨 Loading command failed: {e!s}"
                 command_info = CommandInfo(
                     package, command_name, doc, command_type, module_name, base_folder, error=str(e), source=source
                 )
@@ -267,22 +440,70 @@ class Cli:
 
         self._commands[fullname] = command_info
 
+    def _similar_names(self, command):
+        """
+        Full names of the commands that can be similar to a mistyped one, and all the namespaces. The cache
+        origins covered by the search index only contribute the candidates that share the most trigrams
+        with the command, and their namespaces are read from the namespaces map. Only the rest of the
+        commands are registered.
+
+        :return: A tuple with the set of candidate names and the set of namespaces.
+        """
+        from tome.internal.search import SearchIndex  # sqlite3 is only needed to search
+
+        tome_paths = TomePaths(self._tome_api.cache_folder)
+        found = SearchIndex(tome_paths.search_index_path).similar_names(command)
+        namespaces_map = read_namespaces(tome_paths.namespaces_path)
+        if found is None or namespaces_map is None:
+            self._load_commands()
+            names = set(self._commands)
+            return names, {fullname.partition(":")[0] for fullname in names if ":" in fullname}
+
+        candidates, indexed_origins = found
+        namespaces_map, mapped_origins = namespaces_map
+        indexed_origins &= mapped_origins
+        installed_origins = set(os.listdir(tome_paths.scripts_path))
+        self._load_commands(skip_origins=indexed_origins)
+        names = {fullname for origin, fullname in candidates if origin in installed_origins & indexed_origins}
+        namespaces = {
+            namespace
+            for namespace, origins in namespaces_map.items()
+            if any(origin in installed_origins & indexed_origins for origin in origins)
+        }
+        for fullname, command_info in self._commands.items():
+            if command_info.type == CommandType.cache and os.path.basename(command_info.base_folder) in indexed_origins:
+                continue  # Already in the index, with a complete registry
+            names.add(fullname)
+            if ":" in fullname:
+                namespaces.add(fullname.partition(":")[0])
+        return names, namespaces
+
     def _print_similar(self, command):
         """
-        Looks for similar commands and prints them if found.
+        Looks for similar commands and prints them if found, and the similar namespaces if the one of
+        the command doesn't exist.
         """
         output = TomeOutput()
-        matches = get_close_matches(word=command, possibilities=self._commands.keys(), n=5, cutoff=0.75)
-
-        if len(matches) == 0:
-            return
+        names, namespaces = self._similar_names(command)
+        matches = SuggestionIndex(names).close_matches(command, n=5, cutoff=0.75)
 
         if len(matches) > 1:
             output.info("The most similar commands are: ")
-        else:
+        elif matches:
             output.info("The most similar command is: ")
+        if matches:
+            output.info(", ".join(matches))
 
-        output.info(", ".join(matches))
+        namespace, _, name = command.partition(":")
+        if not name or namespace in namespaces:
+            return
+        similar_namespaces = SuggestionIndex(namespaces).close_matches(namespace, n=5, cutoff=0.6)
+        if len(similar_namespaces) > 1:
+            output.info("The most similar namespaces are: ")
+        elif similar_namespaces:
+            output.info("The most similar namespace is: ")
+        if similar_namespaces:
+            output.info(", ".join(similar_namespaces))
 
     def _output_help_cli(self):
         """
@@ -300,45 +521,53 @@ class Cli:
         methods
         """
         output = TomeOutput()
-        self._load_commands()
-
-        if not args:
-            self._output_help_cli()
-            return
 
         try:
             command_argument = args[0][0]
         except IndexError:  # No parameters
-            self._output_help_cli()
-            return
+            command_argument = None
 
         if command_argument in ["-v", "--version"]:
             from importlib import metadata
 
-            TomeOutput().info(metadata.version('tomescripts'))
+            # Plain write, printing the version should not pay for importing rich
+            sys.stderr.write(f"{metadata.version('tomescripts')}\n")
             return
 
-        if command_argument in ["-h", "--help"]:
+        if command_argument in [None, "-h", "--help"]:
+            # The help only shows the built-in commands, there is no need to look for others
+            self._add_builtin_commands()
             self._output_help_cli()
             return
 
+        # User commands are registered from indexes and static analysis of their sources, the only
+        # module imported is the one defining the command that runs. For namespace:command only the
+        # origins containing that namespace are looked up
+        namespace, _, name = command_argument.partition(":")
+        if name:
+            self._load_commands(namespace)
+        elif not self._complete_registry:
+            # Built-in commands that work with the user ones, like list or info, load only the ones
+            # they need through load_matching_commands()
+            self._commands = {}
+            self._add_builtin_commands()
+
         command_info = self._commands.get(command_argument)
+        command = self._load_command(command_info) if command_info and not command_info.error else None
         if command_info and command_info.error:
             raise TomeException(
                 f"There was an error when installing the '{command_argument}' command: {command_info.error}. Please check the error and install again."
             )
 
-        command = command_info.command if command_info else None
         if not command:
             output.info(f"'{command_argument}' is not a tome command. See 'tome --help'.")
             output.info("")
             self._print_similar(command_argument)
             raise TomeException(f"Unknown command {command_argument}")
 
-        try:
+        command.reset_parser()  # In case it already ran in this process, like in a batch
+        with trace_phase("command_execution", command=command_argument):
             command.run(self._tome_api, args[0][1:])
-        except Exception:
-            raise
 
     @staticmethod
     def exception_exit_error(exception):
@@ -362,26 +591,42 @@ class Cli:
             return ERROR_UNEXPECTED
 
 
-def main(args=None):
-    """main entry point of the tome application, using a Command to
-    parse parameters
+def _complete(args):
+    """
+    Hidden ``tome __complete`` entry point used by the shell completion scripts, printing the candidates
+    for the last word. ``--script <shell>`` prints the script to register the completion in that shell.
+    """
+    from tome.internal.completion import SHELL_SCRIPTS, complete
 
-    Exit codes for tome command:
+    if args[:1] == ["--script"]:
+        shell = args[1] if len(args) > 1 else None
+        if shell not in SHELL_SCRIPTS:
+            sys.stderr.write(f"Error: Specify the shell to complete: {', '.join(SHELL_SCRIPTS)}\n")
+            return ERROR_GENERAL
+        sys.stdout.write(SHELL_SCRIPTS[shell])
+        return SUCCESS
+    if args[:1] == ["--line"]:
+        line = args[1] if len(args) > 1 else ""
+        words = line.split()[1:]  # Without the tome executable
+        if not line or line[-1].isspace():
+            words.append("")
+    else:
+        words = args[1:] if args[:1] == ["--"] else args
+    try:
+        candidates = complete(get_tome_home(), words)
+    except Exception:  # noqa: BLE001 - Completion must never print errors in the middle of the user's command line
+        return ERROR_GENERAL
+    if candidates:
+        sys.stdout.write("\n".join(candidates) + "\n")
+    return SUCCESS
 
-    0: Success (done)
-    1: General TomeException error (done)
-    2: Ctrl+C
-    3: Ctrl+Break
-    4: SIGTERM
+
+def run_cli(cli, args):
     """
-    if args is None:
-        args = sys.argv[1:]
+    Run a tome command line handling the interruptions.
 
-    try:
-        tome_api = TomeAPI()
-    except TomeException as e:
-        sys.stderr.write(f"Error in tome initialization: {e}")
-        sys.exit(ERROR_GENERAL)
+    :return: The exit code.
+    """
 
     def ctrl_c_handler(_, __):
         TomeOutput().info('You pressed Ctrl+C!')
@@ -401,12 +646,57 @@ def main(args=None):
     if sys.platform == 'win32':
         signal.signal(signal.SIGBREAK, ctrl_break_handler)
 
-    cli = Cli(tome_api)
     error = SUCCESS
     try:
         cli.run(args)
-    except BaseException as e:
+    except BaseException as e:  # noqa: BLE001 - SystemExit and interruptions are converted to exit codes too
         error = cli.exception_exit_error(e)
+    return error
+
+
+def main(args=None):
+    """main entry point of the tome application, using a Command to
+    parse parameters
+
+    Exit codes for tome command:
+
+    0: Success (done)
+    1: General TomeException error (done)
+    2: Ctrl+C
+    3: Ctrl+Break
+    4: SIGTERM
+    """
+    if args is None:
+        args = sys.argv[1:]
+
+    if args[:1] == ["__complete"]:
+        sys.exit(_complete(args[1:]))
+
+    trace_file = os.getenv("TOME_TRACE")
+    if args and (args[0] == "--trace-startup" or args[0].startswith("--trace-startup=")):
+        if "=" in args[0]:
+            trace_file, args = args[0].split("=", 1)[1], args[1:]
+        elif len(args) > 1:
+            trace_file, args = args[1], args[2:]
+        else:
+            trace_file = None
+        if not trace_file:
+            sys.stderr.write("Error in tome initialization: --trace-startup needs a file to write the trace")
+            sys.exit(ERROR_GENERAL)
+
+    try:
+        if trace_file:
+            start_trace(trace_file, os.getenv("TOME_TRACE_FORMAT"))
+        with trace_phase("TomeAPI"):
+            tome_api = TomeAPI()
+    except TomeException as e:
+        finish_trace()
+        sys.stderr.write(f"Error in tome initialization: {e}")
+        sys.exit(ERROR_GENERAL)
+
+    cli = Cli(tome_api)
+    error = run_cli(cli, args)
+    finish_trace()
     sys.exit(error)
 
 
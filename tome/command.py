@@ -6,6 +6,7 @@ from enum import Enum
 
 from tome.api.output import TomeOutput
 from tome.errors import TomeException
+from tome.internal.utils.tracing import trace_phase
 
 
 class CommandType(Enum):
@@ -33,7 +34,7 @@ class BaseTomeCommand:
         self._init_formatters(formatters)
         self._init_doc()
 
-        self.parser = None
+        self._parser = None
         self.namespace = None
         self.module_name = None
 
@@ -62,6 +63,26 @@ class BaseTomeCommand:
         """
         return [formatter for formatter in self._formatters if formatter != "text"]
 
+    @property
+    def parser(self):
+        """The argument parser of the command, built the first time it is needed to run it or show its help"""
+        if self._parser is None:
+            self._init_parser()
+        return self._parser
+
+    def _init_parser(self):
+        """Build a parser with only the common options, commands that define more arguments extend it"""
+        self._parser = TomeArgumentParser(
+            description=self._doc, prog=f"tome {self._name}", formatter_class=SmartFormatter
+        )
+
+    def reset_parser(self):
+        """
+        Discard the argument parser, the command functions add their arguments to it every time they
+        run, so it has to be built again to run the command more than once in the same process.
+        """
+        self._parser = None
+
     @property
     def fullname(self):
         return f"{self.namespace}:{self.name}"
@@ -150,28 +171,26 @@ class TomeCommand(BaseTomeCommand):
         self.subcommands = {}
         self.base_folder = None
         self.parent = parent
-        self._init_parser()
+        if parent is not None:
+            parent.subcommands[self.name] = self
 
     def _init_parser(self):
-        if self.parent is None:
-            self.parser = TomeArgumentParser(
-                description=self._doc,
-                prog=f"tome {self._name}",
-                formatter_class=SmartFormatter,
-            )
-        else:
-            if not self.parent.parser.subparser:
-                subparser = self.parent.parser.add_subparsers(
-                    dest=f'{self.parent.name}_subcommand', help='sub-command help'
-                )
-                subparser.required = True
-                self.parent.parser.subparser = subparser
-            else:
-                subparser = self.parent.parser.subparser
-
-            self.parser = subparser.add_parser(self._name, help=self._doc)
-            self.parent.subcommands[self.name] = self
-        self.parser.add_formatters_argument(self._available_formatters)
+        # The parsers of a tree of subcommands are built together, from the root command
+        if self.parent is not None:
+            self.parent._init_parser()
+            return
+        super()._init_parser()
+        self._set_parser(self._parser)
+
+    def _set_parser(self, parser):
+        self._parser = parser
+        parser.add_formatters_argument(self._available_formatters)
+        if self.subcommands:
+            subparser = parser.add_subparsers(dest=f'{self.name}_subcommand', help='sub-command help')
+            subparser.required = True
+            parser.subparser = subparser
+            for subcommand in self.subcommands.values():
+                subcommand._set_parser(subparser.add_parser(subcommand.name, help=subcommand.doc))
 
     def run(self, tome_api, *args):
         info = self._method(tome_api, self.parser, *args)
@@ -189,8 +208,15 @@ class TomeCommand(BaseTomeCommand):
 
 
 class TomeShellCommand(BaseTomeCommand):
-    def __init__(self, script):
-        runner, description = self._get_runner_description(script)
+    def __init__(self, script, runner=None, description=None):
+        """
+        :param script: Path to the script.
+        :param runner: The interpreter command to run the script, as stored in the index at install time.
+                       If not provided, it is read from the script together with the description.
+        :param description: The description of the command, as stored in the index.
+        """
+        if runner is None:
+            runner, description = self._get_runner_description(script)
 
         def method_wrapper(tome_api, parser, *args, **kwargs):  # noqa
             command = [*runner, script, *[str(arg) for arg in args]]
@@ -206,9 +232,6 @@ class TomeShellCommand(BaseTomeCommand):
 
         basename = os.path.basename(script)[len("tome_") :]
         self._name = basename.replace("_", "-").replace(".", "-")
-        self.parser = TomeArgumentParser(
-            description=self._doc, prog=f"tome {self._name}", formatter_class=SmartFormatter
-        )
 
     def run(self, tome_api, *args):
         if any(arg in ('--help', '-h') for arg in args[0]):
@@ -219,7 +242,7 @@ class TomeShellCommand(BaseTomeCommand):
     @staticmethod
     def _get_runner_description(script):
         runner, description = None, None
-        with open(script, 'r') as f:
+        with trace_phase("_get_runner_description", script=script), open(script, 'r') as f:
             for line in f:
                 line = line.strip()
                 if runner is None:
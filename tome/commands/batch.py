@@ -0,0 +1,29 @@
+import time
+
+from tome.api.output import TomeOutput
+from tome.command import tome_command
+from tome.internal.batch import read_batch, run_batch
+from tome.internal.formatters.printers import print_command_lines_json, print_command_lines_text
+
+
+@tome_command(formatters={"text": print_command_lines_text, "json": print_command_lines_json})
+def batch(tome_api, parser, *args):
+    """
+    Run many tome command lines in sequence in a single process.
+
+    The file has one command line per line, or it is a JSON or YAML list of command lines or lists of
+    arguments. The commands are registered only once for the whole batch. The json format captures
+    the output of every command line in the summary.
+    """
+    parser.add_argument("file", help="File with the command lines to run, '-' to read them from stdin.")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop running command lines after one fails.")
+    args = parser.parse_args(*args)
+    command_lines = read_batch(args.file)
+
+    start = time.perf_counter()
+    commands = run_batch(tome_api, command_lines, capture=args.format == "json", fail_fast=args.fail_fast)
+    # The command lines can change the verbosity, the summary uses the one of the batch
+    TomeOutput.define_log_level(args.verbose, args.quiet)
+    for command in commands:
+        command["duration"] = round(command["duration"], 3)
+    return {"commands": commands, "total": len(command_lines), "duration": round(time.perf_counter() - start, 3)}
@@ -0,0 +1,67 @@
+import json
+
+from tome.api.output import TomeOutput
+from tome.command import tome_command
+from tome.errors import TomeException
+from tome.internal.cache import TomePaths
+
+
+def print_daemon_text(result):
+    output = TomeOutput(stdout=True)
+    output.info(result["message"])
+    for key in ("pid", "home", "socket", "commands", "running", "uptime"):
+        if key in result:
+            output.info(f"{key}: {result[key]}")
+
+
+def print_daemon_json(result):
+    TomeOutput(stdout=True).print_json(json.dumps(result, indent=4))
+
+
+@tome_command()
+def daemon(tome_api, parser, *args):
+    """
+    Keep tome loaded in the background to run the commands faster.
+
+    While the daemon is running, every tome command line for the same home is executed by it,
+    without loading the commands again. It reloads them when the installed commands change.
+    """
+
+
+@tome_command(parent=daemon, formatters={"text": print_daemon_text, "json": print_daemon_json})
+def start(tome_api, parser, *args):
+    """Start the daemon for the current tome home."""
+    parser.add_argument(
+        "--foreground", action="store_true", help="Run the daemon in this process instead of in the background."
+    )
+    args = parser.parse_args(*args)
+    from tome.internal.daemon import TomeDaemon, start_background
+
+    if args.foreground:
+        TomeDaemon(tome_api.cache_folder).serve()
+        return {"message": "tome daemon stopped"}
+    status = start_background(tome_api.cache_folder)
+    return {"message": "tome daemon started", **status}
+
+
+@tome_command(parent=daemon, formatters={"text": print_daemon_text, "json": print_daemon_json})
+def stop(tome_api, parser, *args):
+    """Stop the daemon of the current tome home."""
+    parser.parse_args(*args)
+    from tome.internal.daemon import request
+
+    if request(TomePaths(tome_api.cache_folder).daemon_socket_path, {"control": "stop"}) is None:
+        raise TomeException(f"There is no tome daemon running for '{tome_api.cache_folder}'")
+    return {"message": "tome daemon stopped"}
+
+
+@tome_command(parent=daemon, formatters={"text": print_daemon_text, "json": print_daemon_json})
+def status(tome_api, parser, *args):
+    """Show the status of the daemon of the current tome home."""
+    parser.parse_args(*args)
+    from tome.internal.daemon import request
+
+    status = request(TomePaths(tome_api.cache_folder).daemon_socket_path, {"control": "status"})
+    if status is None:
+        return {"message": "tome daemon not running"}
+    return {"message": "tome daemon running", **status}
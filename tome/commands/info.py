@@ -31,7 +31,11 @@ def print_info_json(result):
     output.print_json(json.dumps(result, indent=4))
 
 
-@tome_command(formatters={"text": print_info_text, "json": print_info_json})
+def print_info_ndjson(result):
+    TomeOutput(stdout=True).print_ndjson([result])
+
+
+@tome_command(formatters={"text": print_info_text, "json": print_info_json, "ndjson": print_info_ndjson})
 def info(tome_api, parser, *args):
     """
     Get information about a specific command.
@@ -1,4 +1,5 @@
 import json
+
 from tome.api.output import TomeOutput
 from tome.command import tome_command
 from tome.errors import TomeException
@@ -31,6 +32,11 @@ def install(tome_api, parser, *args):
 
     The source can be a git repository, a folder, or a zip file (local or http).
     Editable installations are supported with the -e/--editable flag.
+
+    Git repositories are kept as mirrors in the git_mirrors folder of the tome home, so installing
+    or updating them again only fetches what changed. The mirror is removed when no installed tome
+    comes from that repository. Set TOME_GIT_MIRRORS=0 to clone only the commit and folder to install
+    instead, without keeping a mirror.
     """
     parser.add_argument(
         "source",
@@ -26,7 +26,24 @@ def print_list_json(result):
     output.print_json(json.dumps(results, indent=4, ensure_ascii=False))
 
 
-@tome_command(formatters={"text": print_grouped_commands, "json": print_list_json})
+def print_list_ndjson(result):
+    records = (
+        {
+            "origin": origin,
+            "namespace": namespace,
+            "name": command_info.name,
+            "doc": command_info.doc,
+            "type": command_info.type.name,
+            "error": command_info.error,
+        }
+        for origin, namespaces in result.items()
+        for namespace, command_info_list in namespaces.items()
+        for command_info in command_info_list
+    )
+    TomeOutput(stdout=True).print_ndjson(records)
+
+
+@tome_command(formatters={"text": print_grouped_commands, "json": print_list_json, "ndjson": print_list_ndjson})
 def list(tome_api, parser, *args):
     """
     List all the commands that match a given pattern.
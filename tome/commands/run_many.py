@@ -0,0 +1,53 @@
+import os
+import shlex
+import time
+
+from tome.command import tome_command
+from tome.errors import TomeException
+from tome.internal.batch import read_batch
+from tome.internal.formatters.printers import print_command_lines_json, print_command_lines_text
+from tome.internal.parallel import ParallelRunner
+
+
+@tome_command(formatters={"text": print_command_lines_text, "json": print_command_lines_json})
+def run_many(tome_api, parser, *args):
+    """
+    Run many tome command lines concurrently.
+
+    The file has the command lines like the ones of 'tome batch', or the argument sets to run the same
+    command with --command. Every line of their output is prefixed by the command line that printed it,
+    use --group to print the whole output of each one together when it finishes instead.
+    """
+    parser.add_argument(
+        "file", help="File with the command lines or argument sets to run, '-' to read them from stdin."
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Maximum number of command lines running at the same time. By default, the number of CPUs.",
+    )
+    parser.add_argument("--command", help="Run this command with every line of the file as its arguments.")
+    parser.add_argument(
+        "--group", action="store_true", help="Print the output of every command line together when it finishes."
+    )
+    parser.add_argument("--fail-fast", action="store_true", help="Don't start more command lines after one fails.")
+    args = parser.parse_args(*args)
+    if args.jobs < 1:
+        raise TomeException("The number of jobs must be at least 1")
+
+    command_lines = read_batch(args.file)
+    labels = None
+    if args.command:
+        labels = [shlex.join(arguments) for arguments in command_lines]
+        command_lines = [[args.command, *arguments] for arguments in command_lines]
+
+    start = time.perf_counter()
+    runner = ParallelRunner(
+        tome_api, args.jobs, group=args.group, capture=args.format == "json", fail_fast=args.fail_fast
+    )
+    commands = runner.run(command_lines, labels)
+    for command in commands:
+        command["duration"] = round(command["duration"], 3)
+    return {"commands": commands, "total": len(command_lines), "duration": round(time.perf_counter() - start, 3)}
@@ -0,0 +1,88 @@
+import json
+
+from tome.api.output import TomeOutput
+from tome.command import tome_command
+from tome.errors import TomeException
+from tome.internal.source import Source
+
+
+def _check_failures(results):
+    failed = [result["uri"] for result in results if result["error"]]
+    if failed:
+        raise TomeException(f"{len(failed)} of {len(results)} sources failed to update: {', '.join(failed)}")
+
+
+def print_update_text(results):
+    output = TomeOutput(stdout=True)
+    for result in results:
+        if result["error"]:
+            output.info(f"Failed to update source: {result['uri']}")
+        elif result["updated"]:
+            output.info(f"Updated source: {result['uri']}")
+            if result["commit"]:
+                output.info(f"Commit: {result['commit']}")
+        else:
+            output.info(f"Source up to date: {result['uri']}")
+    _check_failures(results)
+
+
+def print_update_json(results):
+    output = TomeOutput(stdout=True)
+    output.print_json(json.dumps(results, indent=4))
+    _check_failures(results)
+
+
+@tome_command(formatters={"text": print_update_text, "json": print_update_json})
+def update(tome_api, parser, *args):
+    """
+    Update installed tomes to the current content of their sources.
+
+    Only the files that changed since they were installed are written, and the requirements are
+    installed again only if the requirements.txt changed. Git sources can be updated to another
+    branch, tag or commit with <source>@<version>.
+    """
+    parser.add_argument(
+        "source",
+        nargs="?",
+        help="Source of the installed tome: a git repository, folder, or zip file (local or http).",
+    )
+    parser.add_argument("--all", action="store_true", help="Update all the installed tomes, except the editable ones.")
+    parser.add_argument(
+        "--create-env",
+        action="store_true",
+        help="Create a new virtual environment if the requirements of a tome changed.",
+    )
+    parser.add_argument(
+        "--force-requirements",
+        action="store_true",
+        help="Install requirements even if not running tome in a virtual environment.",
+    )
+    args = parser.parse_args(*args)
+
+    if args.all == bool(args.source):
+        raise TomeException("Specify the source of the tome to update or --all to update all of them.")
+    sources = tome_api.install.installed_sources() if args.all else [Source.parse(args.source)]
+
+    output = TomeOutput()
+    results = []
+    for source in sources:
+        try:
+            source, updated = tome_api.install.update_from_source(source, args.force_requirements, args.create_env)
+            error = None
+        except TomeException as e:
+            if not args.all:
+                raise
+            output.error(f"Failed to update {source}: {e}")
+            updated, error = False, str(e)
+        results.append(
+            {
+                "uri": source.uri,
+                "type": str(source.type),
+                "version": source.version,
+                "commit": source.commit,
+                "folder": source.folder,
+                "updated": updated,
+                "error": error,
+            }
+        )
+    return results
@@ -28,6 +28,13 @@ def print_vault_json(result):
     TomeOutput(stdout=True).print_json(json.dumps(result_to_print, indent=4))
 
 
+def print_list_secrets_ndjson(result):
+    records = (
+        {"vault": vault_name, **item} for vault_name, secrets_list in result["vaults"].items() for item in secrets_list
+    )
+    TomeOutput(stdout=True).print_ndjson(records)
+
+
 def print_list_secrets_text(result):
     output = TomeOutput(stdout=True)
     vaults = result.get("vaults", {})
@@ -115,7 +122,10 @@ def delete_secret(tome_api, parser, *args):
     }
 
 
-@tome_command(parent=vault, formatters={"text": print_list_secrets_text, "json": print_vault_json})
+@tome_command(
+    parent=vault,
+    formatters={"text": print_list_secrets_text, "json": print_vault_json, "ndjson": print_list_secrets_ndjson},
+)
 def list_secrets(tome_api, parser, *args):
     """List available secrets id's and descriptions in all vaults"""
     args = parser.parse_args(*args)
@@ -0,0 +1,145 @@
+"""
+Execution of many tome command lines in sequence in the same process, registering the commands only once
+instead of paying the startup of tome for every one of them.
+"""
+
+import io
+import json
+import os
+import shlex
+import signal
+import sys
+import time
+from contextlib import nullcontext, redirect_stdout
+
+from tome.api.output import TomeOutput
+from tome.cli import Cli
+from tome.errors import TomeException
+from tome.exit_codes import SUCCESS
+from tome.internal.cache import installation_state
+from tome.internal.utils.files import load
+
+
+def parse_batch(content, filename=None):
+    """
+    Get the command lines of a batch. It can be a JSON or YAML list whose items are command lines or lists
+    of arguments, or a text with one command line per line, ignoring empty lines and '#' comments.
+
+    :param content: The text of the batch.
+    :param filename: The file it was read from, a .json, .yml or .yaml extension selects the format.
+                     Without it, lists are detected from the content.
+    :return: A list with the arguments of every command line.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    first_line = next((line.strip() for line in content.splitlines() if line.strip()), "")
+    if extension == ".json" or (extension not in (".yml", ".yaml") and first_line.startswith("[")):
+        try:
+            items = json.loads(content)
+        except ValueError as e:
+            raise TomeException(f"Invalid JSON batch: {e}") from e
+    elif extension in (".yml", ".yaml") or first_line.startswith("- "):
+        import yaml  # Only needed for YAML batches
+
+        try:
+            items = yaml.safe_load(content)
+        except yaml.YAMLError as e:
+            raise TomeException(f"Invalid YAML batch: {e}") from e
+    else:
+        items = [line for line in content.splitlines() if line.strip() and not line.strip().startswith("#")]
+
+    if not isinstance(items, list):
+        raise TomeException("A batch must be a list of command lines")
+    command_lines = []
+    for item in items:
+        if isinstance(item, str):
+            try:
+                args = shlex.split(item, comments=True)
+            except ValueError as e:
+                raise TomeException(f"Invalid command line in the batch '{item}': {e}") from e
+        elif isinstance(item, list) and all(isinstance(arg, (str, int, float)) for arg in item):
+            args = [str(arg) for arg in item]
+        else:
+            raise TomeException(f"Invalid command line in the batch: {item!r}")
+        if args:
+            command_lines.append(args)
+    return command_lines
+
+
+def read_batch(path):
+    """
+    Read the command lines of a batch file, see parse_batch().
+
+    :param path: The path of the file, or '-' to read them from stdin.
+    """
+    if path == "-":
+        return parse_batch(sys.stdin.read())
+    try:
+        content = load(path)
+    except OSError as e:
+        raise TomeException(f"Could not read the batch file '{path}': {e}") from e
+    return parse_batch(content, path)
+
+
+def _recording(handler, received):
+    """Wrap a signal handler to record that the signal was received before calling it"""
+
+    def wrapper(signum, frame):
+        received.append(signum)
+        handler(signum, frame)
+
+    return wrapper
+
+
+def run_batch(tome_api, command_lines, capture=False, fail_fast=False):
+    """
+    Run command lines one after the other with the same registry of commands, which is only registered
+    again if a command line installs or uninstalls commands. An interruption stops the whole batch.
+
+    :param tome_api: The TomeAPI of the home to run the commands.
+    :param command_lines: The arguments of every command line, as returned by parse_batch().
+    :param capture: Capture the output of the commands to stdout instead of printing it.
+    :param fail_fast: Don't run more command lines after one fails.
+    :return: A list with a dict for every command line run with its arguments, exit code, duration in
+             seconds and its output if captured.
+    """
+    received = []
+    handlers = {}
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        handler = signal.getsignal(signum)
+        if callable(handler):
+            handlers[signum] = handler
+            signal.signal(signum, _recording(handler, received))
+
+    previous_cli = tome_api.list.cli
+    cli, state = None, None
+    results = []
+    try:
+        for args in command_lines:
+            current_state = installation_state(tome_api.cache_folder)
+            if cli is None or current_state != state:
+                cli = Cli(tome_api)
+                cli.load_all_commands()
+                state = current_state
+
+            TomeOutput.define_log_level(0, False)  # Every command line starts with the default verbosity
+            output = io.StringIO() if capture else None
+            exit_code = SUCCESS
+            start = time.perf_counter()
+            with redirect_stdout(output) if capture else nullcontext():
+                try:
+                    cli.run(args)
+                except BaseException as e:
+                    if received:
+                        raise
+                    exit_code = cli.exception_exit_error(e) or SUCCESS  # sys.exit() has no code
+            result = {"command": shlex.join(args), "exit_code": exit_code, "duration": time.perf_counter() - start}
+            if capture:
+                result["output"] = output.getvalue()
+            results.append(result)
+            if fail_fast and exit_code != SUCCESS:
+                break
+    finally:
+        tome_api.list.cli = previous_cli
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+    return results
@@ -1,6 +1,84 @@
+import json
 import os
+import stat
+from pathlib import Path
 
-from tome.internal.utils.files import short_hash_path
+from tome.errors import TomeException
+from tome.internal.utils.files import load, short_hash_path
+
+
+def get_tome_home(home=None, base_home='~'):
+    if home:
+        return home
+
+    def _find_tomews_file():
+        path = Path(os.getcwd())
+        while path.is_dir() and len(path.parts) > 1:  # finish at '/'
+            tomews_yml = path / "tomews.yml"
+            if tomews_yml.is_file():
+                return tomews_yml
+            else:
+                path = path.parent
+
+    ws_file = _find_tomews_file()
+    ws_home = None
+    if ws_file:
+        import yaml  # Only needed for workspaces, not worth importing it in every run
+
+        ws = yaml.safe_load(load(ws_file))
+        ws_home = ws.get("home")
+        ws_home = os.path.abspath(os.path.join(os.path.dirname(ws_file), ws_home)) if ws_home else None
+    home = ws_home or os.getenv("TOME_HOME") or os.path.join(os.path.expanduser(base_home), '.tome')
+    return home
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def sort_origins(scripts_path, origins):
+    """
+    Sort the cache origins in the order their commands are registered, from the most recent install to the
+    oldest one. Commands registered later replace the ones with the same name.
+    """
+    return sorted(origins, key=lambda origin: os.path.getmtime(os.path.join(scripts_path, origin)), reverse=True)
+
+
+def installation_state(cache_folder):
+    """
+    Modification times of everything that defines the registry of commands: the installed origins, the
+    list of editables and the files of the editables that are indexed, the python modules and ``tome_*``
+    scripts of every namespace folder. Processes that keep the commands registered compare it to know
+    when to register them again.
+    """
+    tome_paths = TomePaths(cache_folder)
+    scripts_path = tome_paths.scripts_path
+    state = [os.stat(scripts_path).st_mtime_ns]
+    for origin in sorted(os.listdir(scripts_path)):
+        state.append((origin, os.stat(os.path.join(scripts_path, origin)).st_mtime_ns))
+    editables = []
+    if os.path.isfile(tome_paths.editables_path):
+        state.append(os.stat(tome_paths.editables_path).st_mtime_ns)
+        editables = json.loads(load(tome_paths.editables_path))
+    for editable in editables:
+        source = editable["source"]
+        # Only what scan_origin indexes is checked, modifying data or nested files reloads nothing
+        state.append(source)
+        if not os.path.isdir(source):
+            continue
+        for namespace in sorted(os.listdir(source)):
+            namespace_folder = os.path.join(source, namespace)
+            if namespace.startswith(".") or not os.path.isdir(namespace_folder):
+                continue
+            state.append(namespace)
+            for name in sorted(os.listdir(namespace_folder)):
+                if name.endswith(".py") or name.startswith("tome_"):
+                    state.append((name, _stat_key(os.path.join(namespace_folder, name))))
+    return state
 
 
 class TomePaths:
@@ -20,6 +98,48 @@ class TomePaths:
     def editables_path(self):
         return os.path.join(self._cache_base_folder, "tome_editables.json")
 
+    @property
+    def editables_cache_path(self):
+        return os.path.join(self._cache_base_folder, "tome_editables_cache.json")
+
+    @property
+    def namespaces_path(self):
+        return os.path.join(self._cache_base_folder, "tome_namespaces.json")
+
+    @property
+    def search_index_path(self):
+        return os.path.join(self._cache_base_folder, "tome_search.db")
+
+    @property
+    def completion_path(self):
+        return os.path.join(self._cache_base_folder, "tome_completion.json")
+
+    @property
+    def git_mirrors_path(self):
+        return os.path.join(self._cache_base_folder, "git_mirrors")
+
+    @property
+    def daemon_socket_path(self):
+        socket_path = os.path.join(self._cache_base_folder, "tome_daemon.sock")
+        # Unix socket paths are limited to about 100 characters, long homes use a private folder of the
+        # current user in the temporary folder, other users could replace a socket in a shared one
+        if len(socket_path) > 100 and hasattr(os, "getuid"):
+            import tempfile
+
+            folder = os.path.join(tempfile.gettempdir(), f"tome-{os.getuid()}")
+            os.makedirs(folder, mode=0o700, exist_ok=True)
+            st = os.lstat(folder)
+            if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or stat.S_IMODE(st.st_mode) & 0o077:
+                raise TomeException(
+                    f"The folder '{folder}' of the tome daemon socket must be a folder only accessible by its owner"
+                )
+            socket_path = os.path.join(folder, f"tome_daemon_{short_hash_path(self._cache_base_folder)}.sock")
+        return socket_path
+
+    @property
+    def daemon_log_path(self):
+        return os.path.join(self._cache_base_folder, "tome_daemon.log")
+
 
 class Cache:
     def __init__(self, cache_folder):
@@ -1,9 +1,12 @@
 import hashlib
+import re
+from types import MappingProxyType
 
 
 class Emojinator:
-    def __init__(self):
-        self.emoji_dict = {
+    # Shared by all the instances, read-only so they can't be modified through one of them
+    emoji_dict = MappingProxyType(
+        {
             "release": "🏷️ ",
             "chat": "💬",
             "ai": "🤖",
@@ -101,152 +104,174 @@ class Emojinator:
             "hourglass": "⏳",
             "utility": "🔧",
         }
+    )
 
-        self.default_emojis = [
-            "🐶",
-            "🐱",
-            "🐭",
-            "🐹",
-            "🐰",
-            "🦊",
-            "🐻",
-            "🐼",
-            "🐨",
-            "🐯",
-            "🦁",
-            "🐮",
-            "🐷",
-            "🐽",
-            "🐸",
-            "🐵",
-            "🦄",
-            "🐝",
-            "🐛",
-            "🦋",
-            "🐌",
-            "🐞",
-            "🐜",
-            "🪲",
-            "🐢",
-            "🐍",
-            "🦎",
-            "🐙",
-            "🦑",
-            "🦐",
-            "🦞",
-            "🦀",
-            "🐡",
-            "🐠",
-            "🐟",
-            "🐬",
-            "🐳",
-            "🐋",
-            "🦈",
-            "🐊",
-            "🐅",
-            "🐆",
-            "🦓",
-            "🦍",
-            "🦧",
-            "🦣",
-            "🦏",
-            "🐘",
-            "🦛",
-            "🐪",
-            "🐫",
-            "🦙",
-            "🦒",
-            "🐃",
-            "🐂",
-            "🐎",
-            "🐖",
-            "🐏",
-            "🐑",
-            "🦌",
-            "🐐",
-            "🐓",
-            "🦃",
-            "🦤",
-            "🐕",
-            "🐩",
-            "🦮",
-            "🐕‍🦺",
-            "🐈",
-            "🐈‍⬛",
-            "🪶",
-            "🦜",
-            "🦢",
-            "🦩",
-            "🕊️",
-            "🐇",
-            "🦝",
-            "🦨",
-            "🦡",
-            "🦦",
-            "🦥",
-            "🐁",
-            "🐀",
-            "🐿️",
-            "🦔",
-            "🌵",
-            "🎄",
-            "🌲",
-            "🌳",
-            "🌴",
-            "🪵",
-            "🌱",
-            "🌿",
-            "☘️",
-            "🍀",
-            "🎍",
-            "🪴",
-            "🎋",
-            "🍃",
-            "🍂",
-            "🍁",
-            "🍄",
-            "🐚",
-            "🪨",
-            "🌍",
-            "🌎",
-            "🌏",
-            "🌐",
-            "🪐",
-            "🌤️",
-            "⛅",
-            "🌥️",
-            "🌦️",
-            "🌈",
-            "☁️",
-            "🌧️",
-            "⛈️",
-            "🌩️",
-            "🌨️",
-            "❄️",
-            "☃️",
-            "⛄",
-            "🌬️",
-            "💨",
-            "💧",
-            "💦",
-            "🌊",
-            "🔥",
-            "💫",
-            "⭐",
-            "🌟",
-            "✨",
-            "⚡",
-            "⛱️",
-        ]
+    default_emojis = (
+        "🐶",
+        "🐱",
+        "🐭",
+        "🐹",
+        "🐰",
+        "🦊",
+        "🐻",
+        "🐼",
+        "🐨",
+        "🐯",
+        "🦁",
+        "🐮",
+        "🐷",
+        "🐽",
+        "🐸",
+        "🐵",
+        "🦄",
+        "🐝",
+        "🐛",
+        "🦋",
+        "🐌",
+        "🐞",
+        "🐜",
+        "🪲",
+        "🐢",
+        "🐍",
+        "🦎",
+        "🐙",
+        "🦑",
+        "🦐",
+        "🦞",
+        "🦀",
+        "🐡",
+        "🐠",
+        "🐟",
+        "🐬",
+        "🐳",
+        "🐋",
+        "🦈",
+        "🐊",
+        "🐅",
+        "🐆",
+        "🦓",
+        "🦍",
+        "🦧",
+        "🦣",
+        "🦏",
+        "🐘",
+        "🦛",
+        "🐪",
+        "🐫",
+        "🦙",
+        "🦒",
+        "🐃",
+        "🐂",
+        "🐎",
+        "🐖",
+        "🐏",
+        "🐑",
+        "🦌",
+        "🐐",
+        "🐓",
+        "🦃",
+        "🦤",
+        "🐕",
+        "🐩",
+        "🦮",
+        "🐕‍🦺",
+        "🐈",
+        "🐈‍⬛",
+        "🪶",
+        "🦜",
+        "🦢",
+        "🦩",
+        "🕊️",
+        "🐇",
+        "🦝",
+        "🦨",
+        "🦡",
+        "🦦",
+        "🦥",
+        "🐁",
+        "🐀",
+        "🐿️",
+        "🦔",
+        "🌵",
+        "🎄",
+        "🌲",
+        "🌳",
+        "🌴",
+        "🪵",
+        "🌱",
+        "🌿",
+        "☘️",
+        "🍀",
+        "🎍",
+        "🪴",
+        "🎋",
+        "🍃",
+        "🍂",
+        "🍁",
+        "🍄",
+        "🐚",
+        "🪨",
+        "🌍",
+        "🌎",
+        "🌏",
+        "🌐",
+        "🪐",
+        "🌤️",
+        "⛅",
+        "🌥️",
+        "🌦️",
+        "🌈",
+        "☁️",
+        "🌧️",
+        "⛈️",
+        "🌩️",
+        "🌨️",
+        "❄️",
+        "☃️",
+        "⛄",
+        "🌬️",
+        "💨",
+        "💧",
+        "💦",
+        "🌊",
+        "🔥",
+        "💫",
+        "⭐",
+        "🌟",
+        "✨",
+        "⚡",
+        "⛱️",
+    )
 
-    def get_emoji(self, namespace):
-        # Check for matches in the namespace
-        for key in self.emoji_dict:
-            if key in namespace:
-                return self.emoji_dict[key]
+    # Compiled once, at the first lookup
+    _matcher = None
+    _priority = None
+
+    def __init__(self):
+        # {namespace: emoji} of every namespace printed with this instance, it lives as long as a listing
+        self._cache = {}
+
+    @classmethod
+    def _compile(cls):
+        # A lookahead finds the keys at every position of the namespace, including overlapping ones. At each
+        # position the alternation matches the first key in the order of emoji_dict, the one that has priority
+        cls._matcher = re.compile(f"(?=({'|'.join(re.escape(key) for key in cls.emoji_dict)}))")
+        cls._priority = {key: index for index, key in enumerate(cls.emoji_dict)}
 
-        # If no specific match found, return a hashed default emoji
-        return self.get_hashed_emoji(namespace)
+    def get_emoji(self, namespace):
+        emoji = self._cache.get(namespace)
+        if emoji is None:
+            if self._matcher is None:
+                self._compile()
+            # The first key of emoji_dict found in the namespace
+            keys = [match.group(1) for match in self._matcher.finditer(namespace)]
+            if keys:
+                emoji = self.emoji_dict[min(keys, key=self._priority.__getitem__)]
+            else:
+                # If no specific match found, return a hashed default emoji
+                emoji = self.get_hashed_emoji(namespace)
+            self._cache[namespace] = emoji
+        return emoji
 
     def get_hashed_emoji(self, namespace):
         # Hash the namespace to get a consistent but seemingly random index
@@ -0,0 +1,130 @@
+"""
+Shell completion for tome. The shells call the hidden ``tome __complete`` entry point, which answers from
+a file in the tome home with the names of all the commands and their options, regenerated every time the
+installed commands change. Completing never creates the TomeAPI nor loads any command.
+"""
+
+import json
+import os
+
+from tome.internal.cache import TomePaths, sort_origins
+from tome.internal.index import read_index, scan_module, scan_origin
+from tome.internal.utils.files import load, save
+
+COMPLETION_VERSION = 1
+# Options of every command, added by TomeArgumentParser
+COMMON_OPTIONS = ["-h", "--help", "-v", "--verbose", "-q", "--quiet"]
+TOME_OPTIONS = ["-h", "--help", "-v", "--version", "--trace-startup"]
+
+SHELL_SCRIPTS = {
+    "bash": """\
+_tome_complete() {
+    local line="${COMP_LINE:0:COMP_POINT}"
+    local IFS=$'\\n'
+    COMPREPLY=($(tome __complete --line "$line" 2>/dev/null))
+    # bash splits the words at ':' by default, only the part after the last one is replaced
+    local word="${line##*[[:space:]]}"
+    if [[ "$word" == *:* && "$COMP_WORDBREAKS" == *:* ]]; then
+        COMPREPLY=("${COMPREPLY[@]#"${word%:*}:"}")
+    fi
+}
+complete -o default -F _tome_complete tome
+""",
+    "zsh": """\
+_tome() {
+    local -a candidates
+    candidates=("${(@f)$(tome __complete -- "${(@)words[2,CURRENT]}" 2>/dev/null)}")
+    if (( ${#candidates[@]} )) && [[ -n "${candidates[1]}" ]]; then
+        compadd -- "${candidates[@]}"
+    else
+        _files
+    fi
+}
+compdef _tome tome
+""",
+    "fish": """\
+complete -c tome -a '(tome __complete -- (commandline -opc)[2..-1] (commandline -ct) 2>/dev/null)'
+""",
+}
+
+
+def _command_completion(command):
+    options = list(COMMON_OPTIONS)
+    if command.get("formatters"):
+        options += ["-f", "--format"]
+    options += [option for option in command.get("options", []) if option not in options]
+    subcommands = command.get("subcommands", {})
+    return {"options": options, "subcommands": {name: _command_completion(sub) for name, sub in subcommands.items()}}
+
+
+def write_completion(cache_folder):
+    """
+    Generate the completion data of all the commands: built-in, installed in the cache and editables.
+    Everything is extracted statically, from the indexes of the origins or parsing their sources.
+    """
+    commands = {}
+    built_in_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "commands")
+    for module in sorted(os.listdir(built_in_folder)):
+        if module.endswith(".py") and not module.startswith("_"):
+            for command in scan_module(os.path.join(built_in_folder, module)):
+                commands[command["name"]] = _command_completion(command)
+
+    # Same precedence as the registered commands: cache origins from the most recent to the oldest one,
+    # then editables, the last one wins
+    tome_paths = TomePaths(cache_folder)
+    scripts_path = tome_paths.scripts_path
+    origins = [origin for origin in os.listdir(scripts_path) if os.path.isdir(os.path.join(scripts_path, origin))]
+    folders = [os.path.join(scripts_path, origin) for origin in sort_origins(scripts_path, origins)]
+    if os.path.isfile(tome_paths.editables_path):
+        editables = json.loads(load(tome_paths.editables_path))
+        folders.extend(editable["source"] for editable in editables if os.path.isdir(editable["source"]))
+    for folder in folders:
+        entries = read_index(folder)
+        if entries is None:
+            entries = scan_origin(folder)
+        for entry in entries:
+            if entry["name"] is not None:
+                commands[f"{entry['namespace']}:{entry['name']}"] = _command_completion(entry)
+
+    data = {"version": COMPLETION_VERSION, "commands": commands}
+    save(tome_paths.completion_path, json.dumps(data, ensure_ascii=False))
+    return commands
+
+
+def _read_completion(cache_folder):
+    completion_file = TomePaths(cache_folder).completion_path
+    if os.path.isfile(completion_file):
+        try:
+            data = json.loads(load(completion_file))
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and data.get("version") == COMPLETION_VERSION:
+            return data["commands"]
+    return write_completion(cache_folder)
+
+
+def complete(cache_folder, words):
+    """
+    Get the completion candidates of the last word of a command line.
+
+    :param cache_folder: The tome home.
+    :param words: The words after ``tome``, the last one is the one being completed, empty for a new word.
+    :return: The sorted list of candidates.
+    """
+    words = words or [""]
+    current = words[-1]
+    if len(words) == 1:
+        if current.startswith("-"):
+            return [option for option in TOME_OPTIONS if option.startswith(current)]
+        return sorted(name for name in _read_completion(cache_folder) if name.startswith(current))
+
+    command = _read_completion(cache_folder).get(words[0])
+    if command is None:
+        return []
+    # Follow the subcommands already typed, ignoring the options and their values
+    for word in words[1:-1]:
+        if word in command["subcommands"]:
+            command = command["subcommands"][word]
+    if current.startswith("-"):
+        return sorted(option for option in command["options"] if option.startswith(current))
+    return sorted(name for name in command["subcommands"] if name.startswith(current))
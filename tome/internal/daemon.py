@@ -0,0 +1,396 @@
+"""
+Daemon that keeps tome loaded to run the commands faster, started with ``tome daemon start``.
+The client side is imported by the tome executable before anything else, so it must stay light.
+
+The daemon process keeps the TomeAPI, the registry of all the commands and the modules of the commands
+already run. For every command line it forks a process that inherits all of that and runs it with the
+cwd, environment variables and standard streams of the ``tome`` client, whose file descriptors are
+passed through the Unix socket. The registry is loaded again when the installed origins or the files of
+the editables change.
+"""
+
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import time
+
+from tome.errors import TomeException
+from tome.exit_codes import ERROR_UNEXPECTED, USER_CTRL_C
+from tome.internal.cache import TomePaths, get_tome_home, installation_state
+
+# Length prefix of the messages, both requests and responses are JSON documents
+_HEADER = struct.Struct("!I")
+_STREAMS = 3  # stdin, stdout and stderr
+
+
+def is_supported():
+    return hasattr(os, "fork") and hasattr(socket, "send_fds")
+
+
+def _send_message(sock, message, fds=()):
+    data = json.dumps(message).encode("utf-8")
+    data = _HEADER.pack(len(data)) + data
+    if fds:
+        sent = socket.send_fds(sock, [data], list(fds))
+        data = data[sent:]
+    sock.sendall(data)
+
+
+def _receive_message(sock):
+    """
+    :return: The message and the file descriptors received with it, None if the connection was closed.
+    """
+    data, fds, _, _ = socket.recv_fds(sock, 64 * 1024, _STREAMS)
+    while len(data) < _HEADER.size or len(data) < _HEADER.size + _HEADER.unpack_from(data)[0]:
+        chunk = sock.recv(64 * 1024)
+        if not chunk:
+            for fd in fds:
+                os.close(fd)
+            return None, []
+        data += chunk
+    size = _HEADER.unpack_from(data)[0]
+    return json.loads(data[_HEADER.size : _HEADER.size + size]), fds
+
+
+def _connect(socket_path):
+    # The environment and the terminal of this process are sent to the daemon, only to one of this user
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f"The socket '{socket_path}' is not owned by the current user")
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except OSError:
+        client.close()
+        raise
+    return client
+
+
+def forward(socket_path, args):
+    """
+    Run a tome command line in the daemon listening in a socket, with the cwd, environment and standard
+    streams of this process.
+
+    :return: The exit code of the command, None if there is no daemon to run it.
+    """
+    if not is_supported():
+        return None
+    try:
+        client = _connect(socket_path)
+    except OSError:  # A daemon that didn't finish cleanly can leave the socket file
+        return None
+    with client:
+        request = {"argv": args, "cwd": os.getcwd(), "env": dict(os.environ)}
+        try:
+            for stream in (sys.stdout, sys.stderr):
+                stream.flush()
+            _send_message(client, request, range(_STREAMS))
+        except OSError:  # Not sent, e.g. a closed standard stream, it can run in this process
+            return None
+        try:
+            response, _ = _receive_message(client)
+        except KeyboardInterrupt:
+            # Closing the connection makes the daemon interrupt the command
+            return USER_CTRL_C
+        except OSError:
+            response = None
+    if response is None:
+        sys.stderr.write("Error: The tome daemon stopped while running the command\n")
+        return ERROR_UNEXPECTED
+    return response["exit_code"]
+
+
+def run_in_daemon(args):
+    """
+    Run a command line in the daemon of the tome home, if there is one running.
+
+    :return: The exit code, or None if the command line must run in this process.
+    """
+    # The daemon is always managed from this process, and the traces are of the in-process startup
+    if args[:1] in (["daemon"], ["__complete"]) or os.getenv("TOME_TRACE"):
+        return None
+    if args and args[0].startswith("--trace-startup"):
+        return None
+    try:
+        socket_path = TomePaths(get_tome_home()).daemon_socket_path
+    except TomeException:  # The command reports it if it's about the daemon, the rest run in this process
+        return None
+    if not os.path.exists(socket_path):
+        return None
+    return forward(socket_path, args)
+
+
+def request(socket_path, message, timeout=10):
+    """
+    Send a control message to the daemon: ``{"control": "status"}`` or ``{"control": "stop"}``.
+
+    :return: The response, None if there is no daemon running.
+    """
+    try:
+        client = _connect(socket_path)
+    except OSError:
+        return None
+    with client:
+        client.settimeout(timeout)
+        _send_message(client, message)
+        response, _ = _receive_message(client)
+    return response
+
+
+def start_background(cache_folder, timeout=10):
+    """
+    Start a daemon for a tome home in a new process, detached from the current session.
+
+    :return: The status of the daemon once it is listening.
+    """
+    import subprocess
+
+    tome_paths = TomePaths(cache_folder)
+    if request(tome_paths.daemon_socket_path, {"control": "status"}) is not None:
+        raise TomeException(f"There is already a tome daemon running for '{cache_folder}'")
+    env = dict(os.environ, TOME_HOME=cache_folder)
+    with open(tome_paths.daemon_log_path, "ab") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "tome", "daemon", "start", "--foreground"],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            env=env,
+            cwd=cache_folder,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = request(tome_paths.daemon_socket_path, {"control": "status"})
+        if status is not None:
+            return status
+        if process.poll() is not None:
+            break
+        time.sleep(0.05)
+    raise TomeException(f"The tome daemon didn't start, check '{tome_paths.daemon_log_path}'")
+
+
+class TomeDaemon:
+    """Server of the tome daemon, listening for command lines in the socket of a tome home"""
+
+    def __init__(self, cache_folder):
+        self._cache_folder = cache_folder
+        self._socket_path = TomePaths(cache_folder).daemon_socket_path
+        self._cli = None
+        self._state = None
+        self._started = None
+        self._running = False
+        self._server = None
+        self._selector = None
+        # {connection: pid} of the command lines running in forked processes
+        self._children = {}
+
+    def _refresh(self):
+        """Load all the commands again if the installation changed since the last command line"""
+        from tome.api.api import TomeAPI
+        from tome.cli import Cli
+
+        state = installation_state(self._cache_folder)
+        if self._cli is not None and state == self._state:
+            return
+        self._cli = Cli(TomeAPI(cache_folder=self._cache_folder))
+        self._cli.load_all_commands()
+        self._state = state
+
+    def _status(self):
+        return {
+            "pid": os.getpid(),
+            "home": self._cache_folder,
+            "socket": self._socket_path,
+            "uptime": round(time.monotonic() - self._started, 1),
+            "commands": len(self._cli.commands),
+            "running": len(self._children),
+        }
+
+    def serve(self):
+        """Listen for command lines until a stop message or SIGTERM"""
+        if not is_supported():
+            raise TomeException("The tome daemon needs fork() and Unix sockets, not available in this platform")
+        if os.path.exists(self._socket_path):
+            if request(self._socket_path, {"control": "status"}) is not None:
+                raise TomeException(f"There is already a tome daemon running for '{self._cache_folder}'")
+            os.remove(self._socket_path)
+
+        self._refresh()
+        # Modules used by most of the command lines, imported once here instead of in every forked process
+        import argparse  # noqa: F401
+        from importlib import metadata  # noqa: F401
+
+        import rich.console  # noqa: F401
+        import rich.text  # noqa: F401
+
+        self._started = time.monotonic()
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)  # Only the owner can connect
+        try:
+            self._server.bind(self._socket_path)
+        finally:
+            os.umask(old_umask)
+        self._server.listen(64)
+
+        # The signals wake up the selector writing to this socket, SIGCHLD to report the finished commands
+        wakeup_read, wakeup_write = socket.socketpair()
+        wakeup_read.setblocking(False)
+        wakeup_write.setblocking(False)
+        signal.set_wakeup_fd(wakeup_write.fileno())
+        signal.signal(signal.SIGCHLD, lambda *_: None)
+        signal.signal(signal.SIGTERM, lambda *_: self._stop_listening())
+        signal.signal(signal.SIGINT, lambda *_: self._stop_listening())
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._server, selectors.EVENT_READ)
+        self._selector.register(wakeup_read, selectors.EVENT_READ)
+        self._running = True
+        try:
+            while self._running or self._children:
+                for key, _ in self._selector.select():
+                    if key.fileobj is self._server:
+                        self._accept()
+                    elif key.fileobj is wakeup_read:
+                        try:
+                            while wakeup_read.recv(1024):
+                                pass
+                        except BlockingIOError:
+                            pass
+                    else:
+                        self._client_closed(key.fileobj)
+                self._reap()
+        finally:
+            self._stop_listening()
+            signal.set_wakeup_fd(-1)
+            self._selector.close()
+            wakeup_read.close()
+            wakeup_write.close()
+
+    def _stop_listening(self):
+        self._running = False
+        if self._server is not None:
+            try:
+                self._selector.unregister(self._server)
+            except (KeyError, ValueError):
+                pass
+            self._server.close()
+            self._server = None
+            if os.path.exists(self._socket_path):
+                os.remove(self._socket_path)
+
+    def _accept(self):
+        try:
+            connection, _ = self._server.accept()
+        except BlockingIOError:
+            return
+        connection.settimeout(10)
+        try:
+            message, fds = _receive_message(connection)
+        except (OSError, ValueError):
+            connection.close()
+            return
+        if message is None:
+            connection.close()
+        elif "control" in message:
+            self._control(connection, message["control"], fds)
+        else:
+            self._run(connection, message, fds)
+
+    def _control(self, connection, control, fds):
+        for fd in fds:
+            os.close(fd)
+        with connection:
+            if control == "stop":
+                _send_message(connection, {"stopped": True})
+                self._stop_listening()
+            else:
+                _send_message(connection, self._status())
+
+    def _run(self, connection, message, fds):
+        if len(fds) != _STREAMS:
+            for fd in fds:
+                os.close(fd)
+            connection.close()
+            return
+        # The modules of the user commands are imported in the fork, with the cwd and environment of the client
+        try:
+            self._refresh()
+        except (TomeException, OSError, ValueError) as e:  # A broken home must not stop the daemon
+            sys.stderr.write(f"Error loading the commands: {e}\n")
+        for stream in (sys.stdout, sys.stderr):
+            stream.flush()
+
+        pid = os.fork()
+        if pid == 0:
+            self._child(connection, message, fds)  # Never returns
+        for fd in fds:
+            os.close(fd)
+        self._children[connection] = pid
+        self._selector.register(connection, selectors.EVENT_READ)
+
+    def _child(self, connection, message, fds):
+        """Run a command line in the forked process, with the registry of the daemon"""
+        from tome.cli import run_cli
+
+        exit_code = ERROR_UNEXPECTED
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            self._selector.close()
+            if self._server is not None:
+                self._server.close()
+            for other in self._children:
+                other.close()
+            connection.close()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            for stream in (sys.stdout, sys.stderr):
+                if hasattr(stream, "reconfigure"):
+                    stream.reconfigure(line_buffering=stream.isatty())
+            os.chdir(message["cwd"])
+            os.environ.clear()
+            os.environ.update(message["env"])
+            exit_code = run_cli(self._cli, message["argv"])
+        except Exception as e:  # noqa: BLE001 - Failing to set up the process must not raise past os._exit()
+            sys.stderr.write(f"Error: {e}\n")
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code if isinstance(exit_code, int) else ERROR_UNEXPECTED)
+
+    def _client_closed(self, connection):
+        """The client of a running command line closed the connection, most likely interrupted with Ctrl+C"""
+        self._selector.unregister(connection)
+        pid = self._children.get(connection)
+        if pid is not None:
+            try:
+                os.kill(pid, signal.SIGINT)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self):
+        for connection, pid in list(self._children.items()):
+            try:
+                finished, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                finished, status = pid, 0
+            if not finished:
+                continue
+            del self._children[connection]
+            try:
+                self._selector.unregister(connection)
+            except (KeyError, ValueError):
+                pass
+            exit_code = os.waitstatus_to_exitcode(status)
+            try:
+                _send_message(connection, {"exit_code": exit_code if exit_code >= 0 else ERROR_UNEXPECTED})
+            except OSError:
+                pass
+            connection.close()
@@ -1,9 +1,20 @@
-from rich.text import Text
+import json
+import sys
 
 from tome.api.output import TomeOutput
 from tome.command import CommandType
+from tome.errors import TomeException
+from tome.exit_codes import SUCCESS
 from tome.internal.cli.emojinator import Emojinator
 
+# Lines written at once, so long listings don't pay a write or a rich render per command
+BATCH_LINES = 500
+
+_ROW_STYLES = {
+    CommandType.editable: ("yellow", None),
+    CommandType.failed: (None, "bold red"),
+}
+
 
 def _extract_docstring(docstring):
     if not docstring:
@@ -15,25 +26,23 @@ def _extract_docstring(docstring):
     return ' '.join(lines).strip()
 
 
-def print_grouped_commands(result):
-    output = TomeOutput(stdout=True)
-
-    all_commands = [
-        command for namespaces in result.values() for commands in namespaces.values() for command in commands
-    ]
-
-    if not all_commands:
-        return
-
-    max_name_length = max(
-        (len(f"{cmd.namespace}:{cmd.name}" if cmd.namespace else cmd.name) for cmd in all_commands), default=0
-    )
-
+def _grouped_lines(result):
+    """
+    Generate the lines of the listing as (text, style, summary, summary style) tuples. The width of the
+    names column is computed in a single pass before yielding the first line.
+    """
+    max_name_length = 0
+    for namespaces in result.values():
+        for commands in namespaces.values():
+            for cmd in commands:
+                max_name_length = max(
+                    max_name_length, len(f"{cmd.namespace}:{cmd.name}" if cmd.namespace else cmd.name)
+                )
     base_padding = max_name_length + 6
 
-    sorted_origins = sorted(result.items(), key=lambda item: (item[0] is None, item[0]))
-
-    for origin, namespaces_data in sorted_origins:
+    emojinator = Emojinator()
+    summaries = {}
+    for origin, namespaces_data in sorted(result.items(), key=lambda item: (item[0] is None, item[0])):
         if origin is None:
             ns_indent = ""
             cmd_indent = "  "
@@ -41,20 +50,18 @@ def print_grouped_commands(result):
             ns_indent = "  "
             cmd_indent = "     "
             if isinstance(origin, str):
-                output.info(Text(f"\n📖 {origin}", style="bold white"))
-
-        current_padding_size = base_padding
+                yield f"\n📖 {origin}", "bold white", "", None
 
         for namespace, commands in sorted(namespaces_data.items()):
             if namespace is None:
-                namespace_string = f"\n{ns_indent}📖 tome commands:"
+                yield f"\n{ns_indent}📖 tome commands:", "bold magenta", "", None
             else:
-                namespace_string = f"\n{ns_indent}{Emojinator().get_emoji(namespace)} {namespace} commands"
-
-            output.info(Text(namespace_string, style="bold magenta"))
+                yield f"\n{ns_indent}{emojinator.get_emoji(namespace)} {namespace} commands", "bold magenta", "", None
 
             for command in sorted(commands, key=lambda c: c.name):
-                summary = _extract_docstring(command.doc)
+                summary = summaries.get(command.doc)
+                if summary is None:
+                    summary = summaries[command.doc] = _extract_docstring(command.doc)
 
                 if command.type == CommandType.built_in:
                     display_name = command.name
@@ -62,16 +69,72 @@ def print_grouped_commands(result):
                     fullname = f"{command.namespace}:{command.name}" if command.namespace else command.name
                     display_name = f"{fullname} (e)" if command.type == CommandType.editable else fullname
 
-                padded_name = cmd_indent + display_name.ljust(current_padding_size)
+                name_style, summary_style = _ROW_STYLES.get(command.type, (None, None))
+                yield cmd_indent + display_name.ljust(base_padding), name_style, summary, summary_style
 
-                if command.type == CommandType.editable:
-                    command_string = Text(padded_name, style="yellow")
-                    summary_string = Text(summary)
-                elif command.type == CommandType.failed:
-                    command_string = Text(padded_name)
-                    summary_string = Text(summary, style="bold red")
-                else:
-                    command_string = Text(padded_name)
-                    summary_string = Text(summary)
 
-                output.info(command_string + summary_string)
+def _batches(lines):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) == BATCH_LINES:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def print_grouped_commands(result, plain=None):
+    """
+    Print the commands grouped by origin and namespace, with their summaries aligned in a column.
+
+    :param result: A dict {origin: {namespace: [commands]}}, None origin and namespace for the built-in ones.
+    :param plain: Write plain text instead of rendering with rich. By default, when the standard output
+                  is not a terminal, as there are no styles to show.
+    """
+    if TomeOutput.is_quiet() or not any(commands for namespaces in result.values() for commands in namespaces.values()):
+        return
+
+    if plain is None:
+        isatty = getattr(sys.stdout, "isatty", None)
+        plain = not (isatty and isatty())
+
+    if plain:
+        for batch in _batches(_grouped_lines(result)):
+            sys.stdout.write("".join(f"{text}{summary}\n" for text, _, summary, _ in batch))
+        sys.stdout.flush()
+        return
+
+    from rich.text import Text
+
+    output = TomeOutput(stdout=True)
+    for batch in _batches(_grouped_lines(result)):
+        rendered = Text()
+        for index, (text, style, summary, summary_style) in enumerate(batch):
+            if index:
+                rendered.append("\n")
+            rendered.append(text, style=style)
+            rendered.append(summary, style=summary_style)
+        output.info(rendered)
+
+
+def _check_failures(result):
+    failed = [command for command in result["commands"] if command["exit_code"] != SUCCESS]
+    if failed:
+        raise TomeException(f"{len(failed)} of {result['total']} command lines failed: {failed[0]['command']}")
+
+
+def print_command_lines_text(result):
+    """Summary of the command lines run by batch or run-many, failing if any of them failed"""
+    output = TomeOutput()
+    output.info("\nSummary:")
+    for command in result["commands"]:
+        output.info(f"  {command['exit_code']:>3}  {command['duration']:8.3f}s  {command['command']}")
+    not_run = result["total"] - len(result["commands"])
+    output.info(f"{len(result['commands'])} command lines run in {result['duration']:.3f}s, {not_run} not run")
+    _check_failures(result)
+
+
+def print_command_lines_json(result):
+    TomeOutput(stdout=True).print_json(json.dumps(result, indent=4, ensure_ascii=False))
+    _check_failures(result)
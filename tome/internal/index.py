@@ -0,0 +1,338 @@
+import ast
+import copy
+import json
+import os
+import pkgutil
+
+from tome.command import TomeShellCommand
+from tome.errors import TomeException
+from tome.internal.utils.files import load, save
+
+INDEX_FILE = "tome_index.json"
+INDEX_VERSION = 2
+NAMESPACES_VERSION = 1
+SCAN_CACHE_VERSION = 3
+
+
+class ScanCache:
+    """
+    Metadata extracted from files, reused while their (mtime_ns, size, inode) don't change. Used for
+    the editable installations, which can't have a static index because they are modified all the time.
+    """
+
+    def __init__(self, cache_file):
+        self._cache_file = cache_file
+        self._files = {}
+        self._used = set()
+        self._modified = False
+        if os.path.isfile(cache_file):
+            try:
+                data = json.loads(load(cache_file))
+            except ValueError:
+                data = None
+            if isinstance(data, dict) and data.get("version") == SCAN_CACHE_VERSION:
+                self._files = data["files"]
+
+    def get(self, file_path, scan):
+        """
+        Get the metadata of a file, calling ``scan(file_path)`` only if it is not cached or it changed.
+        """
+        st = os.stat(file_path)
+        key = [st.st_mtime_ns, st.st_size, st.st_ino]
+        self._used.add(file_path)
+        cached = self._files.get(file_path)
+        if cached is not None and cached["stat"] == key:
+            return cached["metadata"]
+        metadata = scan(file_path)
+        self._files[file_path] = {"stat": key, "metadata": metadata}
+        self._modified = True
+        return metadata
+
+    def save(self, prune=False):
+        """
+        Store the cache if something changed.
+
+        :param prune: Remove the files that were not requested since the cache was loaded.
+        """
+        if prune and set(self._files) - self._used:
+            self._files = {f: v for f, v in self._files.items() if f in self._used}
+            self._modified = True
+        if not self._modified:
+            return
+        data = {"version": SCAN_CACHE_VERSION, "files": self._files}
+        tmp_file = f"{self._cache_file}.{os.getpid()}.tmp"
+        try:
+            save(tmp_file, json.dumps(data, ensure_ascii=False))
+            os.replace(tmp_file, self._cache_file)
+        except OSError:  # The cache is an optimization, a read-only home shouldn't break anything
+            pass
+        self._modified = False
+
+
+def _is_tome_command_decorator(decorator):
+    """Check if a decorator node is a ``@tome_command(...)`` call"""
+    if not isinstance(decorator, ast.Call):
+        return False
+    func = decorator.func
+    name = func.id if isinstance(func, ast.Name) else getattr(func, "attr", "")
+    return name == "tome_command"
+
+
+def _decorator_parent(decorator):
+    """Name of the parent command of a ``@tome_command(parent=...)``, None for top level commands"""
+    for keyword in decorator.keywords:
+        if keyword.arg == "parent":
+            return keyword.value.id if isinstance(keyword.value, ast.Name) else ""
+    return None
+
+
+def _decorator_formatters(decorator):
+    for keyword in decorator.keywords:
+        if keyword.arg == "formatters" and isinstance(keyword.value, ast.Dict):
+            return [key.value for key in keyword.value.keys if isinstance(key, ast.Constant)]
+    return []
+
+
+def _function_options(function):
+    """Option strings of the ``parser.add_argument("-o", "--option", ...)`` calls of a command function"""
+    arguments = function.args.args
+    parser_name = arguments[1].arg if len(arguments) > 1 else "parser"
+    options = []
+    for node in ast.walk(function):
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "add_argument"
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id == parser_name
+        ):
+            for arg in node.args:
+                if isinstance(arg, ast.Constant) and isinstance(arg.value, str) and arg.value.startswith("-"):
+                    options.append(arg.value)
+    return options
+
+
+def _imported_module_file(node, module_file):
+    """
+    File of the module of a ``from ... import ...`` in a module of an origin, if it is another module of
+    the same origin. The namespace folders are top level packages, next to each other in the origin.
+    """
+    if node.level:
+        base = os.path.dirname(module_file)
+        for _ in range(node.level - 1):
+            base = os.path.dirname(base)
+    else:
+        base = os.path.dirname(os.path.dirname(module_file))
+    path = os.path.join(base, *node.module.split(".")) if node.module else base
+    for candidate in (path + ".py", os.path.join(path, "__init__.py")):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _module_commands(module_file, scanning):
+    """
+    The top level commands of a module, by the name they have in it: the ones defined there and the ones
+    imported from other modules of the origin with ``from ... import ...``, that are found in it when it
+    is imported too.
+    """
+    module_file = os.path.abspath(module_file)
+    if module_file in scanning:  # Circular imports
+        return {}
+    scanning.add(module_file)
+    node = ast.parse(load(module_file), filename=module_file)
+    commands = {}
+    by_function = {}
+    for child in node.body:
+        if isinstance(child, ast.ImportFrom):
+            imported_file = _imported_module_file(child, module_file)
+            if imported_file is None:
+                continue
+            try:
+                imported = _module_commands(imported_file, scanning)
+            except (SyntaxError, ValueError, UnicodeDecodeError):
+                continue  # Reported when that module is scanned
+            for alias in child.names:
+                if alias.name == "*":
+                    commands.update({name: c for name, c in imported.items() if not name.startswith("_")})
+                elif alias.name in imported:
+                    commands[alias.asname or alias.name] = imported[alias.name]
+            continue
+        if not isinstance(child, ast.FunctionDef):
+            continue
+        for decorator in child.decorator_list:
+            if _is_tome_command_decorator(decorator):
+                doc = ast.get_docstring(child, clean=False)
+                command = {
+                    "name": child.name.replace("_", "-"),
+                    "doc": doc.strip() if doc else "No description provided for this command.",
+                    "formatters": _decorator_formatters(decorator),
+                    "options": _function_options(child),
+                    "subcommands": {},
+                }
+                by_function[child.name] = command
+                parent = by_function.get(_decorator_parent(decorator))
+                if parent is not None:
+                    parent["subcommands"][command.pop("name")] = command
+                elif _decorator_parent(decorator) is None:
+                    commands[child.name] = command
+                break
+    scanning.discard(module_file)
+    return commands
+
+
+def scan_module(module_file):
+    """
+    Extract the metadata of the top level tome commands of a python module without importing it. They
+    are the ones defined in the module with the ``@tome_command`` decorator and the ones imported from
+    other modules of the same origin with ``from ... import ...``.
+
+    :param module_file: Path to the python file.
+    :return: A list of dicts with the name, doc, formatters, options and subcommands of every command,
+             sorted by name. Subcommands are dicts with their name and the same metadata.
+    """
+    commands = _module_commands(module_file, set())
+    # Same order as the commands found with dir() over the imported module
+    return [copy.deepcopy(commands[name]) for name in sorted(commands)]
+
+
+def scan_script(script):
+    """
+    Extract the metadata of a ``tome_*`` shell script.
+
+    :param script: Path to the script.
+    :return: A dict with the name, doc and runner of the command.
+    """
+    basename = os.path.basename(script)[len("tome_") :]
+    entry = {"name": basename.replace("_", "-").replace(".", "-"), "doc": None, "runner": None, "error": None}
+    try:
+        entry["runner"], entry["doc"] = TomeShellCommand._get_runner_description(script)
+    except TomeException as e:
+        entry["error"] = str(e)
+        entry["doc"] = f"🚨 Loading command failed: {e}"
+    return entry
+
+
+def scan_namespace(scripts_path, namespace, scan_cache=None):
+    """
+    Collect the index entries of a single namespace folder, in the same order that the commands are
+    registered when the modules are imported: python modules first, then ``tome_*`` scripts.
+
+    :param scripts_path: The folder containing the namespace folders.
+    :param namespace: The namespace folder name.
+    :param scan_cache: Optional ScanCache to avoid parsing again the files that didn't change.
+    """
+    entries = []
+    namespace_folder_path = os.path.join(scripts_path, namespace)
+    for module_info in pkgutil.iter_modules([namespace_folder_path]):
+        module_file = os.path.join(namespace_folder_path, module_info.name + ".py")
+        if module_info.ispkg or not os.path.isfile(module_file):
+            continue
+        base_entry = {"namespace": namespace, "kind": "python", "module_name": module_info.name}
+        try:
+            commands = scan_cache.get(module_file, scan_module) if scan_cache else scan_module(module_file)
+        except (SyntaxError, ValueError, UnicodeDecodeError) as e:
+            entries.append({**base_entry, "name": None, "doc": None, "error": str(e)})
+            continue
+        for command in commands:
+            entries.append(
+                {
+                    **base_entry,
+                    "name": command["name"],
+                    "doc": command["doc"],
+                    "formatters": command["formatters"],
+                    "options": command["options"],
+                    "subcommands": command["subcommands"],
+                    "path": os.path.join(namespace, module_info.name + ".py"),
+                    "error": None,
+                }
+            )
+
+    for _script in os.listdir(namespace_folder_path):
+        if _script.startswith("tome_"):
+            script = os.path.join(namespace_folder_path, _script)
+            entry = scan_cache.get(script, scan_script) if scan_cache else scan_script(script)
+            entries.append({"namespace": namespace, "kind": "shell", "path": os.path.join(namespace, _script), **entry})
+    return entries
+
+
+def scan_origin(scripts_path, scan_cache=None):
+    """
+    Collect the index entries for all the namespaces of an origin folder.
+
+    :param scripts_path: The folder containing the namespace folders.
+    :param scan_cache: Optional ScanCache to avoid parsing again the files that didn't change.
+    :return: A list of index entries.
+    """
+    entries = []
+    for namespace in os.listdir(scripts_path):
+        if namespace.startswith(".") or not os.path.isdir(os.path.join(scripts_path, namespace)):
+            continue
+        entries.extend(scan_namespace(scripts_path, namespace, scan_cache))
+    return entries
+
+
+def write_index(origin_folder):
+    """Write the command index of an installed origin next to its tome_source.json"""
+    index = {"version": INDEX_VERSION, "commands": scan_origin(origin_folder)}
+    save(os.path.join(origin_folder, INDEX_FILE), json.dumps(index, indent=4, ensure_ascii=False))
+
+
+def read_index(origin_folder):
+    """
+    Read the command index of an installed origin.
+
+    :return: The list of index entries or None if there is no valid index for that origin, for example
+             if it was installed with an older tome version.
+    """
+    index_file = os.path.join(origin_folder, INDEX_FILE)
+    if not os.path.isfile(index_file):
+        return None
+    try:
+        index = json.loads(load(index_file))
+    except ValueError:
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    return index.get("commands")
+
+
+def read_namespaces(namespaces_file):
+    """
+    Read the map of namespaces to the cache origins that contain them.
+
+    :return: A tuple with the dict {namespace: [origin, ...]} and the set of origins covered by it,
+             or None if there is no valid map.
+    """
+    if not os.path.isfile(namespaces_file):
+        return None
+    try:
+        data = json.loads(load(namespaces_file))
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("version") != NAMESPACES_VERSION:
+        return None
+    return data["namespaces"], set(data["origins"])
+
+
+def update_namespaces(namespaces_file, origin, namespaces):
+    """
+    Replace the namespaces of an origin in the map of namespaces to origins.
+
+    :param namespaces_file: The file storing the map.
+    :param origin: The name of the origin folder in the cache.
+    :param namespaces: The namespaces of that origin, None to remove the origin from the map.
+    """
+    current = read_namespaces(namespaces_file)
+    namespaces_map, origins = current if current is not None else ({}, set())
+    for namespace in list(namespaces_map):
+        namespaces_map[namespace] = [o for o in namespaces_map[namespace] if o != origin]
+        if not namespaces_map[namespace]:
+            del namespaces_map[namespace]
+    origins.discard(origin)
+    if namespaces is not None:
+        for namespace in namespaces:
+            namespaces_map.setdefault(namespace, []).append(origin)
+        origins.add(origin)
+    data = {"version": NAMESPACES_VERSION, "namespaces": namespaces_map, "origins": sorted(origins)}
+    save(namespaces_file, json.dumps(data, indent=4))
@@ -2,6 +2,7 @@ import fnmatch
 import json
 import os
 import platform
+import re
 import shutil
 import sys
 import tarfile
@@ -16,32 +17,45 @@ from urllib.parse import urlparse
 from tome.api.output import TomeOutput
 from tome.errors import TomeException
 from tome.internal.cache import TomePaths
-from tome.internal.source import SourceType
-from tome.internal.utils.files import chdir, save
+from tome.internal.index import write_index
+from tome.internal.loader import PYCACHE_FOLDER, precompile_origin
+from tome.internal.mirrors import GitMirror
+from tome.internal.source import Source, SourceType
+from tome.internal.utils.files import chdir, load, save, sha256sum
 from tome.internal.utils.files import copy_file
 from tome.internal.utils.files import is_subdirectory
 from tome.internal.utils.files import rmdir
-from tome.internal.utils.network import FileDownloader
 from tome.internal.utils.runners import detect_runner
 from tome.internal.utils.runners import tome_run
 
 
+# File of every installed origin with the sha256 of its files, to update only the ones that change
+MANIFEST_FILE = "tome_manifest.json"
+
+
 class IgnoreMatcher:
     """Manage ignore patterns from a .tomeignore file."""
 
-    def __init__(self, ignore_file):
+    def __init__(self, ignore_file=None):
         self.patterns = {".tomeignore"}
-        if os.path.exists(ignore_file):
+        if ignore_file and os.path.exists(ignore_file):
             with open(ignore_file) as file:
-                for line in file:
-                    content = line.split("#", 1)[0].strip()
-                    if content:
-                        self.patterns.add(content)
+                self.add_patterns(file)
+
+    def add_patterns(self, lines):
+        for line in lines:
+            content = line.split("#", 1)[0].strip()
+            if content:
+                self.patterns.add(content)
 
     def match(self, path):
         return any(fnmatch.fnmatch(path, pattern) for pattern in self.patterns)
 
 
+# Archives that can be extracted from a stream, while they are downloaded
+_TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+
 def is_compressed_file(filepath):
     if any(filepath.endswith(ext) for ext in (".zip", ".tar.gz", ".tgz", ".tar.bz2", ".tar", ".gz", ".tar.xz")):
         return True
@@ -57,71 +71,249 @@ def temporary_folder():
         rmdir(tmp_dir)
 
 
-def clone_git_repo(source, destination):
-    output = TomeOutput()
-    with temporary_folder() as tmp_dir:
-        with chdir(tmp_dir):
-            clone_cmd = f"git clone \"{source.uri}\" ."
-            checkout_cmd = f"git checkout {source.version}" if source.version else ""
+def _git(command, cwd):
+    with chdir(cwd):
+        return detect_runner(f"git {command}")
 
-            clone_message = f"Cloning {source.uri}"
-            if source.version:
-                clone_message += f" (at reference '{source.version}')"
 
-            output.info(clone_message)
-            ret, out = detect_runner(clone_cmd)
+def _shallow_clone(source, folder):
+    """
+    Fetch only the files of the commit to install: a clone of depth 1 of the branch or tag, or a fetch of
+    the full hash of a commit, without the blobs outside the checkout if the server supports partial clones.
+    With --folder, only that folder is checked out.
+
+    :return: The output of the failing git command if the server or the reference don't allow it, None otherwise.
+    """
+    sparse = "--no-checkout " if source.folder else ""
+    if source.version and re.fullmatch(r"[0-9a-f]{40}", source.version):
+        os.makedirs(folder)
+        for command in (
+            "init -q",
+            f'remote add origin "{source.uri}"',
+            f"fetch -q --depth 1 --filter=blob:none origin {source.version}",
+        ):
+            ret, out = _git(command, folder)
             if ret != 0:
-                raise TomeException(f"Failed to clone {source}: {out}")
+                return out
+        reference = "FETCH_HEAD"
+    else:
+        branch = f'--branch "{source.version}" ' if source.version else ""
+        clone_cmd = f'clone -q --depth 1 --filter=blob:none {sparse}{branch}"{source.uri}" "{folder}"'
+        ret, out = _git(clone_cmd, os.path.dirname(folder))
+        if ret != 0:
+            return out
+        if not source.folder:
+            return None
+        reference = "HEAD"
+
+    if source.folder:
+        ret, out = _git(f'sparse-checkout set --cone "{source.folder}"', folder)
+        if ret != 0:  # Old git versions, checking out everything is still correct
+            TomeOutput().verbose(f"Could not restrict the checkout to '{source.folder}': {out}")
+    ret, out = _git(f"checkout -q {reference}", folder)
+    return out if ret != 0 else None
+
+
+def _full_clone(source, folder):
+    """Clone the whole history of the repository and checkout the reference to install, if any"""
+    clone_cmd = f'git clone "{source.uri}" "{folder}"'
+    ret, out = detect_runner(clone_cmd)
+    if ret != 0:
+        raise TomeException(f"Failed to clone {source}: {out}")
+
+    if source.version:
+        ret, out = _git(f"checkout {source.version}", folder)
+        if ret != 0:
+            raise TomeException(f"Failed to checkout {source} at {source.version}: {out}")
+
+
+def clone_git_repo(source, tmp_dir, mirrors_folder=None, installed_commit=None):
+    """
+    Clone a git source in a temporary folder. With a mirrors folder, the files are exported from a mirror
+    of the repository that is only fetched, otherwise it tries to fetch only what is needed, falling back
+    to a full clone if the server or the reference don't support it.
+
+    :param installed_commit: The commit of the installed origin when updating it, nothing is exported if
+                             the version still points to it.
+    :return: The folder with the files to install, the one of the source folder if any, or None if it is
+             the installed commit, and the commit that was cloned.
+    """
+    output = TomeOutput()
+    clone_message = f"Cloning {source.uri}"
+    if source.version:
+        clone_message += f" (at reference '{source.version}')"
+    output.info(clone_message)
+
+    commit = None
+    if mirrors_folder:
+        mirror = GitMirror(mirrors_folder, source.uri)
+        try:
+            commit = mirror.update(source.version)
+            if installed_commit is not None and commit == installed_commit:
+                return None, commit
+            found = mirror.has_folder(commit, source.folder)
+            folder = os.path.join(tmp_dir, "export")
+            if found:
+                with mirror.archive(commit, source.folder) as archive:
+                    unpack_tar_stream(archive, None, folder)
+        except TomeException as e:
+            output.verbose(f"Could not use the git mirror, cloning the repository: {e}")
+            commit = None
+        else:
+            if not found:
+                raise TomeException(f"Folder specified with --folder: '{source.folder}' does not exist after cloning.")
 
-            if checkout_cmd:
-                ret, out = detect_runner(checkout_cmd)
-                if ret != 0:
-                    raise TomeException(f"Failed to checkout {source} at {source.version}: {out}")
+    if commit is None:
+        clone_folder = os.path.join(tmp_dir, "shallow")
+        error = _shallow_clone(source, clone_folder)
+        if error is not None:
+            output.verbose(f"Shallow clone not possible, cloning the whole repository: {error.strip()}")
+            clone_folder = os.path.join(tmp_dir, "full")
+            _full_clone(source, clone_folder)
 
-            ret, out = detect_runner('git rev-list HEAD -n 1 --full-history')
-            if ret != 0:
-                raise TomeException(f"Cannot obtain commit information after clone: {out}")
-            commit = out.strip()
+        ret, out = _git("rev-parse HEAD", clone_folder)
+        if ret != 0:
+            raise TomeException(f"Cannot obtain commit information after clone: {out}")
+        commit = out.strip()
+        if installed_commit is not None and commit == installed_commit:
+            return None, commit
+        folder = os.path.join(clone_folder, source.folder) if source.folder else clone_folder
 
-            output.info(f"Cloned {source}")
-            folder = os.path.join(tmp_dir, source.folder) if source.folder else tmp_dir
+        if source.folder and not os.path.exists(folder):
+            raise TomeException(f"Folder specified with --folder: '{source.folder}' does not exist after cloning.")
 
-            if source.folder and not os.path.exists(folder):
-                raise TomeException(f"Folder specified with --folder: '{source.folder}' does not exist after cloning.")
+    output.info(f"Cloned {source}")
+    return folder, commit
 
-            process_folder(folder, destination)
-    return commit
+
+class _ArchiveFolder:
+    """
+    Selects the members of an archive to extract: the ones inside the folder to install, if any, that are not
+    ignored by the .tomeignore of that folder. Their paths are relative to that folder.
+    """
+
+    def __init__(self, folder):
+        self.prefix = _path_parts(folder) if folder else []
+        self.ignore_matcher = IgnoreMatcher()
+        self.found = not folder
+
+    def relative_path(self, name):
+        """:return: The path to extract the member to, relative to the destination, or None to skip it"""
+        parts = _path_parts(name)
+        if parts[: len(self.prefix)] != self.prefix:
+            return None
+        self.found = True
+        parts = parts[len(self.prefix) :]
+        if not parts or ".." in parts or os.path.splitdrive(parts[0])[0]:
+            return None
+        rel_path = os.path.join(*parts)
+        if parts == [".tomeignore"]:  # Extracted too, so the files extracted before reading it are ignored later
+            return rel_path
+        if any(part == ".git" or self.ignore_matcher.match(part) for part in parts[:-1]):
+            return None
+        if self.ignore_matcher.match(rel_path):
+            TomeOutput().verbose(f"Ignored {rel_path}", verbosity=TomeOutput.LEVEL_VV)
+            return None
+        return rel_path
+
+    def check_found(self, folder):
+        if not self.found:
+            raise TomeException(f"Folder '{folder}' not found in the archive.")
+
+
+def _path_parts(name):
+    return [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+
+
+def _extract_member(fileobj, path, executable=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        shutil.copyfileobj(fileobj, file)
+    if executable:
+        os.chmod(path, os.stat(path).st_mode | 0o111)
+
+
+def unpack_zip(path_to_file, zip_folder, destination):
+    """
+    Extract the files of a zip archive, or only the ones of one of its folders, reading the .tomeignore of
+    that folder first to skip the ignored files.
+    """
+    selector = _ArchiveFolder(zip_folder)
+    with zipfile.ZipFile(path_to_file) as archive:
+        ignore_file = "/".join(selector.prefix + [".tomeignore"])
+        if ignore_file in archive.namelist():
+            selector.ignore_matcher.add_patterns(archive.read(ignore_file).decode("utf-8").splitlines())
+        for member in archive.infolist():
+            rel_path = selector.relative_path(member.filename)
+            if rel_path is None:
+                continue
+            path = os.path.join(destination, rel_path)
+            if member.is_dir():
+                os.makedirs(path, exist_ok=True)
+                continue
+            with archive.open(member) as fileobj:
+                _extract_member(fileobj, path, executable=bool((member.external_attr >> 16) & 0o111))
+    selector.check_found(zip_folder)
+
+
+def unpack_tar_stream(fileobj, zip_folder, destination):
+    """
+    Extract the files of a tar archive, or only the ones of one of its folders, in a single pass over a
+    stream that can be compressed with any of the tarfile supported compressions. The files of the folder
+    are skipped once its .tomeignore is read, the ones extracted before are ignored when they are copied.
+    """
+    output = TomeOutput()
+    selector = _ArchiveFolder(zip_folder)
+    try:
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for member in archive:
+                rel_path = selector.relative_path(member.name)
+                if rel_path is None:
+                    continue
+                path = os.path.join(destination, rel_path)
+                if member.isdir():
+                    os.makedirs(path, exist_ok=True)
+                elif member.isfile():
+                    _extract_member(archive.extractfile(member), path, executable=bool(member.mode & 0o111))
+                    if rel_path == ".tomeignore":
+                        selector.ignore_matcher = IgnoreMatcher(path)
+                else:
+                    output.warning(f"Skipped '{member.name}' of the archive, only files and folders are extracted")
+    except tarfile.TarError as e:
+        raise TomeException(f"Failed to extract the archive: {e}") from None
+    selector.check_found(zip_folder)
 
 
-# TODO: this is not optimal, it would be better to only extract
-#  the folder specified in the zip_folder
 def unpack_file(path_to_file, zip_folder, destination):
+    """
+    Extract a zip or tar archive, or only one of its folders, to the destination.
+
+    :param zip_folder: The folder of the archive to extract, its files are extracted to the root of the
+                       destination.
+    """
+    os.makedirs(destination, exist_ok=True)
     if zipfile.is_zipfile(path_to_file):
-        with zipfile.ZipFile(path_to_file, 'r') as archive:
-            archive.extractall(destination)
+        unpack_zip(path_to_file, zip_folder, destination)
     elif tarfile.is_tarfile(path_to_file):
-        with tarfile.open(path_to_file, 'r:*') as archive:
-            archive.extractall(destination)
+        with open(path_to_file, "rb") as fileobj:
+            unpack_tar_stream(fileobj, zip_folder, destination)
     else:
         raise TomeException(f"Unsupported file type: {path_to_file}")
 
-    if zip_folder:
-        folder = zip_folder.rstrip('/')
-        folder_path = os.path.join(destination, folder)
-        if not os.path.exists(folder_path):
-            raise TomeException(f"Folder '{zip_folder}' not found in the archive.")
-
-        for item in os.listdir(folder_path):
-            src = os.path.join(folder_path, item)
-            dst = os.path.join(destination, item)
-            shutil.move(src, dst)
-        os.rmdir(folder_path)
 
+def process_folder(folder, destination, previous=None):
+    """
+    Copy the files of a folder that are not ignored by its .tomeignore to the destination.
 
-def process_folder(folder, destination):
+    :param previous: The manifest of the files already in the destination, when updating it. Only the files
+                     whose content changed are written, and the ones that are not in the folder anymore are
+                     removed.
+    :return: The manifest of the files in the destination, with the sha256 of every relative path.
+    """
     output = TomeOutput()
     ignore_file = os.path.join(folder, '.tomeignore')
     ignore_matcher = IgnoreMatcher(ignore_file)
+    manifest = {}
     copied, ignored = 0, 0
     output.verbose(f"Copying files from {folder} to {destination}.")
     for root, dirs, files in os.walk(folder, topdown=True):
@@ -130,6 +322,14 @@ def process_folder(folder, destination):
             rel_path = os.path.relpath(os.path.join(root, name), folder)
             if not ignore_matcher.match(rel_path):
                 source_file = os.path.join(root, name)
+                key = rel_path.replace(os.sep, "/")
+                manifest[key] = sha256sum(source_file)
+                if (
+                    previous is not None
+                    and previous.get(key) == manifest[key]
+                    and os.path.isfile(os.path.join(destination, rel_path))
+                ):
+                    continue
                 _destination = os.path.join(destination, os.path.relpath(root, folder))
                 copy_file(source_file, _destination)
                 output.verbose(f"Copied {rel_path}")
@@ -138,24 +338,92 @@ def process_folder(folder, destination):
                 output.verbose(f"Ignored {rel_path}", verbosity=TomeOutput.LEVEL_VV)
                 ignored += 1
 
-    output.info(f"Copied {copied} files. Ignored {ignored} files.")
+    if previous is None:
+        output.info(f"Copied {copied} files. Ignored {ignored} files.")
+        return manifest
+
+    removed = 0
+    for key in sorted(set(previous) - set(manifest)):
+        path = os.path.join(destination, *key.split("/"))
+        if os.path.isfile(path):
+            os.remove(path)
+            output.verbose(f"Removed {key}")
+            removed += 1
+        parent = os.path.dirname(path)
+        while parent != destination and os.path.isdir(parent) and not os.listdir(parent):
+            os.rmdir(parent)
+            parent = os.path.dirname(parent)
+    output.info(f"Copied {copied} files. Removed {removed} files. {len(manifest) - copied} files did not change.")
+    return manifest
+
+
+def _read_manifest(origin_folder):
+    """:return: The manifest of the files of an installed origin, None if it was installed without it"""
+    manifest_file = os.path.join(origin_folder, MANIFEST_FILE)
+    if not os.path.isfile(manifest_file):
+        return None
+    try:
+        manifest = json.loads(load(manifest_file))
+    except ValueError:
+        return None
+    return manifest if isinstance(manifest, dict) else None
+
 
+def download_and_extract(source, tmp_dir):
+    """
+    Download a source from a URL and extract it in a temporary folder.
 
-def download_and_extract(source, destination):
+    :return: The folder with the extracted files, empty if the file is not a supported archive.
+    """
     output = TomeOutput()
     filename = os.path.basename(urlparse(source.uri).path)
-    destination_file = os.path.join(destination, filename)
 
-    with temporary_folder() as tmp_dir:
-        downloader = FileDownloader()
-        filepath = os.path.join(tmp_dir, filename)
-        downloader.download(source.uri, filepath, verify_ssl=source.verify_ssl)
+    from tome.internal.utils.network import FileDownloader  # requests is only needed to download
+
+    downloader = FileDownloader()
+    folder = os.path.join(tmp_dir, "extracted")
+    os.makedirs(folder)
+    if filename.endswith(_TAR_EXTENSIONS):
+        # Extracted while it downloads, the archive is never written to disk
+        with downloader.stream(source.uri, verify_ssl=source.verify_ssl) as stream:
+            unpack_tar_stream(stream, source.folder, folder)
+        output.info(f"Extracted {filename}")
+        return folder
+
+    # Zip files need to seek to their central directory at the end
+    filepath = os.path.join(tmp_dir, filename)
+    downloader.download(source.uri, filepath, verify_ssl=source.verify_ssl)
+    if is_compressed_file(filename):
+        unpack_file(filepath, source.folder, folder)
+        output.info(f"Extracted {filename}")
+    else:
+        output.warning(f"Downloaded {filename} but did not extract (unsupported type)")
+    return folder
 
-        if is_compressed_file(destination_file):
-            unpack_file(filepath, source.folder, destination)
-            output.info(f"Extracted {destination_file}")
+
+@contextmanager
+def _source_files(source, git_mirrors_folder=None, installed_commit=None):
+    """
+    Get the files of a source ready to be copied to its origin folder, cloning, extracting or downloading
+    them in a temporary folder if needed. The commit of git sources is updated.
+
+    :param installed_commit: The commit of the installed origin when updating a git source.
+    :return: The folder with the files, None if the git source is still at the installed commit.
+    """
+    if source.type is SourceType.FOLDER:
+        yield source.uri
+        return
+    with temporary_folder() as tmp_dir:
+        if source.type is SourceType.GIT:
+            folder, source.commit = clone_git_repo(source, tmp_dir, git_mirrors_folder, installed_commit)
+        elif source.type is SourceType.FILE:
+            assert is_compressed_file(source.uri)
+            folder = os.path.join(tmp_dir, "extracted")
+            with chdir(tmp_dir):
+                unpack_file(source.uri, source.folder, folder)
         else:
-            output.warning(f"Downloaded {destination_file} but did not extract (unsupported type)")
+            folder = download_and_extract(source, tmp_dir)
+        yield folder
 
 
 def _has_valid_commands(directory):
@@ -190,29 +458,24 @@ def _has_valid_commands(directory):
     return False
 
 
-def install_from_source(source, cache_destination_folder, force_requirements, create_env):
+def install_from_source(source, cache_destination_folder, force_requirements, create_env, git_mirrors_folder=None):
+    """
+    :param git_mirrors_folder: The folder to keep the mirrors of the git sources, they are not kept if not given.
+    """
     if os.path.exists(cache_destination_folder):
         rmdir(cache_destination_folder)
-    if source.type is SourceType.GIT:
-        commit = clone_git_repo(source, cache_destination_folder)
-        source.commit = commit
-        if not _has_valid_commands(cache_destination_folder):
-            raise TomeException("No valid tome commands were found in the cloned repository.")
-    elif source.type is SourceType.FOLDER:
-        if not _has_valid_commands(source.uri):
-            raise TomeException(f"No valid tome commands were found in the '{source.uri}' folder.")
-        process_folder(source.uri, cache_destination_folder)
-    elif source.type is SourceType.FILE:
-        assert is_compressed_file(source.uri)
-        with temporary_folder() as tmp_dir:
-            with chdir(tmp_dir):
-                unpack_file(source.uri, source.folder, tmp_dir)
-                process_folder(tmp_dir, cache_destination_folder)
-    elif source.type is SourceType.URL:
-        download_and_extract(source, cache_destination_folder)
+    if source.type is SourceType.FOLDER and not _has_valid_commands(source.uri):
+        raise TomeException(f"No valid tome commands were found in the '{source.uri}' folder.")
+    with _source_files(source, git_mirrors_folder) as folder:
+        manifest = process_folder(folder, cache_destination_folder)
+    if source.type is SourceType.GIT and not _has_valid_commands(cache_destination_folder):
+        raise TomeException("No valid tome commands were found in the cloned repository.")
 
     tome_source = os.path.join(cache_destination_folder, "tome_source.json")
     save(tome_source, json.dumps(source.serialize(), indent=4))
+    save(os.path.join(cache_destination_folder, MANIFEST_FILE), json.dumps(manifest, indent=4))
+    write_index(cache_destination_folder)
+    precompile_origin(cache_destination_folder)
 
     # The requirements.txt would have been copied to the folder
     _install_requirements(cache_destination_folder, force_requirements, create_env, origin=source)
@@ -220,6 +483,56 @@ def install_from_source(source, cache_destination_folder, force_requirements, cr
     return source
 
 
+def update_from_source(cache_destination_folder, version, force_requirements, create_env, git_mirrors_folder=None):
+    """
+    Update an installed origin to the current content of its source. Only the files that changed since it
+    was installed are written or removed, and the requirements are installed again only if they changed.
+
+    :param cache_destination_folder: The folder of the installed origin.
+    :param version: The branch, tag or commit to update a git source to, the installed one if not given.
+    :param git_mirrors_folder: The folder to keep the mirrors of the git sources, they are not kept if not given.
+    :return: The updated source and whether any of its files changed.
+    """
+    output = TomeOutput()
+    tome_source = os.path.join(cache_destination_folder, "tome_source.json")
+    installed = json.loads(load(tome_source))
+    source = Source.deserialize(installed)
+    if version:
+        if source.type is not SourceType.GIT:
+            raise TomeException(f"Only git sources can be updated to a version, '{source}' is a {source.type} source.")
+        source.version = version
+    previous = _read_manifest(cache_destination_folder)
+    if previous is None:
+        # Installed by an older tome, there is nothing to compare with
+        output.verbose(f"{source} has no manifest of its files, installing it again")
+        install_from_source(source, cache_destination_folder, force_requirements, create_env, git_mirrors_folder)
+        return source, True
+
+    with _source_files(source, git_mirrors_folder, installed["commit"]) as folder:
+        if folder is not None and not _has_valid_commands(folder):
+            raise TomeException(f"No valid tome commands were found in '{source}', it was not updated.")
+        manifest = process_folder(folder, cache_destination_folder, previous) if folder is not None else previous
+
+    if manifest == previous:
+        if source.serialize() != installed:  # Another version or commit with the same files
+            save(tome_source, json.dumps(source.serialize(), indent=4))
+        output.info(f"{source} is up to date")
+        return source, False
+
+    write_index(cache_destination_folder)
+    rmdir(os.path.join(cache_destination_folder, PYCACHE_FOLDER))
+    precompile_origin(cache_destination_folder)
+    if manifest.get("requirements.txt") != previous.get("requirements.txt"):
+        _install_requirements(cache_destination_folder, force_requirements, create_env, origin=source)
+    # Saved last, if something fails the next update writes the changed files again
+    save(os.path.join(cache_destination_folder, MANIFEST_FILE), json.dumps(manifest, indent=4))
+    save(tome_source, json.dumps(source.serialize(), indent=4))
+    # The processes that keep the commands registered, like the daemon, check the modification time
+    os.utime(cache_destination_folder)
+    output.info(f"Updated {source}")
+    return source, True
+
+
 def install_editable(source, cache_base_folder, force_requirements, create_env):
     """
     Updates the cache directory with a new source installed in editable mode.
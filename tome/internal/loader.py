@@ -0,0 +1,155 @@
+import importlib.util
+import marshal
+import os
+import py_compile
+import sys
+from importlib.machinery import PathFinder, SourceFileLoader
+
+from tome.internal.utils.files import short_hash_path
+
+# Folder inside every installed origin with its precompiled bytecode
+PYCACHE_FOLDER = ".tome_pycache"
+# pyc flags for hash-based files whose source is never checked (PEP 552)
+_UNCHECKED_HASH_FLAGS = 0b01
+# Package prefix of the modules imported from origins in sys.modules
+PRIVATE_MODULES_PREFIX = "_tome_modules"
+
+
+def pycache_file(origin_folder, source_file):
+    """
+    Path of the precompiled bytecode of a source file of an origin, mirroring the origin layout
+    inside its PYCACHE_FOLDER and tagged with the interpreter, like the ``sys.pycache_prefix`` ones.
+    """
+    relative_path = os.path.relpath(source_file, origin_folder)
+    name = os.path.splitext(relative_path)[0]
+    return os.path.join(origin_folder, PYCACHE_FOLDER, f"{name}.{sys.implementation.cache_tag}.pyc")
+
+
+def precompile_origin(origin_folder):
+    """
+    Compile all the python files of an installed origin into unchecked-hash pyc files, so loading
+    them never compiles, even if the cache is read-only.
+
+    :return: The number of compiled files.
+    """
+    compiled = 0
+    for root, dirs, files in os.walk(origin_folder):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and d != "__pycache__"]
+        for name in files:
+            if not name.endswith(".py"):
+                continue
+            source_file = os.path.join(root, name)
+            try:
+                py_compile.compile(
+                    source_file,
+                    cfile=pycache_file(origin_folder, source_file),
+                    doraise=True,
+                    invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+                )
+            except (py_compile.PyCompileError, OSError):
+                continue  # Broken files are reported when they are loaded
+            compiled += 1
+    return compiled
+
+
+class PrecompiledSourceFileLoader(SourceFileLoader):
+    """
+    Loader for the python files of an origin that uses the bytecode precompiled at install time if it
+    exists, falling back to the regular source loading otherwise (e.g. editables).
+    """
+
+    def __init__(self, fullname, path, origin_folder):
+        super().__init__(fullname, path)
+        self.origin_folder = origin_folder
+
+    def get_code(self, fullname):
+        pyc = pycache_file(self.origin_folder, self.path)
+        try:
+            with open(pyc, "rb") as f:
+                data = f.read()
+        except OSError:
+            return super().get_code(fullname)
+        flags = int.from_bytes(data[4:8], "little")
+        if data[:4] != importlib.util.MAGIC_NUMBER or flags != _UNCHECKED_HASH_FLAGS:
+            return super().get_code(fullname)
+        return marshal.loads(memoryview(data)[16:])
+
+
+def spec_from_origin_file(name, path, origin_folder=None):
+    """
+    Same as ``importlib.util.spec_from_file_location`` but using the precompiled bytecode of the
+    origin the file belongs to.
+    """
+    if origin_folder is None:
+        return importlib.util.spec_from_file_location(name, path)
+    loader = PrecompiledSourceFileLoader(name, path, origin_folder)
+    return importlib.util.spec_from_file_location(name, path, loader=loader)
+
+
+class _OriginFinder:
+    """meta path finder delegating to an OriginImporter"""
+
+    def __init__(self, importer, submodules):
+        self._importer = importer
+        self._submodules = submodules
+
+    def find_spec(self, fullname, path=None, target=None):
+        return self._importer.find_spec(fullname, path, self._submodules)
+
+
+class OriginImporter:
+    """
+    Import hook active while a module of an origin is imported. The modules imported by it are found in
+    the origin folders without adding them to sys.path, and when the hook is deactivated they are moved
+    in sys.modules under a private package prefix, so they don't clash with the modules with the same
+    name of other origins.
+
+    Two finders are installed: one at the end of sys.meta_path for top level modules, so they keep
+    a lower priority than the installed packages as if the folders were appended to sys.path, and one at
+    the beginning for the submodules of the packages already found in the origin.
+    """
+
+    def __init__(self, search_paths, origin_folder=None):
+        """
+        :param search_paths: Folders to look for the top level modules, in order.
+        :param origin_folder: Folder of an installed origin, to use its precompiled bytecode.
+        """
+        self.search_paths = search_paths
+        self.origin_folder = origin_folder
+        self.prefix = f"{PRIVATE_MODULES_PREFIX}.{short_hash_path(search_paths[-1])}"
+        self._packages = set()
+        self._loaded = []
+        self._top_level_finder = _OriginFinder(self, submodules=False)
+        self._submodules_finder = _OriginFinder(self, submodules=True)
+
+    def find_spec(self, fullname, path, submodules):
+        if submodules:
+            if path is None or fullname.partition(".")[0] not in self._packages:
+                return None
+            spec = PathFinder.find_spec(fullname, path)
+        else:
+            if path is not None:
+                return None
+            spec = PathFinder.find_spec(fullname, self.search_paths)
+        if spec is None:
+            return None
+        if spec.submodule_search_locations is not None:
+            self._packages.add(fullname.partition(".")[0])
+        if self.origin_folder and spec.origin and spec.origin.endswith(".py"):
+            spec.loader = PrecompiledSourceFileLoader(fullname, spec.origin, self.origin_folder)
+        self._loaded.append(fullname)
+        return spec
+
+    def __enter__(self):
+        sys.meta_path.insert(0, self._submodules_finder)
+        sys.meta_path.append(self._top_level_finder)
+        return self
+
+    def __exit__(self, *exc):
+        sys.meta_path.remove(self._submodules_finder)
+        sys.meta_path.remove(self._top_level_finder)
+        for name in self._loaded:
+            module = sys.modules.pop(name, None)
+            if module is not None:
+                sys.modules[f"{self.prefix}.{name}"] = module
+        self._loaded = []
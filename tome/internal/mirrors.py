@@ -0,0 +1,195 @@
+"""
+Bare mirrors of the git sources, kept in the tome home so installing them again, or installing other
+versions or folders of the same repository, only fetches the new objects.
+"""
+
+import os
+import re
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from urllib.parse import urlparse, urlunparse
+
+from tome.api.output import TomeOutput
+from tome.errors import TomeException
+from tome.internal.utils.files import chdir, load, rmdir, save, short_hash_path
+from tome.internal.utils.runners import detect_runner
+
+_CHUNK_SIZE = 65536
+# The attributes of the repository only apply to git archive, the exported files must be the ones of a checkout
+_EXPORT_ATTRIBUTES = "* -export-ignore -export-subst\n"
+
+
+def normalize_git_url(uri):
+    """
+    The key of the mirror of a repository: the same for different spellings of its URL, like with or
+    without the .git suffix, a trailing slash, different case in the host or credentials.
+    """
+    uri = uri.strip().replace("\\", "/").rstrip("/")
+    if uri.endswith("/.git"):
+        uri = uri[: -len("/.git")]
+    elif uri.endswith(".git"):
+        uri = uri[: -len(".git")]
+    parsed = urlparse(uri)
+    if parsed.scheme and parsed.hostname:
+        netloc = parsed.hostname.lower() + (f":{parsed.port}" if parsed.port else "")
+        uri = urlunparse(parsed._replace(scheme=parsed.scheme.lower(), netloc=netloc))
+    return uri
+
+
+def _without_credentials(uri):
+    """The URL without user and password, to store it in the mirror, they are passed in every fetch"""
+    parsed = urlparse(uri)
+    if parsed.scheme and parsed.hostname and (parsed.username or parsed.password):
+        netloc = parsed.netloc.rpartition("@")[2]
+        uri = urlunparse(parsed._replace(netloc=netloc))
+    return uri
+
+
+class GitMirror:
+    """
+    A bare repository with the branches and tags of a git source, created as a partial clone without blobs
+    if the server supports it, so only the blobs of the exported commits are downloaded.
+    """
+
+    def __init__(self, mirrors_folder, uri):
+        self._uri = uri
+        self.folder = os.path.join(mirrors_folder, short_hash_path(normalize_git_url(uri)) + ".git")
+
+    def _git(self, command, folder=None):
+        with chdir(folder or self.folder):
+            return detect_runner(f"git {command}")
+
+    def _check(self, command, message):
+        ret, out = self._git(command)
+        if ret != 0:
+            raise TomeException(f"{message}: {out}")
+        return out
+
+    def _create(self):
+        parent = os.path.dirname(self.folder)
+        os.makedirs(parent, exist_ok=True)
+        tmp_folder = f"{self.folder}.{os.getpid()}.tmp"
+        rmdir(tmp_folder)
+        ret, out = self._git(f'clone -q --bare --filter=blob:none "{self._uri}" "{tmp_folder}"', parent)
+        if ret != 0:
+            rmdir(tmp_folder)
+            raise TomeException(f"Failed to clone {self._uri}: {out}")
+        with chdir(tmp_folder):
+            detect_runner('git config remote.origin.fetch "+refs/heads/*:refs/heads/*"')
+            detect_runner(f'git config remote.origin.url "{_without_credentials(self._uri)}"')
+        try:
+            os.rename(tmp_folder, self.folder)
+        except OSError:  # Created at the same time by another tome process
+            rmdir(tmp_folder)
+
+    def _fetch(self):
+        # From the URL of this install, its credentials can change and they are not stored in the mirror
+        refspec = "+refs/heads/*:refs/heads/*"
+        self._check(f'fetch -q --prune --tags "{self._uri}" "{refspec}"', f"Failed to fetch {self._uri}")
+
+    def _resolve(self, version):
+        ret, out = self._git(f'rev-parse --verify --quiet "{version or "HEAD"}^{{commit}}"')
+        return out.strip() if ret == 0 else None
+
+    def _known_commit(self, version):
+        """
+        The commit the version abbreviates if it is already in the mirror, None if it isn't or if it is the
+        name of a branch or tag, even if it looks like a hash.
+        """
+        if not version or not re.fullmatch(r"[0-9a-f]{7,40}", version):
+            return None
+        commit = self._resolve(version)
+        return commit if commit is not None and commit.startswith(version) else None
+
+    def update(self, version=None):
+        """
+        Create the mirror or fetch the new objects of the repository, and resolve the version to install.
+        Commits already in the mirror don't need to fetch anything, they can't change.
+
+        :param version: A branch, tag or commit of the repository, the default branch if not given.
+        :return: The commit of the version.
+        """
+        output = TomeOutput()
+        if not os.path.isdir(self.folder):
+            output.verbose(f"Creating the git mirror {self.folder}")
+            self._create()
+        else:
+            commit = self._known_commit(version)
+            if commit is not None:
+                return commit
+            output.verbose(f"Fetching {self._uri} in the git mirror {self.folder}")
+            self._fetch()
+
+        commit = self._resolve(version)
+        if commit is None and version and re.fullmatch(r"[0-9a-f]{40}", version):
+            # Commits not in any branch or tag, if the server allows fetching them
+            self._git(f'fetch -q "{self._uri}" {version}')
+            commit = self._resolve(version)
+        if commit is None:
+            raise TomeException(f"Failed to checkout {self._uri} at {version}: not found in the repository")
+        return commit
+
+    @staticmethod
+    def _tree(commit, folder):
+        return f"{commit}:{folder.strip('/')}" if folder else commit
+
+    def has_folder(self, commit, folder):
+        """Whether the folder, if any, exists in the commit"""
+        ret, _ = self._git(f'cat-file -e "{self._tree(commit, folder)}"')
+        return ret == 0
+
+    @contextmanager
+    def archive(self, commit, folder):
+        """
+        Stream a tar archive with the files of a commit, or only the ones of one of its folders, from the
+        mirror. The blobs that are not in the mirror yet are fetched. The files are the same as the ones
+        of a checkout, the export-ignore and export-subst attributes are not applied.
+
+        :param commit: The commit to export.
+        :param folder: The folder of the repository to export, all the repository if not given. The paths
+                       in the archive are relative to it.
+        :return: A binary file object with the archive, to read while git writes it.
+        """
+        # The attributes of $GIT_DIR/info/attributes take precedence over the .gitattributes of the commit
+        attributes = os.path.join(self.folder, "info", "attributes")
+        if not os.path.isfile(attributes) or load(attributes) != _EXPORT_ATTRIBUTES:
+            save(attributes, _EXPORT_ATTRIBUTES)
+        command = ["git", "archive", "--format=tar", self._tree(commit, folder)]
+        with tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(command, cwd=self.folder, stdout=subprocess.PIPE, stderr=errors)
+            finished = False
+            try:
+                yield process.stdout
+                while process.stdout.read(_CHUNK_SIZE):  # git fails writing to a closed pipe otherwise
+                    pass
+                finished = True
+            finally:
+                if not finished:
+                    process.kill()
+                process.stdout.close()
+                ret = process.wait()
+            if ret != 0:
+                errors.seek(0)
+                message = errors.read().decode("utf-8", errors="replace")
+                raise TomeException(f"Failed to export {commit} of {self._uri}: {message}")
+
+
+def prune_mirrors(mirrors_folder, uris):
+    """
+    Remove the mirrors of the repositories that are not in the given ones.
+
+    :param uris: The URIs of the git sources that are still installed.
+    :return: The removed mirror folders.
+    """
+    if not os.path.isdir(mirrors_folder):
+        return []
+    keep = {os.path.basename(GitMirror(mirrors_folder, uri).folder) for uri in uris}
+    removed = []
+    for name in sorted(os.listdir(mirrors_folder)):
+        if name.endswith(".git") and name not in keep:
+            folder = os.path.join(mirrors_folder, name)
+            TomeOutput().verbose(f"Removing the git mirror {folder}, no installed tome uses it")
+            rmdir(folder)
+            removed.append(folder)
+    return removed
@@ -0,0 +1,263 @@
+"""
+Concurrent execution of tome command lines. Every command line runs in a process forked after registering
+the commands, and the output of the processes is multiplexed in the output of tome, prefixing every line
+with the command line that printed it or grouping the whole output of each one.
+"""
+
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from tome.cli import Cli
+from tome.exit_codes import ERROR_GENERAL, ERROR_UNEXPECTED, SUCCESS
+
+_CHUNK_SIZE = 65536
+_STDOUT, _STDERR = "stdout", "stderr"
+
+
+def can_fork():
+    return hasattr(os, "fork")
+
+
+class _Job:
+    """A command line to run, with the output it printed so far"""
+
+    def __init__(self, index, args, label):
+        self.index = index
+        self.args = args
+        self.label = label
+        self.pid = None
+        self.process = None  # Without fork, the tome process running it and the files with its output
+        self.files = None
+        # {fd: stream name} of the pipes that are still open
+        self.pipes = {}
+        self.partial = {_STDOUT: b"", _STDERR: b""}
+        self.captured = {_STDOUT: [], _STDERR: []}
+        self.start = None
+        self.exit_code = None
+        self.duration = None
+
+    def result(self, capture):
+        result = {"command": shlex.join(self.args), "exit_code": self.exit_code, "duration": self.duration}
+        if capture:
+            result["output"] = b"".join(self.captured[_STDOUT]).decode("utf-8", errors="replace")
+        return result
+
+
+class ParallelRunner:
+    """
+    Runs command lines concurrently, at most the given number of them at the same time.
+
+    :param tome_api: The TomeAPI of the home to run the commands.
+    :param jobs: The maximum number of command lines running at the same time.
+    :param group: Print the output of every command line together when it finishes, instead of every line
+                  prefixed by its label as soon as it is printed.
+    :param capture: Capture the stdout of the command lines in the results instead of printing it.
+    :param fail_fast: Don't start more command lines after one fails.
+    """
+
+    def __init__(self, tome_api, jobs, group=False, capture=False, fail_fast=False):
+        self._tome_api = tome_api
+        self._jobs = jobs
+        # Without fork the output of the tome processes is read from files, it can only be grouped
+        self._fork = can_fork()
+        self._group = group or not self._fork
+        self._capture = capture
+        self._fail_fast = fail_fast
+        self._cli = None
+        self._selector = None
+        self._running = []
+
+    def run(self, command_lines, labels=None):
+        """
+        :param command_lines: The arguments of every command line.
+        :param labels: The labels to identify the output of every command line, the command lines by default.
+        :return: A list with a dict for every command line run, in the same order, with its arguments, exit
+                 code, duration in seconds and its output if captured.
+        """
+        labels = labels or [shlex.join(args) for args in command_lines]
+        pending = [_Job(index, args, label) for index, (args, label) in enumerate(zip(command_lines, labels))]
+        pending.reverse()
+        finished = []
+
+        previous_cli = self._tome_api.list.cli
+        if self._fork:
+            self._cli = Cli(self._tome_api)
+            self._cli.load_all_commands()
+            # Imported once here instead of in every forked process
+            for name in {args[0] for args in command_lines}:
+                self._cli.preload_command(name)
+            self._selector = selectors.DefaultSelector()
+        try:
+            while pending or self._running:
+                failed = any(job.exit_code != SUCCESS for job in finished)
+                while pending and len(self._running) < self._jobs and not (self._fail_fast and failed):
+                    self._start(pending.pop())
+                if self._fail_fast and failed:
+                    pending = []
+                self._wait()
+                for job in self._finished_jobs():
+                    self._running.remove(job)
+                    self._flush(job)
+                    finished.append(job)
+        finally:
+            self._tome_api.list.cli = previous_cli
+            self._terminate()
+            if self._selector is not None:
+                self._selector.close()
+        return [job.result(self._capture) for job in sorted(finished, key=lambda job: job.index)]
+
+    def _start(self, job):
+        job.start = time.perf_counter()
+        self._running.append(job)
+        if not self._fork:
+            env = dict(os.environ, TOME_HOME=self._tome_api.cache_folder)
+            # Closed when the job finishes or it is terminated, they outlive this method
+            job.files = {name: tempfile.TemporaryFile() for name in (_STDOUT, _STDERR)}  # noqa: SIM115
+            job.process = subprocess.Popen(
+                [sys.executable, "-m", "tome", *job.args],
+                stdin=subprocess.DEVNULL,
+                stdout=job.files[_STDOUT],
+                stderr=job.files[_STDERR],
+                env=env,
+            )
+            return
+
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            os.close(stdout_read)
+            os.close(stderr_read)
+            self._child(job, stdout_write, stderr_write)
+        os.close(stdout_write)
+        os.close(stderr_write)
+        job.pid = pid
+        for fd, name in ((stdout_read, _STDOUT), (stderr_read, _STDERR)):
+            job.pipes[fd] = name
+            self._selector.register(fd, selectors.EVENT_READ, job)
+
+    def _child(self, job, stdout_fd, stderr_fd):
+        """Run a command line in the forked process, writing its output to the pipes"""
+        exit_code = ERROR_UNEXPECTED
+        try:
+            self._selector.close()
+            for other in self._running:
+                for fd in other.pipes:
+                    os.close(fd)
+            devnull = os.open(os.devnull, os.O_RDONLY)
+            for fd, target in ((devnull, 0), (stdout_fd, 1), (stderr_fd, 2)):
+                os.dup2(fd, target)
+                os.close(fd)
+            # The streams of the parent could be replaced, like when capturing the output. They wrap the
+            # standard descriptors for the rest of the life of the process, which ends with os._exit()
+            sys.stdin = open(0, closefd=False)  # noqa: SIM115
+            sys.stdout = open(1, "w", buffering=1, encoding="utf-8", errors="replace", closefd=False)  # noqa: SIM115
+            sys.stderr = open(2, "w", buffering=1, encoding="utf-8", errors="replace", closefd=False)  # noqa: SIM115
+            exit_code = SUCCESS
+            try:
+                self._cli.run(job.args)
+            except BaseException as e:  # noqa: BLE001 - SystemExit and interruptions get their exit code, as in run_cli
+                exit_code = self._cli.exception_exit_error(e) or SUCCESS  # sys.exit() has no code
+        except Exception as e:  # noqa: BLE001 - Failing to set up the process must not raise past os._exit()
+            sys.stderr.write(f"Error: {e}\n")
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code if isinstance(exit_code, int) else ERROR_GENERAL)
+
+    def _wait(self):
+        """Wait until some command line prints something or finishes, and process its output"""
+        if not self._fork:
+            time.sleep(0.05)
+            return
+        if not self._selector.get_map():  # The running processes closed their output, they are finishing
+            return
+        for key, _ in self._selector.select():
+            job = key.data
+            data = os.read(key.fd, _CHUNK_SIZE)
+            if data:
+                self._output(job, job.pipes[key.fd], data)
+            else:
+                self._selector.unregister(key.fd)
+                os.close(key.fd)
+                del job.pipes[key.fd]
+
+    def _finished_jobs(self):
+        for job in list(self._running):
+            if job.process is not None:
+                exit_code = job.process.poll()
+                if exit_code is None:
+                    continue
+                for name, file in job.files.items():
+                    file.seek(0)
+                    self._output(job, name, file.read())
+                    file.close()
+            elif job.pipes:
+                continue
+            else:
+                _, status = os.waitpid(job.pid, 0)
+                exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else ERROR_UNEXPECTED
+            job.exit_code = exit_code
+            job.duration = time.perf_counter() - job.start
+            yield job
+
+    def _output(self, job, name, data):
+        if self._group or (self._capture and name == _STDOUT):
+            job.captured[name].append(data)
+            return
+        data = job.partial[name] + data
+        lines = data.split(b"\n")
+        job.partial[name] = lines.pop()
+        self._write(job, name, lines)
+
+    def _flush(self, job):
+        """Print what is left of the output of a finished command line"""
+        if self._group:
+            streams = [_STDERR] if self._capture else [_STDOUT, _STDERR]
+            for name in streams:
+                text = b"".join(job.captured[name]).decode("utf-8", errors="replace")
+                stream = sys.stdout if name == _STDOUT else sys.stderr
+                stream.write(text)
+                stream.flush()
+            return
+        for name, partial in job.partial.items():
+            if partial:
+                self._write(job, name, [partial])
+
+    @staticmethod
+    def _write(job, name, lines):
+        if not lines:
+            return
+        stream = sys.stdout if name == _STDOUT else sys.stderr
+        prefix = f"[{job.label}] "
+        stream.write("".join(f"{prefix}{line.decode('utf-8', errors='replace')}\n" for line in lines))
+        stream.flush()
+
+    def _terminate(self):
+        """Stop the command lines still running when the execution is interrupted"""
+        for job in self._running:
+            if job.process is not None:
+                job.process.terminate()
+                job.process.wait()
+                for file in job.files.values():
+                    file.close()
+                continue
+            for fd in job.pipes:
+                self._selector.unregister(fd)
+                os.close(fd)
+            try:
+                os.kill(job.pid, signal.SIGTERM)
+                os.waitpid(job.pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._running = []
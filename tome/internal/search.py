@@ -0,0 +1,170 @@
+import fnmatch
+import os
+import re
+import sqlite3
+
+SEARCH_VERSION = 2
+# Maximum number of names compared with a mistyped command, the ones sharing the most trigrams with it
+SIMILAR_CANDIDATES = 100
+
+
+def name_trigrams(text):
+    """The trigrams of a name, padded so the names shorter than 3 characters have some"""
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Persistent index of the commands installed in the cache, to find the ones that can match a pattern
+    in their full name or documentation without reading the index of every origin. It is a SQLite
+    database in the tome home, with a trigram full-text table when the SQLite library supports FTS5.
+    The texts are stored in lowercase to keep the searches case-insensitive.
+    """
+
+    def __init__(self, db_file):
+        self._db_file = db_file
+
+    def _connect(self, create=False):
+        if not create and not os.path.isfile(self._db_file):
+            return None
+        connection = sqlite3.connect(self._db_file)
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+        if version == SEARCH_VERSION:
+            return connection
+        if not create:
+            connection.close()
+            return None
+        connection.executescript(
+            """
+            DROP TABLE IF EXISTS origins;
+            DROP TABLE IF EXISTS commands;
+            DROP TABLE IF EXISTS commands_text;
+            DROP TABLE IF EXISTS command_trigrams;
+            CREATE TABLE origins (origin TEXT PRIMARY KEY);
+            CREATE TABLE commands (origin TEXT, fullname TEXT);
+            CREATE INDEX commands_fullname ON commands (fullname);
+            CREATE INDEX commands_origin ON commands (origin);
+            CREATE TABLE command_trigrams (trigram TEXT, origin TEXT, fullname TEXT);
+            CREATE INDEX command_trigrams_trigram ON command_trigrams (trigram);
+            CREATE INDEX command_trigrams_origin ON command_trigrams (origin);
+            """
+        )
+        try:
+            connection.execute(
+                "CREATE VIRTUAL TABLE commands_text USING fts5(origin UNINDEXED, fullname UNINDEXED, name_text, "
+                "doc_text, tokenize='trigram case_sensitive 1')"
+            )
+        except sqlite3.OperationalError:  # Without FTS5 or the trigram tokenizer, SQLite < 3.34
+            connection.execute("CREATE TABLE commands_text (origin TEXT, fullname TEXT, name_text TEXT, doc_text TEXT)")
+        connection.execute(f"PRAGMA user_version = {SEARCH_VERSION}")
+        connection.commit()
+        return connection
+
+    def update_origin(self, origin, entries):
+        """
+        Replace the commands of an origin in the index.
+
+        :param origin: The name of the origin folder in the cache.
+        :param entries: The entries of the command index of the origin, None to remove it.
+        """
+        connection = self._connect(create=True)
+        try:
+            with connection:
+                for table in ("origins", "commands", "commands_text", "command_trigrams"):
+                    connection.execute(f"DELETE FROM {table} WHERE origin = ?", (origin,))
+                if entries is None:
+                    return
+                connection.execute("INSERT INTO origins VALUES (?)", (origin,))
+                rows = [
+                    (origin, f"{entry['namespace']}:{entry['name']}", entry["doc"] or "")
+                    for entry in entries
+                    if entry["name"] is not None
+                ]
+                connection.executemany("INSERT INTO commands VALUES (?, ?)", [row[:2] for row in rows])
+                connection.executemany(
+                    "INSERT INTO commands_text VALUES (?, ?, ?, ?)",
+                    [(origin, fullname, fullname.lower(), doc.lower()) for origin, fullname, doc in rows],
+                )
+                connection.executemany(
+                    "INSERT INTO command_trigrams VALUES (?, ?, ?)",
+                    [
+                        (trigram, origin, fullname)
+                        for origin, fullname, _ in rows
+                        for trigram in name_trigrams(fullname)
+                    ],
+                )
+        finally:
+            connection.close()
+
+    def search(self, pattern):
+        """
+        Find the origins that must be loaded to list the commands matching a glob pattern: the ones
+        defining a command whose full name or documentation matches, and the other origins defining a
+        command with the same full name, which may take precedence over it.
+
+        :return: A tuple with the set of those origins and the set of origins covered by the index, or
+                 None if there is no valid index.
+        """
+        try:
+            connection = self._connect()
+        except sqlite3.DatabaseError:
+            return None
+        if connection is None:
+            return None
+        try:
+            indexed = {row[0] for row in connection.execute("SELECT origin FROM origins")}
+            if "[" in pattern:  # fnmatch and GLOB brackets differ in corner cases, search like ListApi does
+                regex = re.compile(fnmatch.translate(pattern), flags=re.IGNORECASE)
+                rows = connection.execute("SELECT fullname, name_text, doc_text FROM commands_text")
+                matches = [(row[0],) for row in rows if regex.search(row[1]) or regex.search(row[2])]
+            else:
+                # Equivalent to re.search(fnmatch.translate(pattern)), the match must end with the string
+                glob = f"*{pattern.lower()}"
+                matches = connection.execute(
+                    "SELECT DISTINCT fullname FROM commands_text WHERE name_text GLOB ? OR doc_text GLOB ?",
+                    (glob, glob),
+                ).fetchall()
+            connection.execute("CREATE TEMP TABLE matches (fullname TEXT)")
+            connection.executemany("INSERT INTO matches VALUES (?)", matches)
+            origins = connection.execute(
+                "SELECT DISTINCT origin FROM commands WHERE fullname IN (SELECT fullname FROM matches)"
+            ).fetchall()
+        except sqlite3.DatabaseError:
+            return None
+        finally:
+            connection.close()
+        return {row[0] for row in origins}, indexed
+
+    def similar_names(self, word, limit=SIMILAR_CANDIDATES):
+        """
+        Get the names of the indexed commands that can be similar to a mistyped one: the ones that share
+        the most trigrams with it. Only the postings of the trigrams of the word are read, not every name.
+
+        :param word: The mistyped command.
+        :param limit: Maximum number of names to return.
+        :return: A tuple with the set of (origin, full name) of the candidates and the set of origins covered
+                 by the index, or None if there is no valid index.
+        """
+        try:
+            connection = self._connect()
+        except sqlite3.DatabaseError:
+            return None
+        if connection is None:
+            return None
+        trigrams = sorted(name_trigrams(word))[:500]  # Below the limit of SQL variables of old SQLite versions
+        placeholders = ", ".join("?" * len(trigrams))
+        try:
+            indexed = {row[0] for row in connection.execute("SELECT origin FROM origins")}
+            names = set(
+                connection.execute(
+                    f"SELECT origin, fullname FROM command_trigrams WHERE trigram IN ({placeholders}) "
+                    "GROUP BY origin, fullname ORDER BY COUNT(*) DESC, fullname LIMIT ?",
+                    (*trigrams, limit),
+                )
+            )
+        except sqlite3.DatabaseError:
+            return None
+        finally:
+            connection.close()
+        return names, indexed
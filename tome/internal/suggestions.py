@@ -0,0 +1,67 @@
+import heapq
+from difflib import SequenceMatcher
+
+
+def _common_chars(counts, other_counts):
+    """Size of the intersection of two multisets of characters"""
+    if len(counts) > len(other_counts):
+        counts, other_counts = other_counts, counts
+    return sum(min(count, other_counts.get(char, 0)) for char, count in counts.items())
+
+
+def _char_counts(text):
+    counts = {}
+    for char in text:
+        counts[char] = counts.get(char, 0) + 1
+    return counts
+
+
+class SuggestionIndex:
+    """
+    Index of command names to suggest the most similar ones to a mistyped command. It returns the same
+    results as ``difflib.get_close_matches()``, but only compares the names that can reach the cutoff.
+
+    The names are grouped by their namespace prefix and by the length of the rest of the name. The
+    characters a word can match in a name are bounded by the ones it matches in the prefix plus the
+    length of the rest, so whole groups are discarded computing that bound once per prefix and length.
+    """
+
+    def __init__(self, names=()):
+        # {prefix: (prefix char counts, {rest length: [names]})}
+        self._groups = {}
+        for name in names:
+            prefix, separator, rest = name.partition(":")
+            if not separator:
+                prefix, rest = "", name
+            else:
+                prefix += separator
+            group = self._groups.get(prefix)
+            if group is None:
+                group = self._groups[prefix] = (_char_counts(prefix), {})
+            group[1].setdefault(len(rest), []).append(name)
+
+    def close_matches(self, word, n=5, cutoff=0.75):
+        """
+        :param word: The mistyped name.
+        :param n: Maximum number of suggestions.
+        :param cutoff: Minimum similarity ratio, in [0, 1], of the suggestions.
+        :return: The most similar names, the most similar first.
+        """
+        result = []
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        word_counts = _char_counts(word)
+        for prefix, (prefix_counts, by_length) in self._groups.items():
+            prefix_matches = _common_chars(word_counts, prefix_counts)
+            for length, names in by_length.items():
+                # Upper bound of SequenceMatcher.ratio() for any name of the group with this length
+                total = len(word) + len(prefix) + length
+                matches = prefix_matches + min(length, len(word) - prefix_matches)
+                if total and 2.0 * matches / total < cutoff:
+                    continue
+                for name in names:
+                    matcher.set_seq1(name)
+                    # The bound of the group is already tighter than real_quick_ratio()
+                    if matcher.quick_ratio() >= cutoff and matcher.ratio() >= cutoff:
+                        result.append((matcher.ratio(), name))
+        return [name for _, name in heapq.nlargest(n, result)]
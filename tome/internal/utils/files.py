@@ -129,6 +129,10 @@ def _generic_algorithm_sum(file_path, algorithm_name):
         return m.hexdigest()
 
 
+def sha256sum(file_path):
+    return _generic_algorithm_sum(file_path, "sha256")
+
+
 def copy_file(source_file, destination_dir):
     """
     Copies a file from 'source_file' to the 'destination_dir' folder.
@@ -1,4 +1,6 @@
+import io
 import json
+from contextlib import contextmanager
 from pathlib import Path
 
 import requests
@@ -11,6 +13,8 @@ from tome.errors import NotFoundException
 from tome.errors import TomeException
 from tome.internal.utils.files import check_with_algorithm_sum
 
+_STREAM_BUFFER_SIZE = 65536
+
 
 def response_to_str(response: requests.Response) -> str:
     content = response.content
@@ -61,6 +65,27 @@ class Requester:
         return response
 
 
+class _DownloadReader(io.RawIOBase):
+    """Reads the content of a response, updating the download progress"""
+
+    def __init__(self, raw, advance):
+        self._raw = raw
+        self._advance = advance
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        # Decoding compressed responses can return more than requested, the rest is kept for the next read
+        data = self._pending or self._raw.read(len(buffer))
+        size = min(len(data), len(buffer))
+        buffer[:size] = data[:size]
+        self._pending = data[size:]
+        self._advance(size)
+        return size
+
+
 class FileDownloader:
     def __init__(self):
         self._output = TomeOutput()
@@ -89,7 +114,25 @@ class FileDownloader:
                 file_path.unlink()
             raise e
 
-    def _download_file(self, url, auth, headers, file_path, verify_ssl):
+    @contextmanager
+    def stream(self, url, verify_ssl=True, auth=None, headers=None):
+        """
+        Download a file as a stream, to process it while it downloads instead of saving it first.
+
+        :return: A binary file object with the content of the file.
+        """
+        response = self._get(url, auth, headers, verify_ssl)
+        response.raw.decode_content = True  # The same content iter_content() returns
+        try:
+            total_size = int(response.headers.get('content-length', 0))
+            with Progress() as progress:
+                task = progress.add_task("[cyan]Downloading...", total=total_size)
+                reader = _DownloadReader(response.raw, lambda size: progress.update(task, advance=size))
+                yield io.BufferedReader(reader, buffer_size=_STREAM_BUFFER_SIZE)
+        finally:
+            response.close()
+
+    def _get(self, url, auth, headers, verify_ssl):
         response = self._requester.get(url, stream=True, verify=verify_ssl, auth=auth, headers=headers)
         if not response.ok:
             if response.status_code == 404:
@@ -102,7 +145,10 @@ class FileDownloader:
             elif response.status_code == 401:
                 raise AuthenticationException()
             raise TomeException("Error %d downloading file %s" % (response.status_code, url))
+        return response
 
+    def _download_file(self, url, auth, headers, file_path, verify_ssl):
+        response = self._get(url, auth, headers, verify_ssl)
         total_size = int(response.headers.get('content-length', 0))
         with Progress() as progress:
             task = progress.add_task("[cyan]Downloading...", total=total_size)
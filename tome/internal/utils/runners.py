@@ -5,9 +5,6 @@ import sys
 from contextlib import contextmanager
 from io import StringIO
 
-from rich.live import Live
-from rich.spinner import Spinner
-
 from tome.api.output import TomeOutput
 from tome.errors import TomeException
 
@@ -0,0 +1,121 @@
+"""
+Opt-in tracing of the phases of a tome run, to find where the startup time goes. It is enabled
+with the TOME_TRACE=<file> environment variable or the --trace-startup <file> argument, and it
+records the wall time and the memory allocated in every phase. The trace is written as plain JSON or,
+with TOME_TRACE_FORMAT=chrome, in the Chrome trace-event format (chrome://tracing, Perfetto).
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+from tome.errors import TomeException
+
+TRACE_FORMATS = ("json", "chrome")
+
+_tracer = None
+
+
+class _Tracer:
+    def __init__(self, output_file, trace_format):
+        import tracemalloc
+
+        self._tracemalloc = tracemalloc
+        self._tracemalloc.start()
+        self.output_file = output_file
+        self.trace_format = trace_format
+        self._events = []
+        self._depth = 0
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name, **args):
+        start = time.perf_counter()
+        allocated_before = self._tracemalloc.get_traced_memory()[0]
+        depth = self._depth
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self._events.append(
+                {
+                    "name": name,
+                    "args": args,
+                    "start": start - self._start,
+                    "duration": time.perf_counter() - start,
+                    "alloc_bytes": self._tracemalloc.get_traced_memory()[0] - allocated_before,
+                    "depth": depth,
+                }
+            )
+
+    def _chrome_trace(self):
+        pid = os.getpid()
+        events = [
+            {
+                "name": event["name"],
+                "ph": "X",
+                "ts": round(event["start"] * 1e6),
+                "dur": round(event["duration"] * 1e6),
+                "pid": pid,
+                "tid": 0,
+                "args": {**event["args"], "alloc_bytes": event["alloc_bytes"]},
+            }
+            for event in self._events
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _json_trace(self):
+        phases = [
+            {
+                "name": event["name"],
+                "args": event["args"],
+                "start_ms": round(event["start"] * 1e3, 3),
+                "duration_ms": round(event["duration"] * 1e3, 3),
+                "alloc_bytes": event["alloc_bytes"],
+                "depth": event["depth"],
+            }
+            for event in sorted(self._events, key=lambda e: e["start"])
+        ]
+        return {"total_ms": round((time.perf_counter() - self._start) * 1e3, 3), "phases": phases}
+
+    def write(self):
+        self._tracemalloc.stop()
+        data = self._chrome_trace() if self.trace_format == "chrome" else self._json_trace()
+        with open(self.output_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+
+
+def start_trace(output_file, trace_format=None):
+    """
+    Start recording the phases of this run.
+
+    :param output_file: File where the trace is written when calling finish_trace().
+    :param trace_format: 'json' (default) or 'chrome'.
+    """
+    global _tracer
+    trace_format = trace_format or "json"
+    if trace_format not in TRACE_FORMATS:
+        raise TomeException(f"Invalid trace format '{trace_format}', use one of: {', '.join(TRACE_FORMATS)}")
+    _tracer = _Tracer(os.path.abspath(output_file), trace_format)
+
+
+def finish_trace():
+    """Write the recorded trace, if tracing was started"""
+    global _tracer
+    if _tracer is not None:
+        tracer, _tracer = _tracer, None
+        tracer.write()
+
+
+def trace_phase(name, **args):
+    """
+    Context manager recording a phase when tracing is enabled, doing nothing otherwise.
+
+    :param name: The name of the phase.
+    :param args: Extra information of the phase, like the module or origin being loaded.
+    """
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.phase(name, **args)